@@ -0,0 +1,168 @@
+"""Benchmark the import time of the spherexlander Lander plugins.
+
+Each entry point in the ``lander.parsers`` and ``lander.themes`` groups is
+loaded in a fresh interpreter, after the Lander modules that the ``lander``
+command always imports, so that the measurement covers only the imports
+caused by the plugin itself. Entry points are loaded with
+`importlib.import_module`, as Lander loads them. Because ``python -X
+importtime`` doesn't report imports made through `importlib.import_module`,
+the benchmark times the load itself and counts the new modules. For a
+per-module breakdown, run, for example::
+
+    python -X importtime -c "import spherexlander.parsers.ssdctr.parser"
+
+Usage::
+
+    python benchmarks/importtime.py                  # print the timings
+    python benchmarks/importtime.py --compare        # compare to baseline
+    python benchmarks/importtime.py --write-baseline # update the baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BASELINE_PATH = Path(__file__).parent.joinpath("importtime-baseline.json")
+"""Path of the baseline timings."""
+
+ENTRY_POINT_GROUPS = ("lander.parsers", "lander.themes")
+"""Entry point groups of the Lander plugins."""
+
+PRELOAD = "import lander.ext.parser, lander.ext.theme"
+"""Imports that precede the measurement of each entry point."""
+
+SCRIPT = """\
+{preload}
+import json, sys, time
+from importlib import import_module
+modules = set(sys.modules)
+start = time.perf_counter()
+getattr(import_module("{module}"), "{attr}")
+duration = time.perf_counter() - start
+print(json.dumps([duration, len(set(sys.modules) - modules)]))
+"""
+
+
+def measure(module: str, attr: str) -> Tuple[float, int]:
+    """Load an entry point in a fresh interpreter.
+
+    Returns
+    -------
+    tuple
+        The time to load the entry point, in milliseconds, and the number
+        of modules it imported.
+    """
+    script = SCRIPT.format(preload=PRELOAD, module=module, attr=attr)
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    duration, count = json.loads(result.stdout.splitlines()[-1])
+    return duration * 1000, count
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    """Measure the import time of each entry point, taking the median of
+    several runs.
+    """
+    timings: Dict[str, Dict[str, float]] = {}
+    all_entry_points: Any = entry_points()
+    for group in ENTRY_POINT_GROUPS:
+        if hasattr(all_entry_points, "select"):
+            group_entry_points = all_entry_points.select(group=group)
+        else:
+            # Python < 3.10
+            group_entry_points = all_entry_points.get(group, [])
+        for ep in group_entry_points:
+            if not ep.value.startswith("spherexlander."):
+                continue
+            module, attr = ep.value.split(":")
+            samples = [measure(module, attr) for _ in range(repeat)]
+            timings[f"{group}:{ep.name}"] = {
+                "import_ms": round(
+                    statistics.median(s[0] for s in samples), 2
+                ),
+                "modules": max(s[1] for s in samples),
+            }
+    return timings
+
+
+def compare(
+    timings: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Find entry points whose import time regressed beyond a tolerance
+    (a fraction of the baseline time, plus 2 ms of measurement noise).
+    """
+    regressions: List[str] = []
+    for name, timing in timings.items():
+        if name not in baseline:
+            continue
+        limit = baseline[name]["import_ms"] * (1 + tolerance) + 2.0
+        if timing["import_ms"] > limit:
+            regressions.append(
+                f"{name}: {timing['import_ms']:.1f} ms "
+                f"(baseline {baseline[name]['import_ms']:.1f} ms)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per entry point."
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Exit with an error if an entry point regressed.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed regression, as a fraction of the baseline.",
+    )
+    parser.add_argument(
+        "--write-baseline",
+        action="store_true",
+        help=f"Write the timings to {BASELINE_PATH.name}.",
+    )
+    args = parser.parse_args()
+
+    timings = run(args.repeat)
+    baseline = (
+        json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    )
+    for name, timing in timings.items():
+        line = (
+            f"{name:45} {timing['import_ms']:7.1f} ms "
+            f"{int(timing['modules']):4d} modules"
+        )
+        if name in baseline:
+            line += f"  (baseline {baseline[name]['import_ms']:.1f} ms)"
+        print(line)
+
+    if args.write_baseline:
+        BASELINE_PATH.write_text(
+            json.dumps(timings, indent=2, sort_keys=True) + "\n"
+        )
+    if args.compare:
+        regressions = compare(timings, baseline, args.tolerance)
+        if regressions:
+            print("Import time regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
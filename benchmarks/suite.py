@@ -0,0 +1,511 @@
+"""Benchmark suite for parsing and building SPHEREx landing pages.
+
+The suite generates synthetic documents (see ``synthetic.py``) at
+realistic and extreme sizes and measures:
+
+- the ``_parse_*`` methods and ``extract_metadata`` of every parser class,
+- parsing whole documents and only their preambles, building the command
+  index, and parsing authors as documents grow,
+- `KVOptionMap.parse` and `convert_tex_span`, and
+- `SpherexTheme.build_site`, from an empty and from an unchanged site,
+  `rerender_site`, which builds a site from its metadata sidecar, and the
+  rebuilds of watch mode after the source or PDF is saved.
+
+Results are written as JSON and can be compared to a baseline::
+
+    python benchmarks/suite.py --output results.json  # save the results
+    python benchmarks/suite.py --quick --compare       # compare to baseline
+    python benchmarks/suite.py --quick --write-baseline
+
+Pass ``--filter`` to run the benchmarks whose names contain a substring.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import partial
+from inspect import Parameter, signature
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from synthetic import DocumentSpec, GeneratedDocument, generate
+
+BASELINE_PATH = Path(__file__).parent.joinpath("suite-baseline.json")
+"""Path of the default baseline results."""
+
+STYLESHEET_PATH = Path(__file__).parent.parent.joinpath(
+    "src", "spherexlander", "themes", "spherex", "site", "spherex.css"
+)
+"""Path of the theme's stylesheet."""
+
+PARSER_CLASSES = {
+    "MS": ("pipelinemodule", "SpherexPipelineModuleParser"),
+    "PM": ("projectmanagement", "SpherexProjectManagementParser"),
+    "IF": ("ssdcif", "SpherexSsdcIfParser"),
+    "DP": ("ssdcdp", "SpherexSsdcDpParser"),
+    "TR": ("ssdctr", "SpherexSsdcTrParser"),
+    "OP": ("ssdcop", "SpherexSsdcOpParser"),
+    "TN": ("ssdctn", "SpherexSsdcTnParser"),
+}
+"""Parser classes for each document type, as (package, class name)."""
+
+SCALING_SPECS = {
+    "realistic": DocumentSpec(authors=5, body_size=50_000, input_depth=3),
+    "authors-1": DocumentSpec(authors=1),
+    "authors-200": DocumentSpec(authors=200),
+    "body-10kb": DocumentSpec(body_size=10_000),
+    "body-1mb": DocumentSpec(body_size=1_000_000, input_depth=5),
+    "body-20mb": DocumentSpec(
+        body_size=20_000_000, input_depth=20, pdf_size=20_000_000
+    ),
+    "inputs-deep": DocumentSpec(body_size=200_000, input_depth=60),
+}
+"""Documents for the benchmarks of how parsing and building scale."""
+
+QUICK_SKIP = {"body-20mb"}
+"""Documents that are skipped by ``--quick`` runs."""
+
+
+@dataclass
+class Benchmark:
+    """A benchmark of a function."""
+
+    name: str
+    """Name of the benchmark, such as ``extract_metadata/MS``."""
+
+    func: Callable[[], Any]
+    """The function to time."""
+
+    setup: Optional[Callable[[], Any]] = None
+    """A function that runs, untimed, before each run of ``func``."""
+
+    repeat: Optional[int] = None
+    """Number of runs, overriding the suite's default."""
+
+
+def time_benchmark(benchmark: Benchmark, repeat: int) -> Dict[str, float]:
+    """Run a benchmark and summarize its timings, in seconds."""
+    timings: List[float] = []
+    for _ in range(benchmark.repeat or repeat):
+        if benchmark.setup is not None:
+            benchmark.setup()
+        start = time.perf_counter()
+        benchmark.func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "runs": len(timings),
+    }
+
+
+def create_parser(
+    document: GeneratedDocument,
+    output_dir: Path,
+    *,
+    preamble_only: bool = False,
+) -> Any:
+    """Create the parser for a generated document (which extracts its
+    metadata), optionally in the preamble-only mode.
+    """
+    from importlib import import_module
+
+    from lander.settings import BuildSettings, DownloadableFile
+
+    package, class_name = PARSER_CLASSES[document.spec.kind]
+    parser_class = getattr(
+        import_module(f"spherexlander.parsers.{package}"), class_name
+    )
+    settings = BuildSettings(
+        source_path=document.source_path,
+        pdf=DownloadableFile.load(document.pdf_path),
+        parser=document.parser,
+        theme="spherex",
+        output_dir=output_dir,
+        canonical_url="https://spherex-docs.ipac.caltech.edu/SSDC-MS-001/",
+    )
+    os.environ["SPHEREX_LANDER_PARSE_PREAMBLE_ONLY"] = str(preamble_only)
+    try:
+        return parser_class(settings=settings)
+    finally:
+        del os.environ["SPHEREX_LANDER_PARSE_PREAMBLE_ONLY"]
+
+
+def reset_parser_caches(parser: Any) -> None:
+    """Clear a parser's cached TeX span conversions, so that they are
+    included in the timing of the next parse.
+    """
+    parser.__dict__.pop("_tex_span_conversions", None)
+
+
+def parser_benchmarks(work_dir: Path) -> Iterator[Benchmark]:
+    """Benchmarks of each parser class on a realistic document."""
+    for kind in PARSER_CLASSES:
+        document = generate(
+            DocumentSpec(kind=kind, body_size=50_000, input_depth=3),
+            work_dir / f"parser-{kind}",
+        )
+        parser = create_parser(document, work_dir / "_build")
+
+        yield Benchmark(
+            f"parser_init/{kind}",
+            partial(create_parser, document, work_dir / "_build"),
+        )
+        yield Benchmark(
+            f"extract_metadata/{kind}",
+            parser.extract_metadata,
+            setup=partial(reset_parser_caches, parser),
+        )
+        for name in sorted(dir(parser)):
+            method = getattr(parser, name)
+            if name.startswith("_parse_") and not _has_required_args(method):
+                yield Benchmark(
+                    f"parse_method/{kind}/{name}",
+                    method,
+                    setup=partial(reset_parser_caches, parser),
+                )
+
+
+def _has_required_args(method: Callable[..., Any]) -> bool:
+    return any(
+        p.default is Parameter.empty
+        for p in signature(method).parameters.values()
+    )
+
+
+def scaling_benchmarks(work_dir: Path, quick: bool) -> Iterator[Benchmark]:
+    """Benchmarks of parsing and site building as documents grow."""
+    from spherexlander.batch import BatchJob
+    from spherexlander.parsers.pdfinspect import inspect_pdf
+    from spherexlander.sidecar import rerender_site
+    from spherexlander.themes.spherex import SpherexTheme
+    from spherexlander.watch import WatchSession
+
+    for name, spec in SCALING_SPECS.items():
+        if quick and name in QUICK_SKIP:
+            continue
+        document = generate(spec, work_dir / f"scaling-{name}")
+        repeat = 3 if spec.body_size > 5_000_000 else None
+        parser = create_parser(document, work_dir / "_build")
+
+        yield Benchmark(
+            f"parser_init/{name}",
+            partial(create_parser, document, work_dir / "_build"),
+            repeat=repeat,
+        )
+        yield Benchmark(
+            f"parser_init_preamble/{name}",
+            partial(
+                create_parser,
+                document,
+                work_dir / "_build",
+                preamble_only=True,
+            ),
+            repeat=repeat,
+        )
+        yield Benchmark(
+            f"command_index/{name}",
+            partial(getattr, parser, "command_index"),
+            setup=partial(parser.__dict__.pop, "command_index", None),
+            repeat=repeat,
+        )
+        yield Benchmark(
+            f"inspect_pdf/{name}",
+            partial(inspect_pdf, document.pdf_path),
+        )
+        yield Benchmark(
+            f"parse_authors/{name}",
+            parser._parse_authors,
+            setup=partial(reset_parser_caches, parser),
+        )
+
+        site_dir = work_dir / f"site-{name}"
+        theme = SpherexTheme(
+            metadata=parser.metadata, settings=parser.settings
+        )
+        yield Benchmark(
+            f"build_site/{name}",
+            partial(theme.build_site, site_dir),
+            setup=partial(shutil.rmtree, site_dir, ignore_errors=True),
+            repeat=repeat,
+        )
+        # The site from the last run of the previous benchmark is unchanged
+        yield Benchmark(
+            f"build_site_unchanged/{name}",
+            partial(theme.build_site, site_dir),
+            repeat=repeat,
+        )
+        yield Benchmark(
+            f"rerender_site/{name}",
+            partial(rerender_site, site_dir),
+            repeat=repeat,
+        )
+
+        # Rebuilds in watch mode, after the source was saved and after only
+        # the PDF was saved
+        session = WatchSession(
+            BatchJob(
+                source_path=document.source_path,
+                pdf=document.pdf_path,
+                parser=document.parser,
+                output_dir=work_dir / f"watch-{name}",
+            )
+        )
+        session.build()
+        yield Benchmark(
+            f"watch_rebuild/{name}",
+            partial(session.build, [document.source_path]),
+            setup=partial(os.utime, document.source_path),
+            repeat=repeat,
+        )
+        yield Benchmark(
+            f"watch_rebuild_pdf/{name}",
+            partial(session.build, [document.pdf_path]),
+            setup=partial(os.utime, document.pdf_path),
+            repeat=repeat,
+        )
+
+
+def function_benchmarks() -> Iterator[Benchmark]:
+    """Benchmarks of `KVOptionMap.parse`, `convert_tex_span`, and pruning
+    the theme's stylesheet to a page's critical CSS.
+    """
+    from spherexlander.cache import open_cache
+    from spherexlander.parsers.spherexparser import KVOptionMap
+    from spherexlander.parsers.texconvert import convert_tex_span
+    from spherexlander.themes.spherex.criticalcss import Stylesheet
+
+    short_options = "email=galileo@example.com"
+    long_options = ",".join(f"key{i}=value{i}" for i in range(200))
+    yield Benchmark(
+        "kvoptionmap_parse/short",
+        lambda: [KVOptionMap.parse(short_options) for _ in range(1000)],
+    )
+    yield Benchmark(
+        "kvoptionmap_parse/long",
+        lambda: [KVOptionMap.parse(long_options) for _ in range(100)],
+    )
+
+    simple_span = 'Fran\\c{c}ois~M\\"uller'
+    yield Benchmark(
+        "convert_tex_span/simple",
+        lambda: [convert_tex_span(simple_span) for _ in range(1000)],
+    )
+
+    pandoc_span = "Galileo Galilei\\textsuperscript{1}"
+    yield Benchmark(
+        "convert_tex_span/cached",
+        lambda: [convert_tex_span(pandoc_span) for _ in range(100)],
+        setup=lambda: convert_tex_span(pandoc_span),
+    )
+
+    def clear_conversion_cache() -> None:
+        cache = open_cache("texconvert")
+        if cache is not None:
+            cache.clear()
+
+    yield Benchmark(
+        "convert_tex_span/pandoc",
+        lambda: convert_tex_span(pandoc_span),
+        setup=clear_conversion_cache,
+    )
+
+    css = STYLESHEET_PATH.read_text()
+    stylesheet = Stylesheet.parse(css)
+    page_features = frozenset(
+        {"html", "body", "main", "a", "h1", "ul", "li", "dd", "dt", "code"}
+        | {".comma-list", ".spherex-author-list", ".lander-info-sidebar"}
+    )
+    yield Benchmark("critical_css/parse", partial(Stylesheet.parse, css))
+    yield Benchmark(
+        "critical_css/prune",
+        partial(stylesheet.critical_css, page_features),
+        setup=stylesheet._critical.clear,
+    )
+
+
+def placement_benchmarks(work_dir: Path, quick: bool) -> Iterator[Benchmark]:
+    """Benchmarks of placing a large PDF into a site with each strategy, and
+    of placing many attachments with and without threads.
+    """
+    from lander.settings import DownloadableFile
+
+    from spherexlander.attachments import place_downloads
+    from spherexlander.placement import PlacementStrategy, place_file
+
+    source = work_dir / "placement" / "large.pdf"
+    source.parent.mkdir(parents=True, exist_ok=True)
+    source.write_bytes(os.urandom((16 if quick else 200) * 1024 * 1024))
+    destination = work_dir / "placement-site" / "large.pdf"
+    for strategy in PlacementStrategy:
+        yield Benchmark(
+            f"place_file/{strategy.value}",
+            partial(place_file, source, destination, strategy),
+            setup=partial(shutil.rmtree, destination.parent, True),
+        )
+    yield Benchmark(
+        "place_file_unchanged/copy",
+        partial(place_file, source, destination, PlacementStrategy.copy),
+    )
+
+    attachment_dir = work_dir / "placement" / "attachments"
+    attachment_dir.mkdir(exist_ok=True)
+    downloadables = []
+    for i in range(50):
+        path = attachment_dir / f"table-{i:02d}.csv"
+        path.write_bytes(os.urandom(256 * 1024))
+        downloadables.append(DownloadableFile.load(path))
+    site_dir = work_dir / "placement-attachments"
+    for threads in (1, 8):
+        yield Benchmark(
+            f"place_downloads/{threads}",
+            partial(
+                place_downloads,
+                downloadables,
+                site_dir,
+                strategy=PlacementStrategy.copy,
+                max_workers=threads,
+            ),
+            setup=partial(shutil.rmtree, site_dir, True),
+        )
+
+
+def collect_metadata() -> Dict[str, Any]:
+    """Describe the environment of a benchmark run."""
+    import lander
+    import pypandoc
+
+    import spherexlander
+
+    try:
+        pandoc_version = pypandoc.get_pandoc_version()
+    except OSError:
+        pandoc_version = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "spherexlander": spherexlander.__version__,
+        "lander": lander.__version__,
+        "pandoc": pandoc_version,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Find benchmarks whose median time regressed beyond a tolerance (a
+    fraction of the baseline time, plus 1 ms of measurement noise).
+    """
+    regressions: List[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limit = baseline[name]["median"] * (1 + tolerance) + 0.001
+        if result["median"] > limit:
+            regressions.append(
+                f"{name}: {result['median'] * 1000:.2f} ms "
+                f"(baseline {baseline[name]['median'] * 1000:.2f} ms)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark parsing and building SPHEREx landing pages."
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Path of the JSON results."
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE_PATH,
+        help="Path of the baseline results.",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Exit with an error if a benchmark regressed.",
+    )
+    parser.add_argument(
+        "--write-baseline",
+        action="store_true",
+        help="Write the results as the baseline.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed regression, as a fraction of the baseline.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Runs per benchmark."
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Skip the largest documents.",
+    )
+    parser.add_argument(
+        "--filter", help="Run the benchmarks whose names contain this."
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        # Isolate the on-disk caches from the user's caches.
+        os.environ["SPHEREX_LANDER_CACHE_DIR"] = str(work_dir / "cache")
+
+        benchmarks = chain(
+            function_benchmarks(),
+            parser_benchmarks(work_dir),
+            scaling_benchmarks(work_dir, args.quick),
+            placement_benchmarks(work_dir, args.quick),
+        )
+        results: Dict[str, Dict[str, float]] = {}
+        for benchmark in benchmarks:
+            if args.filter and args.filter not in benchmark.name:
+                continue
+            results[benchmark.name] = time_benchmark(benchmark, args.repeat)
+            print(
+                f"{benchmark.name:60} "
+                f"{results[benchmark.name]['median'] * 1000:10.2f} ms",
+                flush=True,
+            )
+
+    report = json.dumps(
+        {"metadata": collect_metadata(), "results": results}, indent=2
+    )
+    if args.output:
+        args.output.write_text(report + "\n")
+    if args.write_baseline:
+        args.baseline.write_text(report + "\n")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions compared to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Generate synthetic SPHEREx documents for benchmarks.
+
+The documents use the same metadata commands as real SPHEREx documents,
+but the number of authors, the size of the body, and the depth of the
+``\\input`` tree are configurable so that parsing and site building can be
+measured at realistic and extreme sizes.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+__all__ = ["DOCUMENT_KINDS", "DocumentSpec", "GeneratedDocument", "generate"]
+
+DOCUMENT_KINDS: Dict[str, str] = {
+    "MS": "spherex-ssdc-ms",
+    "PM": "spherex-ssdc-pm",
+    "IF": "spherex-ssdc-if",
+    "DP": "spherex-ssdc-dp",
+    "TR": "spherex-ssdc-tr",
+    "OP": "spherex-ssdc-op",
+    "TN": "spherex-ssdc-tn",
+}
+"""Document types (the ``spherex`` class option) and the names of their
+parsers.
+"""
+
+KIND_PREAMBLES: Dict[str, str] = {
+    "MS": (
+        "\\modulename{Perform Forced Photometry}\n"
+        "\\pipelevel{L3}\n"
+        "\\diagramindex{2}\n"
+        "\\difficulty{High}\n"
+    ),
+    "IF": "\\interfacepartner{Infrared Processing and Analysis Center}\n",
+    "TR": (
+        "\\VADoorsID[https://example.org/12345]{12345}\n"
+        "\\ReqDoorsID[https://example.org/67890]{67890}\n"
+        "\\IPACJiraID{SVV-999}\n"
+    ),
+}
+"""Preamble commands specific to each document type."""
+
+FIRST_NAMES = [
+    "Galileo",
+    "Ren\\'ee",
+    'J\\"org',
+    "Fran\\c{c}ois",
+    "Ursula",
+    "Efren",
+    "Stephanie",
+    'Zo\\"e',
+    'Bj{\\"o}rn',
+    "Isaac",
+]
+"""First names of synthetic authors, with common TeX accents."""
+
+LAST_NAMES = [
+    "Galilei",
+    "Gomez",
+    "Carrillo",
+    "Lowe",
+    "Archer",
+    'M\\"uller',
+    "Nu\\~nez",
+    "Dvo\\v{r}\\'ak",
+    "O'Brien",
+    "Newton",
+]
+"""Last names of synthetic authors, with common TeX accents."""
+
+WORDS = (
+    "spectral photometry pipeline calibration detector flux exposure "
+    "astrometry catalog wavelength survey module source background noise "
+    "frame pixel image model residual uncertainty the of and with for in"
+).split()
+"""Words for the body text."""
+
+
+@dataclass
+class DocumentSpec:
+    """Parameters of a synthetic document."""
+
+    kind: str = "MS"
+    """Document type (a key of `DOCUMENT_KINDS`)."""
+
+    authors: int = 5
+    """Number of authors in the ``\\author`` command."""
+
+    body_size: int = 10_000
+    """Approximate size of the document body, in bytes."""
+
+    input_depth: int = 1
+    """Depth of the chain of ``\\input`` files that make up the body."""
+
+    pdf_size: int = 100_000
+    """Approximate size of the PDF, in bytes."""
+
+    seed: int = 0
+    """Seed of the random number generator for the body text."""
+
+
+@dataclass
+class GeneratedDocument:
+    """Paths of a generated document."""
+
+    spec: DocumentSpec
+    source_path: Path
+    pdf_path: Path
+    parser: str
+    files: List[Path] = field(default_factory=list)
+
+
+def generate(spec: DocumentSpec, directory: Path) -> GeneratedDocument:
+    """Write a synthetic document into a directory.
+
+    The root file inputs ``meta.tex`` and then the first of
+    ``spec.input_depth`` section files. Each section file holds an equal
+    part of the body and inputs the next section file.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    handle = f"SSDC-{spec.kind}-001"
+    files: List[Path] = []
+
+    meta_path = directory / "meta.tex"
+    meta_path.write_text(
+        "% AUTO-GENERATED by Makefile\n"
+        "\\newcommand{\\vcsRevision}{15d2351}\n"
+        "\\newcommand{\\vcsDate}{2023-01-10}\n"
+    )
+    files.append(meta_path)
+
+    section_dir = directory / "sections"
+    section_dir.mkdir(exist_ok=True)
+    depth = max(spec.input_depth, 1)
+    part_size = spec.body_size // depth
+    for index in range(depth):
+        text = _body_text(rng, part_size, index)
+        if index + 1 < depth:
+            text += f"\n\\input{{sections/part-{index + 1}}}\n"
+        path = section_dir / f"part-{index}.tex"
+        path.write_text(text)
+        files.append(path)
+
+    source_path = directory / f"{handle}.tex"
+    source_path.write_text(
+        f"\\documentclass[{spec.kind}]{{spherex}}\n\n"
+        "\\input{meta}\n\n"
+        f"\\spherexHandle{{{handle}}}\n"
+        "\\title{A Synthetic Document for Benchmarks}\n"
+        "\\version{1.1}\n"
+        + KIND_PREAMBLES.get(spec.kind, "")
+        + "\\approved{2021-01-01}{Edwin Hubble}\n\n"
+        "\\spherexlead[email=ursula@example.com]{Ursula Gomez}\n"
+        "\\ipaclead[email=francis@example.com]{Fran\\c{c}ois Carrillo}\n\n"
+        + _author_command(rng, spec.authors)
+        + "\n\\begin{document}\n\\maketitle\n\n"
+        "\\input{sections/part-0}\n\n"
+        "\\end{document}\n"
+    )
+    files.insert(0, source_path)
+
+    pdf_path = directory / f"{handle}.pdf"
+    pdf_path.write_bytes(_pdf(spec.pdf_size))
+    files.append(pdf_path)
+
+    return GeneratedDocument(
+        spec=spec,
+        source_path=source_path,
+        pdf_path=pdf_path,
+        parser=DOCUMENT_KINDS[spec.kind],
+        files=files,
+    )
+
+
+def _author_command(rng: random.Random, count: int) -> str:
+    people = []
+    for index in range(count):
+        name = f"{rng.choice(FIRST_NAMES)}~{rng.choice(LAST_NAMES)}"
+        if index % 2 == 0:
+            people.append(
+                f"  \\person[email=author{index}@example.com]{{{name}}}"
+            )
+        else:
+            people.append(f"  \\person{{{name}}}")
+    return "\\author{\n" + " \\\\\n".join(people) + "\n}\n"
+
+
+def _body_text(rng: random.Random, size: int, index: int) -> str:
+    """Generate body text with sections, markup, and math."""
+    chunks: List[str] = [f"\\section{{Part {index}}}\n\n"]
+    length = len(chunks[0])
+    paragraph = 0
+    while length < size:
+        paragraph += 1
+        words = [rng.choice(WORDS) for _ in range(rng.randint(40, 120))]
+        words[rng.randrange(len(words))] = "\\textbf{important}"
+        words[rng.randrange(len(words))] = f"\\cite{{ref{paragraph}}}"
+        words[rng.randrange(len(words))] = "$f_\\nu = \\alpha^{2}$"
+        text = " ".join(words) + ".\n\n"
+        if paragraph % 10 == 0:
+            text = f"\\subsection{{Topic {paragraph}}}\n\n" + text
+        if paragraph % 25 == 0:
+            text += (
+                "\\begin{equation}\n"
+                "  \\chi^2 = \\sum_i \\frac{(d_i - m_i)^2}{\\sigma_i^2}\n"
+                "\\end{equation}\n\n"
+            )
+        chunks.append(text)
+        length += len(text)
+    return "".join(chunks)
+
+
+def _pdf(size: int) -> bytes:
+    """Generate a minimal one-page PDF, padded to approximately ``size``
+    bytes with a content stream.
+    """
+    padding = b"% " + b"x" * max(size - 600, 0) + b"\n"
+    stream = b"BT /F1 12 Tf 72 720 Td (Synthetic) Tj ET\n" + padding
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"endstream",
+    ]
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += (
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref_offset)
+    )
+    return bytes(output)
@@ -0,0 +1,205 @@
+"""The PDF and attachments that a landing page offers for download.
+
+Batch builds expand the glob patterns of the attachments that a batch
+manifest or a discovered ``lander.yaml`` file lists (see
+`expand_attachments` and `spherexlander.batch.BatchJob.load_settings`);
+Lander itself only accepts paths. When a site is built, `place_downloads`
+places the PDF and attachments into the site concurrently, with a bounded
+pool of threads, and returns a `DownloadRecord` with the size, SHA-256
+hash, and MIME type of each file, which the landing page shows.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from lander.settings import DownloadableFile
+
+if TYPE_CHECKING:
+    from .incremental import FileFingerprint
+    from .placement import PlacedFile, PlacementStrategy
+
+__all__ = ["DownloadRecord", "expand_attachments", "place_downloads"]
+
+logger = getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+"""Size of the chunks, in bytes, in which files are read for hashing."""
+
+
+class DownloadRecord(DownloadableFile):
+    """A file that was placed into a site for download, with its hash."""
+
+    sha256: str
+    """SHA-256 hash of the file's content."""
+
+
+def expand_attachments(patterns: Iterable[str], base_dir: Path) -> List[Path]:
+    """Expand the paths and glob patterns of attachments.
+
+    Parameters
+    ----------
+    patterns
+        Paths or glob patterns (such as ``tables/*.csv`` or ``data/**/*``),
+        relative to ``base_dir`` unless they are absolute.
+    base_dir
+        The directory of the settings file that lists the attachments.
+
+    Returns
+    -------
+    list of pathlib.Path
+        The attachments' paths, in the order of the patterns, with the
+        matches of each pattern sorted. Patterns that match directories
+        only contribute the files in them, and a file is only listed once.
+    """
+    paths: List[Path] = []
+    for pattern in patterns:
+        path = base_dir.joinpath(pattern)
+        if not glob.has_magic(str(pattern)):
+            # A path that doesn't exist is reported by the settings' model
+            matches = [path]
+        else:
+            matches = [
+                Path(p)
+                for p in sorted(glob.glob(str(path), recursive=True))
+                if Path(p).is_file()
+            ]
+            if not matches:
+                logger.warning("No attachments match %s", path)
+        for match in matches:
+            if match not in paths:
+                paths.append(match)
+    return paths
+
+
+def place_downloads(
+    downloadables: List[DownloadableFile],
+    output_dir: Path,
+    *,
+    strategy: Optional[PlacementStrategy] = None,
+    known_files: Optional[Dict[str, FileFingerprint]] = None,
+    max_workers: Optional[int] = None,
+) -> List[Tuple[DownloadRecord, PlacedFile]]:
+    """Place files into a site concurrently, unless they are unchanged,
+    and hash them.
+
+    Parameters
+    ----------
+    downloadables
+        The PDF and attachments.
+    output_dir
+        The site's output directory.
+    strategy
+        How to place the files (see `spherexlander.placement.place_file`).
+    known_files
+        Hashes of files from a previous build, keyed by their resolved
+        paths. Files with the same size and modification time aren't read
+        again to hash them.
+    max_workers
+        Maximum number of threads. The default is the configured number
+        (see `spherexlander.config.PluginConfig.placement_threads`).
+
+    Returns
+    -------
+    list
+        A record of each file, with how it was placed, in the order of
+        ``downloadables``.
+
+    Raises
+    ------
+    ValueError
+        Raised if two files have the same name (such as ``a/t.csv`` and
+        ``b/t.csv`` from a recursive glob pattern, or an attachment named
+        like the PDF), since files are placed at their names in the site.
+        Nothing is placed.
+    """
+    _check_names(downloadables)
+    if max_workers is None:
+        from .config import load_config
+
+        max_workers = load_config().placement_threads
+
+    def place(
+        downloadable: DownloadableFile,
+    ) -> Tuple[DownloadRecord, PlacedFile]:
+        return _place_download(
+            downloadable, output_dir, strategy, known_files or {}
+        )
+
+    if max_workers <= 1 or len(downloadables) <= 1:
+        return [place(d) for d in downloadables]
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(downloadables)),
+        thread_name_prefix="place-downloads",
+    ) as executor:
+        return list(executor.map(place, downloadables))
+
+
+def _check_names(downloadables: List[DownloadableFile]) -> None:
+    """Check that no two files would be placed at the same path."""
+    sources: Dict[str, Path] = {}
+    for downloadable in downloadables:
+        other = sources.get(downloadable.name)
+        if other is not None:
+            raise ValueError(
+                f"Two downloads would be placed at {downloadable.name} in "
+                f"the site ({other} and {downloadable.file_path}); rename "
+                "one of them or remove it from the attachments."
+            )
+        sources[downloadable.name] = downloadable.file_path
+
+
+def _place_download(
+    downloadable: DownloadableFile,
+    output_dir: Path,
+    strategy: Optional[PlacementStrategy],
+    known_files: Dict[str, FileFingerprint],
+) -> Tuple[DownloadRecord, PlacedFile]:
+    """Place and hash a file."""
+    from .placement import place_file
+    from .tracing import span
+
+    with span(
+        "copy_download",
+        "copy",
+        file=downloadable.name,
+        bytes=downloadable.size,
+    ):
+        placed = place_file(
+            downloadable.file_path,
+            output_dir.joinpath(downloadable.name),
+            strategy,
+        )
+        if placed.sha256 is None:
+            known = known_files.get(str(downloadable.file_path.resolve()))
+            if (
+                known is not None
+                and known.size == placed.size
+                and known.mtime_ns == placed.mtime_ns
+            ):
+                placed.sha256 = known.sha256
+            else:
+                placed.sha256 = _hash_file(downloadable.file_path)
+    record = DownloadRecord(
+        file_path=downloadable.file_path,
+        name=downloadable.name,
+        mimetype=downloadable.mimetype,
+        extension=downloadable.extension,
+        # The size is from the same pass as the placement
+        size=placed.size,
+        sha256=placed.sha256,
+    )
+    return record, placed
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
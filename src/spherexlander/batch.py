@@ -0,0 +1,478 @@
+"""Batch builds of many SPHEREx landing pages with a process pool."""
+
+from __future__ import annotations
+
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from functools import partial
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import yaml
+from lander.settings import BuildSettings, DownloadableFile
+from pydantic import BaseModel, Field
+
+from .catalogue import record_site
+from .incremental import is_up_to_date
+from .metrics import (
+    BATCH_SECONDS,
+    BATCH_TIMESTAMP,
+    DOCUMENTS,
+    REGISTRY,
+    MetricsRegistry,
+)
+from .sidecar import MetadataSidecar, rerender_site, sidecar_path
+
+__all__ = [
+    "BatchJob",
+    "BatchReport",
+    "BuildStatus",
+    "DocumentResult",
+    "discover_jobs",
+    "init_worker",
+    "load_manifest",
+    "rerender_document",
+    "run_batch",
+    "run_rerender",
+]
+
+logger = getLogger(__name__)
+
+SETTINGS_FILENAME = "lander.yaml"
+"""Name of the Lander settings file in a document's repository."""
+
+AUTO_PARSER = "spherex"
+"""Name of the parsing plugin that detects the type of a document."""
+
+T = TypeVar("T")
+
+
+class BatchJob(BaseModel):
+    """A document to build in a batch."""
+
+    source_path: Path
+    """Path to the root TeX source file."""
+
+    pdf: Path
+    """Path to the PDF to display on the landing page."""
+
+    output_dir: Path
+    """Directory where the landing page site is built."""
+
+    parser: str = AUTO_PARSER
+    """Name of the parsing plugin. The default detects the document's type
+    (see `spherexlander.parsers.auto`).
+    """
+
+    theme: str = "spherex"
+    """Name of the theme plugin."""
+
+    canonical_url: Optional[str] = None
+    """The canonical URL where the landing page is hosted."""
+
+    settings_path: Optional[Path] = None
+    """Path to the document's ``lander.yaml`` file, if any, which provides
+    the settings (such as attachments) that the job does not override.
+    """
+
+    attachments: Optional[List[str]] = None
+    """Paths or glob patterns of the files to attach to the landing page
+    (see `spherexlander.attachments.expand_attachments`), which override
+    the attachments of the ``lander.yaml`` file.
+    """
+
+    def load_settings(self) -> BuildSettings:
+        """Create the Lander build settings for this document.
+
+        Unlike `lander.settings.BuildSettings.load`, the settings are never
+        read from a ``lander.yaml`` file in the current working directory,
+        which would otherwise apply to every document in the batch.
+        """
+        from .attachments import expand_attachments
+
+        data: Dict[str, Any] = {}
+        if self.settings_path is not None:
+            data = yaml.safe_load(self.settings_path.read_text()) or {}
+            project_dir = self.settings_path.parent
+            if "attachments" in data:
+                data["attachments"] = [
+                    DownloadableFile.load(p)
+                    for p in expand_attachments(
+                        data["attachments"], project_dir
+                    )
+                ]
+        if self.attachments is not None:
+            data["attachments"] = [
+                DownloadableFile.load(p)
+                for p in expand_attachments(self.attachments, Path.cwd())
+            ]
+        data["source_path"] = self.source_path
+        data["pdf"] = DownloadableFile.load(self.pdf)
+        data["parser"] = self.parser
+        data["theme"] = self.theme
+        data["output_dir"] = self.output_dir
+        if self.canonical_url:
+            data["canonical_url"] = self.canonical_url
+        return BuildSettings.parse_obj(data)
+
+
+def load_manifest(path: Path) -> List[BatchJob]:
+    """Load batch jobs from a YAML manifest file.
+
+    The manifest has a ``documents`` key with a list of documents. Each
+    document has ``source``, ``pdf``, and ``output`` keys, and optionally
+    ``parser``, ``theme``, ``url`` (the canonical URL), and ``attachments``
+    keys. Without a ``parser`` key, the document's type is detected.
+    Attachments are paths or glob patterns. Relative paths are relative to
+    the manifest's directory::
+
+        documents:
+          - source: ssdc-ms-001/SSDC-MS-001.tex
+            pdf: ssdc-ms-001/SSDC-MS-001.pdf
+            parser: spherex-ssdc-ms
+            output: _build/ssdc-ms-001
+            attachments:
+              - ssdc-ms-001/tables/*.csv
+    """
+    data = yaml.safe_load(path.read_text()) or {}
+    root_dir = path.parent
+    jobs: List[BatchJob] = []
+    for document in data.get("documents", []):
+        job_data: Dict[str, Any] = {
+            "source_path": root_dir.joinpath(document["source"]),
+            "pdf": root_dir.joinpath(document["pdf"]),
+            "parser": document.get("parser", AUTO_PARSER),
+            "output_dir": root_dir.joinpath(document["output"]),
+        }
+        if "theme" in document:
+            job_data["theme"] = document["theme"]
+        if "url" in document:
+            job_data["canonical_url"] = document["url"]
+        if "attachments" in document:
+            job_data["attachments"] = [
+                str(root_dir.joinpath(p)) for p in document["attachments"]
+            ]
+        jobs.append(BatchJob(**job_data))
+    return jobs
+
+
+def discover_jobs(root_dir: Path, output_root: Path) -> List[BatchJob]:
+    """Discover batch jobs from the ``lander.yaml`` files in a directory
+    tree.
+
+    Parameters
+    ----------
+    root_dir
+        Directory to search for ``lander.yaml`` files.
+    output_root
+        Directory where sites are built. Each site is built in the same
+        relative path as its ``lander.yaml`` file's directory.
+    """
+    jobs: List[BatchJob] = []
+    for settings_path in sorted(root_dir.rglob(SETTINGS_FILENAME)):
+        data = yaml.safe_load(settings_path.read_text()) or {}
+        project_dir = settings_path.parent
+        try:
+            job = BatchJob(
+                source_path=project_dir.joinpath(data["source_path"]),
+                pdf=project_dir.joinpath(data["pdf"]),
+                parser=data.get("parser", AUTO_PARSER),
+                theme=data.get("theme", "spherex"),
+                canonical_url=data.get("canonical_url"),
+                output_dir=output_root.joinpath(
+                    project_dir.relative_to(root_dir)
+                ),
+                settings_path=settings_path,
+            )
+        except KeyError as e:
+            logger.warning("Skipping %s; missing the %s key", settings_path, e)
+            continue
+        jobs.append(job)
+    return jobs
+
+
+class BuildStatus(str, Enum):
+    """The outcome of building a document."""
+
+    built = "built"
+    skipped = "skipped"
+    failed = "failed"
+
+
+class DocumentResult(BaseModel):
+    """The result of building a document in a batch."""
+
+    source_path: Path
+    """Path to the root TeX source file."""
+
+    output_dir: Path
+    """Directory where the landing page site is built."""
+
+    parser: str
+    """Name of the parsing plugin. For jobs whose document type is detected
+    (see `AUTO_PARSER`), this is the plugin of the detected type, such as
+    ``spherex-ssdc-ms``.
+    """
+
+    status: BuildStatus
+    """The outcome of the build."""
+
+    duration: float
+    """Time spent building the document, in seconds."""
+
+    error: Optional[str] = None
+    """The error message, if the build failed."""
+
+    traceback: Optional[str] = None
+    """The traceback of the error, if the build failed."""
+
+
+class BatchReport(BaseModel):
+    """A summary of a batch build."""
+
+    results: List[DocumentResult] = Field(default_factory=list)
+    """Results for each document, in the order of the jobs."""
+
+    duration: float = 0.0
+    """Wall time of the batch build, in seconds."""
+
+    metrics: Dict[str, Any] = Field(default_factory=dict)
+    """The build metrics, merged from every document, as a snapshot of a
+    `spherexlander.metrics.MetricsRegistry`.
+    """
+
+    @classmethod
+    def create(
+        cls,
+        measured: List[Tuple[DocumentResult, Dict[str, Any]]],
+        duration: float,
+    ) -> BatchReport:
+        """Create the report from the results and metrics snapshots of each
+        document, merging the metrics.
+        """
+        registry = MetricsRegistry()
+        documents = registry.like(DOCUMENTS)
+        for result, snapshot in measured:
+            registry.merge(snapshot)
+            documents.inc(parser=result.parser, status=result.status.value)
+        registry.like(BATCH_SECONDS).set(duration)
+        registry.like(BATCH_TIMESTAMP).set(time.time())
+        return cls(
+            results=[result for result, _ in measured],
+            duration=duration,
+            metrics=registry.snapshot(),
+        )
+
+    @property
+    def failed(self) -> List[DocumentResult]:
+        """Results for documents that failed to build."""
+        return [r for r in self.results if r.status == BuildStatus.failed]
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Number of documents with each build status."""
+        return {
+            status.value: len([r for r in self.results if r.status == status])
+            for status in BuildStatus
+        }
+
+    def format_summary(self) -> str:
+        """Format a human-readable summary of the batch."""
+        lines = [
+            f"Processed {len(self.results)} documents in "
+            f"{self.duration:.1f} s: "
+            + ", ".join(f"{n} {s}" for s, n in self.counts.items())
+        ]
+        for result in self.failed:
+            lines.append(f"  FAILED {result.source_path}: {result.error}")
+        return "\n".join(lines)
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    *,
+    max_workers: Optional[int] = None,
+    force: bool = False,
+) -> BatchReport:
+    """Build the landing pages for many documents in parallel.
+
+    Parameters
+    ----------
+    jobs
+        The documents to build.
+    max_workers
+        Number of worker processes. The default is the number of CPUs. If
+        ``1``, documents are built serially in the current process.
+    force
+        If `True`, build every document. Otherwise, documents whose sites
+        are up to date (see `spherexlander.incremental.is_up_to_date`) are
+        skipped.
+
+    Returns
+    -------
+    BatchReport
+        The results for each document, and the build metrics (see
+        `spherexlander.metrics`). A document that fails to build does not
+        affect the other documents.
+    """
+    start = time.perf_counter()
+    build = partial(_measure, partial(build_document, force=force))
+    if max_workers == 1:
+        init_worker()
+        measured = [build(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker
+        ) as executor:
+            measured = list(executor.map(build, jobs))
+    return BatchReport.create(measured, time.perf_counter() - start)
+
+
+def run_rerender(
+    output_dirs: List[Path], *, max_workers: Optional[int] = None
+) -> BatchReport:
+    """Render many sites again from their metadata sidecars, in parallel,
+    without parsing their documents (see `spherexlander.sidecar`).
+
+    Use this to apply changes to the theme's templates and stylesheets.
+
+    Parameters
+    ----------
+    output_dirs
+        The sites' output directories.
+    max_workers
+        Number of worker processes. The default is the number of CPUs. If
+        ``1``, sites are rendered serially in the current process.
+
+    Returns
+    -------
+    BatchReport
+        The results for each site, and the build metrics.
+    """
+    start = time.perf_counter()
+    rerender = partial(_measure, rerender_document)
+    if max_workers == 1:
+        init_worker()
+        measured = [rerender(d) for d in output_dirs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker
+        ) as executor:
+            measured = list(executor.map(rerender, output_dirs))
+    return BatchReport.create(measured, time.perf_counter() - start)
+
+
+def init_worker() -> None:
+    """Load the Lander plugins once per worker process.
+
+    This is the initializer of the process pools of batch builds and checks
+    (see `spherexlander.check`), and it's also called before documents are
+    processed serially.
+    """
+    import lander.plugins  # noqa: F401
+
+
+def _measure(
+    function: Callable[[T], DocumentResult], item: T
+) -> Tuple[DocumentResult, Dict[str, Any]]:
+    """Call a function to process a document, returning its result and a
+    snapshot of the metrics it recorded in this process.
+    """
+    REGISTRY.reset()
+    result = function(item)
+    return result, REGISTRY.snapshot()
+
+
+def build_document(job: BatchJob, *, force: bool = False) -> DocumentResult:
+    """Build a single document's landing page, capturing any error.
+
+    Unless ``force`` is `True`, the build is skipped if the site is up to
+    date. A skipped document is still added to the configured catalogue,
+    from its site's metadata (see `spherexlander.catalogue`).
+    """
+    from lander.plugins import parsers, themes
+
+    start = time.perf_counter()
+    try:
+        settings = job.load_settings()
+        if not force and is_up_to_date(settings):
+            logger.info("Skipping %s; the site is up to date", job.source_path)
+            record_site(settings)
+            return DocumentResult(
+                source_path=job.source_path,
+                output_dir=job.output_dir,
+                parser=_parser_name(job),
+                status=BuildStatus.skipped,
+                duration=time.perf_counter() - start,
+            )
+        parser = parsers[settings.parser](settings=settings)
+        theme = themes[settings.theme](
+            metadata=parser.metadata, settings=settings
+        )
+        theme.build_site()
+    except Exception as e:
+        logger.exception("Failed to build %s", job.source_path)
+        return DocumentResult(
+            source_path=job.source_path,
+            output_dir=job.output_dir,
+            parser=_parser_name(job),
+            status=BuildStatus.failed,
+            duration=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+            traceback=traceback.format_exc(),
+        )
+    return DocumentResult(
+        source_path=job.source_path,
+        output_dir=job.output_dir,
+        parser=_parser_name(job),
+        status=BuildStatus.built,
+        duration=time.perf_counter() - start,
+    )
+
+
+def _parser_name(job: BatchJob) -> str:
+    """Get the name of the parsing plugin that parses a job's document: the
+    plugin of its type, if the job's parser detects the type.
+    """
+    if job.parser != AUTO_PARSER:
+        return job.parser
+    from .parsers.auto import get_parser_name
+
+    try:
+        return get_parser_name(job.source_path)
+    except (OSError, ValueError):
+        return job.parser
+
+
+def rerender_document(output_dir: Path) -> DocumentResult:
+    """Render a single site again from its metadata sidecar, capturing any
+    error.
+    """
+    start = time.perf_counter()
+    sidecar = MetadataSidecar.read(output_dir)
+    # The sidecar's path stands in for the source if the sidecar is unusable
+    source_path = sidecar.source_path if sidecar else sidecar_path(output_dir)
+    parser = sidecar.parser if sidecar else ""
+    try:
+        rerender_site(output_dir)
+    except Exception as e:
+        logger.exception("Failed to render %s", output_dir)
+        return DocumentResult(
+            source_path=source_path,
+            output_dir=output_dir,
+            parser=parser,
+            status=BuildStatus.failed,
+            duration=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+            traceback=traceback.format_exc(),
+        )
+    return DocumentResult(
+        source_path=source_path,
+        output_dir=output_dir,
+        parser=parser,
+        status=BuildStatus.built,
+        duration=time.perf_counter() - start,
+    )
@@ -0,0 +1,208 @@
+"""A content-addressed, size-limited on-disk cache that can be shared by
+concurrent build processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+from logging import getLogger
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import load_config
+from .metrics import CACHE_REQUESTS
+
+__all__ = ["ContentCache", "open_cache"]
+
+logger = getLogger(__name__)
+
+TEMP_PREFIX = ".tmp-"
+"""Prefix of the temporary files that entries are written to before they
+are moved into place.
+"""
+
+STALE_TEMP_AGE = 3600.0
+"""Age, in seconds, after which an abandoned temporary file is deleted."""
+
+
+class ContentCache:
+    """A directory of cache entries, each stored in a file named by the
+    SHA-256 hash of its key.
+
+    Parameters
+    ----------
+    directory
+        Directory where the entries are stored. It is created if necessary.
+    max_size
+        Maximum total size of the entries, in bytes. When the cache grows
+        beyond this size, the least recently used entries are evicted.
+
+    Notes
+    -----
+    Entries are written to a temporary file and atomically moved into place,
+    so several processes can share a cache directory: readers never see a
+    partially written entry, and an entry that is evicted by another process
+    is treated as a cache miss. Reading an entry updates its modification
+    time, which is used to order entries for least recently used (LRU)
+    eviction.
+    """
+
+    def __init__(self, directory: Path, *, max_size: int) -> None:
+        self._directory = directory
+        self._max_size = max_size
+        self._size: Optional[int] = None
+
+    @property
+    def directory(self) -> Path:
+        """The cache directory."""
+        return self._directory
+
+    @property
+    def max_size(self) -> int:
+        """Maximum total size of the entries, in bytes."""
+        return self._max_size
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Make a cache key by hashing the parts that identify an entry."""
+        digest = hashlib.sha256()
+        for part in parts:
+            encoded = part.encode("utf-8")
+            digest.update(f"{len(encoded)}:".encode("ascii"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get the content of an entry, or `None` if it is not cached."""
+        path = self._entry_path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            CACHE_REQUESTS.inc(cache=self._directory.name, result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache=self._directory.name, result="hit")
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        """Store the content of an entry, evicting the least recently used
+        entries if the cache grows beyond its maximum size.
+        """
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(
+                prefix=TEMP_PREFIX, dir=self._directory
+            )
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # The size of an entry that is replaced isn't counted twice
+            try:
+                replaced_size = path.stat().st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(temp_name, path)
+        except OSError:
+            logger.warning("Could not write cache entry %s", path)
+            return
+
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += len(data) - replaced_size
+        if self._size > self._max_size:
+            self.prune()
+
+    def prune(self) -> None:
+        """Evict the least recently used entries until the cache is no larger
+        than its maximum size, and delete abandoned temporary files.
+        """
+        entries = self._scan_entries()
+        entries.sort(key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        for path, _, entry_size in entries:
+            if size <= self._max_size:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        for path, _, _ in self._scan_entries():
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._size = 0
+
+    def _entry_path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._directory.joinpath(digest[:2], digest)
+
+    def _scan_size(self) -> int:
+        return sum(entry[2] for entry in self._scan_entries())
+
+    def _scan_entries(self) -> List[Tuple[Path, float, int]]:
+        """List the entries, with their modification times and sizes."""
+        entries: List[Tuple[Path, float, int]] = []
+        if not self._directory.is_dir():
+            return entries
+        now = time.time()
+        for subdir in os.scandir(self._directory):
+            if subdir.name.startswith(TEMP_PREFIX):
+                self._remove_stale_temp(subdir, now)
+                continue
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((Path(entry.path), stat.st_mtime, stat.st_size))
+        return entries
+
+    @staticmethod
+    def _remove_stale_temp(entry: os.DirEntry, now: float) -> None:
+        try:
+            if now - entry.stat().st_mtime > STALE_TEMP_AGE:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+_caches: Dict[Tuple[Path, int], ContentCache] = {}
+
+
+def open_cache(name: str) -> Optional[ContentCache]:
+    """Open a named cache in the configured cache directory.
+
+    Parameters
+    ----------
+    name
+        Name of the cache, which is used as the name of its subdirectory.
+
+    Returns
+    -------
+    ContentCache or None
+        The cache, or `None` if caching is disabled by the
+        `~spherexlander.config.PluginConfig`. The same instance is returned
+        for the same configuration within a process.
+    """
+    config = load_config()
+    if not config.cache_enabled:
+        return None
+    directory = config.cache_dir.joinpath(name)
+    cache_id = (directory, config.cache_max_size)
+    if cache_id not in _caches:
+        _caches[cache_id] = ContentCache(
+            directory, max_size=config.cache_max_size
+        )
+    return _caches[cache_id]
@@ -0,0 +1,594 @@
+"""A catalogue of the metadata of SPHEREx documents in a SQLite database.
+
+Builds add each document's metadata to the catalogue that is configured with
+``SPHEREX_LANDER_CATALOGUE_PATH`` (see `spherexlander.config.PluginConfig`),
+replacing the document's earlier entry. Questions about the whole corpus,
+such as "which L2 modules have a High difficulty?" or "which TRs verify
+requirement X?", are then answered with `Catalogue.find` rather than by
+parsing every document again.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from lander.ext.parser import DocumentMetadata
+    from lander.settings import BuildSettings
+
+__all__ = [
+    "Catalogue",
+    "CatalogueAuthor",
+    "CatalogueEntry",
+    "record_metadata",
+    "record_site",
+]
+
+logger = getLogger(__name__)
+
+SCHEMA_VERSION = 1
+"""Version of the database schema, stored as the database's
+``user_version``.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    handle TEXT PRIMARY KEY,
+    handle_prefix TEXT,
+    parser TEXT,
+    title TEXT,
+    version TEXT,
+    date_modified TEXT,
+    pipeline_level TEXT,
+    status TEXT,
+    difficulty TEXT,
+    diagram_index INTEGER,
+    approval_name TEXT,
+    approval_date TEXT,
+    ipac_jira_id TEXT,
+    va_doors_id TEXT,
+    va_doors_url TEXT,
+    req_doors_id TEXT,
+    req_doors_url TEXT,
+    interface_partner TEXT,
+    canonical_url TEXT,
+    repository_url TEXT,
+    git_commit_sha TEXT,
+    git_ref TEXT,
+    git_ref_type TEXT,
+    ci_build_id TEXT,
+    ci_build_url TEXT,
+    github_slug TEXT,
+    source_path TEXT,
+    metadata TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_handle_prefix
+    ON documents (handle_prefix);
+CREATE INDEX IF NOT EXISTS documents_pipeline
+    ON documents (pipeline_level, difficulty);
+CREATE INDEX IF NOT EXISTS documents_difficulty ON documents (difficulty);
+CREATE INDEX IF NOT EXISTS documents_req_doors_id
+    ON documents (req_doors_id);
+CREATE INDEX IF NOT EXISTS documents_va_doors_id ON documents (va_doors_id);
+CREATE INDEX IF NOT EXISTS documents_interface_partner
+    ON documents (interface_partner);
+CREATE TABLE IF NOT EXISTS authors (
+    handle TEXT NOT NULL REFERENCES documents (handle) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT,
+    role TEXT,
+    PRIMARY KEY (handle, position)
+);
+CREATE INDEX IF NOT EXISTS authors_name ON authors (name COLLATE NOCASE);
+"""
+"""Schema of the catalogue database."""
+
+DOCUMENT_COLUMNS = (
+    "handle",
+    "handle_prefix",
+    "parser",
+    "title",
+    "version",
+    "date_modified",
+    "pipeline_level",
+    "status",
+    "difficulty",
+    "diagram_index",
+    "approval_name",
+    "approval_date",
+    "ipac_jira_id",
+    "va_doors_id",
+    "va_doors_url",
+    "req_doors_id",
+    "req_doors_url",
+    "interface_partner",
+    "canonical_url",
+    "repository_url",
+    "git_commit_sha",
+    "git_ref",
+    "git_ref_type",
+    "ci_build_id",
+    "ci_build_url",
+    "github_slug",
+    "source_path",
+    "metadata",
+    "updated",
+)
+"""Columns of the ``documents`` table."""
+
+FILTER_COLUMNS = {
+    "handle_prefix": "handle_prefix",
+    "parser": "parser",
+    "pipeline_level": "pipeline_level",
+    "difficulty": "difficulty",
+    "status": "status",
+    "req_doors_id": "req_doors_id",
+    "va_doors_id": "va_doors_id",
+    "ipac_jira_id": "ipac_jira_id",
+    "interface_partner": "interface_partner",
+}
+"""Arguments of `Catalogue.find` that filter on equality with a column."""
+
+TIMEOUT = 30.0
+"""Time, in seconds, to wait for another process's write to finish."""
+
+
+class CatalogueAuthor(BaseModel):
+    """An author of a document in the catalogue."""
+
+    name: str
+    """The author's name."""
+
+    email: Optional[str] = None
+    """The author's email address."""
+
+    role: Optional[str] = None
+    """The author's role, such as ``IPAC Lead``."""
+
+
+class CatalogueEntry(BaseModel):
+    """A document in the catalogue."""
+
+    handle: str
+    """The document's handle, such as ``SSDC-MS-001``."""
+
+    handle_prefix: Optional[str] = None
+    """The handle's prefix, which is the document type, such as
+    ``SSDC-MS``.
+    """
+
+    parser: Optional[str] = None
+    """Name of the parser plugin that extracted the metadata."""
+
+    title: Optional[str] = None
+    version: Optional[str] = None
+    date_modified: Optional[str] = None
+    pipeline_level: Optional[str] = None
+    status: Optional[str] = None
+    difficulty: Optional[str] = None
+    diagram_index: Optional[int] = None
+    approval_name: Optional[str] = None
+    approval_date: Optional[str] = None
+    ipac_jira_id: Optional[str] = None
+    va_doors_id: Optional[str] = None
+    va_doors_url: Optional[str] = None
+    req_doors_id: Optional[str] = None
+    req_doors_url: Optional[str] = None
+    interface_partner: Optional[str] = None
+    canonical_url: Optional[str] = None
+    repository_url: Optional[str] = None
+    git_commit_sha: Optional[str] = None
+    git_ref: Optional[str] = None
+    git_ref_type: Optional[str] = None
+    ci_build_id: Optional[str] = None
+    ci_build_url: Optional[str] = None
+    github_slug: Optional[str] = None
+
+    source_path: Optional[str] = None
+    """Path of the document's root TeX file, when it was last built."""
+
+    updated: str
+    """Time when the entry was last updated, in ISO 8601 format."""
+
+    authors: List[CatalogueAuthor] = Field(default_factory=list)
+    """The document's authors, in order."""
+
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    """The document's full metadata, as in the site's ``metadata.json``."""
+
+
+class Catalogue:
+    """A SQLite database of document metadata.
+
+    Parameters
+    ----------
+    path
+        Path of the database file, which is created if it doesn't exist.
+
+    Notes
+    -----
+    The database uses write-ahead logging, so several build processes can
+    update it while others read it. Use the catalogue as a context manager,
+    or call `close`, to close the database connection.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path), timeout=TIMEOUT)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._create_schema()
+
+    def __enter__(self) -> Catalogue:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._connection.close()
+
+    def _create_schema(self) -> None:
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version == SCHEMA_VERSION:
+            return
+        if version != 0:
+            raise RuntimeError(
+                f"The catalogue {self.path} has schema version {version}, "
+                f"but version {SCHEMA_VERSION} is supported."
+            )
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def upsert(
+        self,
+        metadata: Mapping[str, Any],
+        *,
+        parser: Optional[str] = None,
+        source_path: Optional[Path] = None,
+    ) -> bool:
+        """Add a document's metadata to the catalogue, replacing any entry
+        with the same handle.
+
+        Parameters
+        ----------
+        metadata
+            The document's metadata, in its JSON form (as in the site's
+            ``metadata.json`` file).
+        parser
+            Name of the parser plugin that extracted the metadata.
+        source_path
+            Path of the document's root TeX file.
+
+        Returns
+        -------
+        bool
+            `True` if the document was added, or `False` if the metadata has
+            no handle (``identifier``) to identify the document.
+        """
+        row = _document_row(metadata, parser=parser, source_path=source_path)
+        if row["handle"] is None:
+            logger.warning(
+                "Not cataloguing %s; its metadata has no handle",
+                source_path or metadata.get("title"),
+            )
+            return False
+        columns = ", ".join(DOCUMENT_COLUMNS)
+        placeholders = ", ".join(f":{c}" for c in DOCUMENT_COLUMNS)
+        updates = ", ".join(
+            f"{c} = excluded.{c}" for c in DOCUMENT_COLUMNS if c != "handle"
+        )
+        authors = [
+            (
+                row["handle"],
+                position,
+                a.get("name"),
+                a.get("email"),
+                a.get("role"),
+            )
+            for position, a in enumerate(metadata.get("authors") or [])
+            if a.get("name")
+        ]
+        with self._connection:
+            self._connection.execute(
+                f"INSERT INTO documents ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (handle) DO UPDATE SET {updates}",
+                row,
+            )
+            self._connection.execute(
+                "DELETE FROM authors WHERE handle = ?", (row["handle"],)
+            )
+            self._connection.executemany(
+                "INSERT INTO authors (handle, position, name, email, role) "
+                "VALUES (?, ?, ?, ?, ?)",
+                authors,
+            )
+        return True
+
+    def upsert_metadata(
+        self,
+        metadata: DocumentMetadata,
+        *,
+        parser: Optional[str] = None,
+        source_path: Optional[Path] = None,
+    ) -> bool:
+        """Add a document's metadata model to the catalogue.
+
+        See also
+        --------
+        upsert
+        """
+        return self.upsert(
+            json.loads(metadata.json()), parser=parser, source_path=source_path
+        )
+
+    def delete(self, handle: str) -> bool:
+        """Delete a document from the catalogue.
+
+        Returns
+        -------
+        bool
+            `True` if the document was in the catalogue.
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM documents WHERE handle = ?", (handle,)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, handle: str) -> Optional[CatalogueEntry]:
+        """Get a document by its handle, or `None` if it isn't catalogued."""
+        entries = list(self._select("handle = ?", [handle]))
+        return entries[0] if entries else None
+
+    def find(
+        self,
+        *,
+        handle_prefix: Optional[str] = None,
+        parser: Optional[str] = None,
+        pipeline_level: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        status: Optional[str] = None,
+        req_doors_id: Optional[str] = None,
+        va_doors_id: Optional[str] = None,
+        ipac_jira_id: Optional[str] = None,
+        interface_partner: Optional[str] = None,
+        author: Optional[str] = None,
+    ) -> List[CatalogueEntry]:
+        """Find the documents that match all of the given criteria.
+
+        Each argument selects documents whose field is equal to the
+        argument. ``author`` selects documents with an author of that name
+        (ignoring case).
+
+        Returns
+        -------
+        list of CatalogueEntry
+            The documents, ordered by their handles.
+
+        Examples
+        --------
+        >>> catalogue.find(pipeline_level="L2", difficulty="High")
+        ... # doctest: +SKIP
+        >>> catalogue.find(handle_prefix="SSDC-TR", req_doors_id="1234")
+        ... # doctest: +SKIP
+        """
+        arguments = {
+            "handle_prefix": handle_prefix,
+            "parser": parser,
+            "pipeline_level": pipeline_level,
+            "difficulty": difficulty,
+            "status": status,
+            "req_doors_id": req_doors_id,
+            "va_doors_id": va_doors_id,
+            "ipac_jira_id": ipac_jira_id,
+            "interface_partner": interface_partner,
+        }
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        for name, value in arguments.items():
+            if value is not None:
+                conditions.append(f"{FILTER_COLUMNS[name]} = ?")
+                parameters.append(value)
+        if author is not None:
+            conditions.append(
+                "handle IN (SELECT handle FROM authors "
+                "WHERE name = ? COLLATE NOCASE)"
+            )
+            parameters.append(author)
+        return list(self._select(" AND ".join(conditions), parameters))
+
+    def __len__(self) -> int:
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM documents"
+        ).fetchone()
+        return count
+
+    def _select(
+        self, where: str, parameters: List[Any]
+    ) -> Iterator[CatalogueEntry]:
+        query = "SELECT * FROM documents"
+        if where:
+            query += f" WHERE {where}"
+        query += " ORDER BY handle"
+        rows = self._connection.execute(query, parameters).fetchall()
+        authors = self._authors([row["handle"] for row in rows])
+        for row in rows:
+            data = dict(row)
+            data["metadata"] = json.loads(data["metadata"])
+            data["authors"] = authors.get(row["handle"], [])
+            yield CatalogueEntry(**data)
+
+    def _authors(self, handles: List[str]) -> Dict[str, List[CatalogueAuthor]]:
+        authors: Dict[str, List[CatalogueAuthor]] = {}
+        # Query in chunks to stay below SQLite's limit on parameters.
+        for start in range(0, len(handles), 500):
+            chunk = handles[start : start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._connection.execute(
+                "SELECT handle, name, email, role FROM authors "
+                f"WHERE handle IN ({placeholders}) ORDER BY handle, position",
+                chunk,
+            )
+            for row in rows:
+                authors.setdefault(row["handle"], []).append(
+                    CatalogueAuthor(
+                        name=row["name"], email=row["email"], role=row["role"]
+                    )
+                )
+        return authors
+
+
+def _document_row(
+    metadata: Mapping[str, Any],
+    *,
+    parser: Optional[str],
+    source_path: Optional[Path],
+) -> Dict[str, Any]:
+    """Create the ``documents`` row for a document's metadata."""
+    handle = metadata.get("identifier")
+    approval = metadata.get("approval") or {}
+    va_doors_id, va_doors_url = _doors_id(metadata.get("va_doors_id"))
+    req_doors_id, req_doors_url = _doors_id(metadata.get("req_doors_id"))
+    diagram_index = metadata.get("diagram_index")
+    return {
+        "handle": handle,
+        "handle_prefix": _handle_prefix(handle),
+        "parser": parser,
+        "title": metadata.get("title"),
+        "version": _string(metadata.get("version")),
+        "date_modified": _string(metadata.get("date_modified")),
+        "pipeline_level": metadata.get("pipeline_level"),
+        "status": _string(metadata.get("status")),
+        "difficulty": _string(metadata.get("difficulty")),
+        "diagram_index": (
+            int(diagram_index) if diagram_index is not None else None
+        ),
+        "approval_name": approval.get("name"),
+        "approval_date": _string(approval.get("date")),
+        "ipac_jira_id": metadata.get("ipac_jira_id"),
+        "va_doors_id": va_doors_id,
+        "va_doors_url": va_doors_url,
+        "req_doors_id": req_doors_id,
+        "req_doors_url": req_doors_url,
+        "interface_partner": metadata.get("interface_partner"),
+        "canonical_url": _string(metadata.get("canonical_url")),
+        "repository_url": _string(metadata.get("repository_url")),
+        "git_commit_sha": metadata.get("git_commit_sha"),
+        "git_ref": metadata.get("git_ref"),
+        "git_ref_type": metadata.get("git_ref_type"),
+        "ci_build_id": _string(metadata.get("ci_build_id")),
+        "ci_build_url": _string(metadata.get("ci_build_url")),
+        "github_slug": metadata.get("github_slug"),
+        "source_path": str(source_path) if source_path else None,
+        "metadata": json.dumps(metadata, sort_keys=True, default=str),
+        "updated": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _handle_prefix(handle: Optional[str]) -> Optional[str]:
+    """Get the prefix of a handle, as
+    `spherexlander.parsers.spherexdata.SpherexMetadata.document_handle_prefix`
+    does.
+    """
+    if not handle:
+        return None
+    return "-".join(handle.split("-")[:2])
+
+
+def _doors_id(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    if not value:
+        return None, None
+    return _string(value.get("id")), _string(value.get("url"))
+
+
+def _string(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def record_metadata(
+    metadata: DocumentMetadata, settings: BuildSettings
+) -> bool:
+    """Add a document's metadata to the configured catalogue, if there is
+    one (see `spherexlander.config.PluginConfig.catalogue_path`).
+
+    Database errors are logged rather than raised, so that a locked or
+    damaged catalogue doesn't fail the document's build.
+
+    Returns
+    -------
+    bool
+        `True` if the document was added to a catalogue.
+    """
+    from .config import load_config
+
+    path = load_config().catalogue_path
+    if path is None:
+        return False
+    try:
+        with Catalogue(path) as catalogue:
+            return catalogue.upsert_metadata(
+                metadata,
+                parser=settings.parser,
+                source_path=settings.source_path,
+            )
+    except sqlite3.Error as e:
+        logger.warning("Could not update the catalogue %s: %s", path, e)
+        return False
+
+
+def record_site(settings: BuildSettings) -> bool:
+    """Add the metadata of a document's built site (its ``metadata.json``
+    file) to the configured catalogue, if there is one.
+
+    This records documents whose sites are up to date, and so aren't built
+    again.
+
+    Returns
+    -------
+    bool
+        `True` if the document was added to a catalogue.
+    """
+    from .config import load_config
+
+    path = load_config().catalogue_path
+    if path is None:
+        return False
+    metadata_path = settings.output_dir.joinpath("metadata.json")
+    try:
+        metadata = json.loads(metadata_path.read_text())
+    except (OSError, ValueError):
+        logger.warning("Could not read %s", metadata_path)
+        return False
+    try:
+        with Catalogue(path) as catalogue:
+            return catalogue.upsert(
+                metadata,
+                parser=settings.parser,
+                source_path=settings.source_path,
+            )
+    except sqlite3.Error as e:
+        logger.warning("Could not update the catalogue %s: %s", path, e)
+        return False
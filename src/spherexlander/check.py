@@ -0,0 +1,343 @@
+"""Checking the metadata of many documents, without building their sites.
+
+`run_check` extracts the metadata of each document in a pool of worker
+processes and reports the fields that are missing (the parsers log a warning
+for each metadata command they don't find) or invalid. Nothing is rendered
+and no files are copied, and by default only the documents' preambles are
+read (see `spherexlander.config.PluginConfig.parse_preamble_only`), so the
+whole corpus can be checked on every push.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from functools import partial
+from logging import getLogger
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from .batch import BatchJob, init_worker
+
+__all__ = [
+    "CheckIssue",
+    "CheckReport",
+    "DocumentCheck",
+    "IssueKind",
+    "check_document",
+    "run_check",
+]
+
+logger = getLogger(__name__)
+
+MISSING_COMMAND_PATTERN = re.compile(r"^No (?P<command>\S+) command detected")
+"""Regular expression for the parsers' warnings about missing commands."""
+
+COMMAND_FIELDS = {
+    "version": "version",
+    "spherexlead": "authors",
+    "ipaclead": "authors",
+    "spherexHandle": "identifier",
+    "approved": "approval",
+    "IPACJiraID": "ipac_jira_id",
+    "ReqDoorsID": "req_doors_id",
+    "VADoorsID": "va_doors_id",
+    "pipelevel": "pipeline_level",
+    "difficulty": "difficulty",
+    "diagramindex": "diagram_index",
+    "interfacepartner": "interface_partner",
+}
+"""The metadata field that each metadata command sets."""
+
+INVALID_FIELD_PATTERNS = {
+    "difficulty": re.compile(r"^Difficulty value .* is not one of"),
+}
+"""Regular expressions for the parsers' warnings about invalid values, keyed
+by the field.
+"""
+
+
+class IssueKind(str, Enum):
+    """The kind of a problem with a document's metadata."""
+
+    missing = "missing"
+    """A metadata command is missing."""
+
+    invalid = "invalid"
+    """A metadata field has an invalid value."""
+
+    warning = "warning"
+    """The parser logged another warning."""
+
+    error = "error"
+    """The metadata couldn't be extracted."""
+
+
+class CheckIssue(BaseModel):
+    """A problem with a document's metadata."""
+
+    kind: IssueKind
+    """The kind of problem."""
+
+    field: Optional[str] = None
+    """The metadata field, if the problem is with a field."""
+
+    command: Optional[str] = None
+    """The TeX command, for a missing command (without the backslash)."""
+
+    message: str
+    """A description of the problem."""
+
+
+class DocumentCheck(BaseModel):
+    """The result of checking a document's metadata."""
+
+    source_path: Path
+    """Path to the root TeX source file."""
+
+    parser: str
+    """Name of the parsing plugin."""
+
+    document_type: Optional[str] = None
+    """The document's type, such as ``SSDC-MS``, from its handle."""
+
+    identifier: Optional[str] = None
+    """The document's handle."""
+
+    issues: List[CheckIssue] = Field(default_factory=list)
+    """The problems with the document's metadata."""
+
+    duration: float
+    """Time spent checking the document, in seconds."""
+
+    @property
+    def failed(self) -> bool:
+        """Whether the metadata is invalid or couldn't be extracted."""
+        return any(
+            issue.kind in (IssueKind.invalid, IssueKind.error)
+            for issue in self.issues
+        )
+
+
+class CheckReport(BaseModel):
+    """A summary of checking many documents."""
+
+    results: List[DocumentCheck] = Field(default_factory=list)
+    """Results for each document, in the order of the jobs."""
+
+    summary: Dict[str, Dict[str, int]] = Field(default_factory=dict)
+    """Number of documents with each problem, keyed by document type, and
+    then by the kind of problem and the field (such as ``missing:approval``).
+    """
+
+    duration: float = 0.0
+    """Wall time of the check, in seconds."""
+
+    @classmethod
+    def create(
+        cls, results: List[DocumentCheck], duration: float
+    ) -> CheckReport:
+        """Create the report, summarizing the results."""
+        summary: Dict[str, Dict[str, int]] = {}
+        for result in results:
+            counts = summary.setdefault(
+                result.document_type or result.parser, {}
+            )
+            keys = {
+                f"{issue.kind.value}:{issue.field or issue.command or '-'}"
+                for issue in result.issues
+            }
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+        return cls(results=results, summary=summary, duration=duration)
+
+    @property
+    def failed(self) -> List[DocumentCheck]:
+        """Results for documents whose metadata is invalid or couldn't be
+        extracted.
+        """
+        return [r for r in self.results if r.failed]
+
+    @property
+    def incomplete(self) -> List[DocumentCheck]:
+        """Results for documents with any problem."""
+        return [r for r in self.results if r.issues]
+
+    def format_summary(self) -> str:
+        """Format a human-readable summary of the check."""
+        lines = [
+            f"Checked {len(self.results)} documents in "
+            f"{self.duration:.1f} s: {len(self.incomplete)} with problems, "
+            f"{len(self.failed)} failed"
+        ]
+        for result in self.incomplete:
+            name = result.identifier or str(result.source_path)
+            lines.append(f"  {name} ({result.source_path}):")
+            for issue in result.issues:
+                lines.append(f"    {issue.kind.value}: {issue.message}")
+        for document_type, counts in sorted(self.summary.items()):
+            if counts:
+                lines.append(
+                    f"  {document_type}: "
+                    + ", ".join(f"{k} {n}" for k, n in sorted(counts.items()))
+                )
+        return "\n".join(lines)
+
+
+def run_check(
+    jobs: List[BatchJob],
+    *,
+    max_workers: Optional[int] = None,
+    preamble_only: bool = True,
+) -> CheckReport:
+    """Check the metadata of many documents in parallel.
+
+    Parameters
+    ----------
+    jobs
+        The documents to check. Their output directories aren't used.
+    max_workers
+        Number of worker processes. The default is the number of CPUs. If
+        ``1``, documents are checked serially in the current process.
+    preamble_only
+        Whether to read only the documents' preambles, where the metadata
+        commands are.
+
+    Returns
+    -------
+    CheckReport
+        The results for each document.
+    """
+    start = time.perf_counter()
+    check = partial(check_document, preamble_only=preamble_only)
+    if max_workers == 1:
+        init_worker()
+        results = [check(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker
+        ) as executor:
+            results = list(executor.map(check, jobs))
+    return CheckReport.create(results, time.perf_counter() - start)
+
+
+def check_document(
+    job: BatchJob, *, preamble_only: bool = True
+) -> DocumentCheck:
+    """Check a single document's metadata, capturing the warnings that the
+    parser logs and any error.
+    """
+    from lander.plugins import parsers
+
+    start = time.perf_counter()
+    issues: List[CheckIssue] = []
+    metadata = None
+    with _capture_warnings() as records, _preamble_only(preamble_only):
+        try:
+            # Invalid settings (such as a missing PDF) are errors, not
+            # invalid metadata.
+            try:
+                settings = job.load_settings()
+            except ValidationError as e:
+                raise ValueError(str(e)) from e
+            metadata = parsers[settings.parser](settings=settings).metadata
+        except ValidationError as e:
+            for error in e.errors():
+                field = ".".join(str(loc) for loc in error["loc"])
+                issues.append(
+                    CheckIssue(
+                        kind=IssueKind.invalid,
+                        field=field,
+                        message=f"{field}: {error['msg']}",
+                    )
+                )
+        except Exception as e:
+            logger.debug("Failed to check %s", job.source_path, exc_info=True)
+            issues.append(
+                CheckIssue(
+                    kind=IssueKind.error,
+                    message=f"{type(e).__name__}: {e}",
+                )
+            )
+    issues[:0] = [_issue_from_record(record) for record in records]
+
+    identifier = getattr(metadata, "identifier", None)
+    document_type = None
+    if identifier:
+        document_type = "-".join(identifier.split("-")[:2])
+    return DocumentCheck(
+        source_path=job.source_path,
+        parser=job.parser,
+        document_type=document_type,
+        identifier=identifier,
+        issues=issues,
+        duration=time.perf_counter() - start,
+    )
+
+
+def _issue_from_record(record: logging.LogRecord) -> CheckIssue:
+    """Create an issue from a warning that a parser logged."""
+    message = record.getMessage()
+    match = MISSING_COMMAND_PATTERN.match(message)
+    if match is not None:
+        command = match.group("command")
+        return CheckIssue(
+            kind=IssueKind.missing,
+            field=COMMAND_FIELDS.get(command),
+            command=command,
+            message=message,
+        )
+    for field, pattern in INVALID_FIELD_PATTERNS.items():
+        if pattern.match(message):
+            return CheckIssue(
+                kind=IssueKind.invalid, field=field, message=message
+            )
+    return CheckIssue(kind=IssueKind.warning, message=message)
+
+
+class _RecordHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(level=logging.WARNING)
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@contextmanager
+def _capture_warnings() -> Iterator[List[logging.LogRecord]]:
+    """Capture the warnings of the parsers, instead of logging them."""
+    logger = logging.getLogger("spherexlander.parsers")
+    handler = _RecordHandler()
+    propagate = logger.propagate
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        yield handler.records
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = propagate
+
+
+@contextmanager
+def _preamble_only(enabled: bool) -> Iterator[None]:
+    """Set the preamble-only parsing mode for the parsers created in the
+    context.
+    """
+    name = "SPHEREX_LANDER_PARSE_PREAMBLE_ONLY"
+    previous = os.environ.get(name)
+    os.environ[name] = "true" if enabled else "false"
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ[name]
+        else:
+            os.environ[name] = previous
@@ -0,0 +1,324 @@
+"""The ``spherex-lander`` command-line interface."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from .batch import (
+    AUTO_PARSER,
+    BatchJob,
+    BatchReport,
+    discover_jobs,
+    load_manifest,
+    run_batch,
+    run_rerender,
+)
+from .sidecar import find_sites
+
+__all__ = ["app"]
+
+app = typer.Typer(help="Tools for building SPHEREx landing pages.")
+
+
+@app.callback()
+def main() -> None:
+    """Tools for building SPHEREx landing pages."""
+
+
+@app.command()
+def batch(
+    manifest: Optional[Path] = typer.Option(
+        None, help="YAML manifest listing the documents to build."
+    ),
+    discover: Optional[Path] = typer.Option(
+        None, help="Directory to search for lander.yaml files."
+    ),
+    output: Path = typer.Option(
+        Path("_build"),
+        help="Root directory for sites of discovered documents.",
+    ),
+    workers: Optional[int] = typer.Option(
+        None, help="Number of worker processes (default: number of CPUs)."
+    ),
+    report: Optional[Path] = typer.Option(
+        None, help="Path to write a JSON report of the batch."
+    ),
+    force: bool = typer.Option(
+        False, help="Build documents even if their sites are up to date."
+    ),
+    catalogue: Optional[Path] = typer.Option(
+        None, help="SQLite catalogue to add the documents' metadata to."
+    ),
+    metrics: Optional[Path] = typer.Option(
+        None,
+        help=(
+            "Path to write the build metrics for the Prometheus textfile "
+            "collector (a .prom file), and as JSON next to it."
+        ),
+    ),
+) -> None:
+    """Build the landing pages for many documents in parallel."""
+    jobs: List[BatchJob] = []
+    if manifest:
+        jobs.extend(load_manifest(manifest))
+    if discover:
+        jobs.extend(discover_jobs(discover, output))
+    if not jobs:
+        typer.echo("No documents to build; set --manifest or --discover.")
+        raise typer.Exit(code=1)
+
+    if catalogue:
+        # Set in the environment so that the worker processes inherit it
+        os.environ["SPHEREX_LANDER_CATALOGUE_PATH"] = str(catalogue)
+    batch_report = run_batch(jobs, max_workers=workers, force=force)
+    typer.echo(batch_report.format_summary())
+    if report:
+        report.write_text(batch_report.json(indent=2))
+    if metrics:
+        _write_metrics(batch_report, metrics)
+    if batch_report.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def check(
+    manifest: Optional[Path] = typer.Option(
+        None, help="YAML manifest listing the documents to check."
+    ),
+    discover: Optional[Path] = typer.Option(
+        None, help="Directory to search for lander.yaml files."
+    ),
+    workers: Optional[int] = typer.Option(
+        None, help="Number of worker processes (default: number of CPUs)."
+    ),
+    report: Optional[Path] = typer.Option(
+        None, help="Path to write a JSON report of the check."
+    ),
+    json_output: bool = typer.Option(
+        False, "--json", help="Print the JSON report instead of a summary."
+    ),
+    full_source: bool = typer.Option(
+        False, help="Read the whole TeX source, not only the preamble."
+    ),
+    strict: bool = typer.Option(
+        False, help="Fail if any document has missing fields or warnings."
+    ),
+) -> None:
+    """Check the metadata of many documents, without building their sites.
+
+    Exits with a non-zero status if any document's metadata is invalid or
+    can't be extracted (or, with --strict, has any problem).
+    """
+    from .check import run_check
+
+    jobs: List[BatchJob] = []
+    if manifest:
+        jobs.extend(load_manifest(manifest))
+    if discover:
+        jobs.extend(discover_jobs(discover, Path("_build")))
+    if not jobs:
+        typer.echo("No documents to check; set --manifest or --discover.")
+        raise typer.Exit(code=1)
+
+    check_report = run_check(
+        jobs, max_workers=workers, preamble_only=not full_source
+    )
+    if json_output:
+        typer.echo(check_report.json(indent=2))
+    else:
+        typer.echo(check_report.format_summary())
+    if report:
+        report.write_text(check_report.json(indent=2))
+    if check_report.failed or (strict and check_report.incomplete):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def rerender(
+    sites: List[Path] = typer.Argument(
+        ...,
+        exists=True,
+        file_okay=False,
+        help="Site output directories, or directories to search for sites.",
+    ),
+    workers: Optional[int] = typer.Option(
+        None, help="Number of worker processes (default: number of CPUs)."
+    ),
+    report: Optional[Path] = typer.Option(
+        None, help="Path to write a JSON report of the batch."
+    ),
+    metrics: Optional[Path] = typer.Option(
+        None,
+        help=(
+            "Path to write the build metrics for the Prometheus textfile "
+            "collector (a .prom file), and as JSON next to it."
+        ),
+    ),
+) -> None:
+    """Render landing pages again from their metadata sidecars, without
+    parsing their documents.
+
+    Use this to apply changes to the theme to sites that are already built.
+    """
+    output_dirs: List[Path] = []
+    for site in sites:
+        output_dirs.extend(find_sites(site))
+    if not output_dirs:
+        typer.echo("No sites with metadata sidecars were found.")
+        raise typer.Exit(code=1)
+
+    batch_report = run_rerender(output_dirs, max_workers=workers)
+    typer.echo(batch_report.format_summary())
+    if report:
+        report.write_text(batch_report.json(indent=2))
+    if metrics:
+        _write_metrics(batch_report, metrics)
+    if batch_report.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def watch(
+    source: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="The root TeX file."
+    ),
+    pdf: Path = typer.Option(..., help="The document's PDF."),
+    parser: str = typer.Option(
+        AUTO_PARSER, help="Name of the parsing plugin (default: detected)."
+    ),
+    output: Path = typer.Option(
+        Path("_build"), help="Directory where the site is built."
+    ),
+    serve: bool = typer.Option(
+        True, help="Preview the site with a local server that reloads it."
+    ),
+    host: str = typer.Option("127.0.0.1", help="Host of the preview server."),
+    port: int = typer.Option(8000, help="Port of the preview server."),
+    poll: bool = typer.Option(
+        False, help="Poll the files for changes instead of using inotify."
+    ),
+) -> None:
+    """Build a document's landing page, and rebuild it whenever the TeX
+    source, the files it inputs, or the PDF change.
+    """
+    from .preview import PreviewServer
+    from .watch import Rebuild, WatchSession, create_watcher
+
+    job = BatchJob(
+        source_path=source, pdf=pdf, parser=parser, output_dir=output
+    )
+    session = WatchSession(job)
+    rebuild = session.build()
+    if not rebuild.ok:
+        typer.echo(f"Failed to build {source}: {rebuild.error}")
+        raise typer.Exit(code=1)
+    typer.echo(f"Built {session.index_path} in {rebuild.duration:.2f} s")
+
+    server: Optional[PreviewServer] = None
+    if serve:
+        server = PreviewServer(
+            output, host=host, port=port, version=session.builds
+        )
+        server.start()
+        typer.echo(f"Previewing the site at {server.url}")
+
+    def report(rebuild: Rebuild) -> None:
+        names = ", ".join(path.name for path in rebuild.changed)
+        if not rebuild.ok:
+            typer.echo(f"Failed to build after {names} changed:")
+            typer.echo(f"  {rebuild.error}")
+            return
+        typer.echo(
+            f"Rebuilt {session.index_path} in "
+            f"{rebuild.duration * 1000:.0f} ms ({names} changed)"
+        )
+        if server is not None:
+            server.reload(session.builds)
+
+    typer.echo("Watching for changes; press Ctrl+C to stop.")
+    try:
+        with create_watcher(session.watched_paths(), polling=poll) as watcher:
+            session.run(watcher, on_build=report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.close()
+
+
+@app.command()
+def query(
+    catalogue: Path = typer.Argument(
+        ..., exists=True, dir_okay=False, help="The SQLite catalogue."
+    ),
+    prefix: Optional[str] = typer.Option(
+        None, help="Handle prefix (document type), such as SSDC-MS."
+    ),
+    pipeline_level: Optional[str] = typer.Option(
+        None, help="Pipeline level, such as L2."
+    ),
+    difficulty: Optional[str] = typer.Option(
+        None, help="Difficulty, such as High."
+    ),
+    status: Optional[str] = typer.Option(None, help="Module status."),
+    req_doors_id: Optional[str] = typer.Option(
+        None, help="DOORS ID of the requirement that TRs verify."
+    ),
+    va_doors_id: Optional[str] = typer.Option(
+        None, help="DOORS ID of the verification activity."
+    ),
+    interface_partner: Optional[str] = typer.Option(
+        None, help="Interface partner of IF documents."
+    ),
+    author: Optional[str] = typer.Option(None, help="Author's name."),
+    json_output: bool = typer.Option(
+        False, "--json", help="Print the documents' entries as JSON."
+    ),
+) -> None:
+    """Find documents in a catalogue of document metadata."""
+    import json
+
+    from .catalogue import Catalogue
+
+    with Catalogue(catalogue) as db:
+        entries = db.find(
+            handle_prefix=prefix,
+            pipeline_level=pipeline_level,
+            difficulty=difficulty,
+            status=status,
+            req_doors_id=req_doors_id,
+            va_doors_id=va_doors_id,
+            interface_partner=interface_partner,
+            author=author,
+        )
+    if json_output:
+        typer.echo(
+            json.dumps(
+                [json.loads(entry.json()) for entry in entries], indent=2
+            )
+        )
+        return
+    for entry in entries:
+        version = f" v{entry.version}" if entry.version else ""
+        typer.echo(f"{entry.handle}{version}: {entry.title or ''}")
+
+
+def _write_metrics(batch_report: BatchReport, path: Path) -> None:
+    from .metrics import MetricsRegistry, write_metrics
+
+    registry = MetricsRegistry()
+    registry.merge(batch_report.metrics)
+    write_metrics(registry, path)
+
+
+@app.command()
+def precompile() -> None:
+    """Precompile the spherex theme's templates into the bytecode cache."""
+    from .themes.spherex import SpherexTheme
+
+    names = SpherexTheme.precompile_templates()
+    typer.echo(f"Compiled {len(names)} templates.")
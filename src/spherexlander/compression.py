@@ -0,0 +1,267 @@
+"""Precompressed variants of the text files of a site.
+
+CDNs and static file servers can serve a precompressed variant of a file
+(such as ``index.html.gz`` for ``index.html``) to clients that accept its
+encoding, without compressing the file for each request.
+`precompress_site` writes a gzip variant, and a Brotli variant if the
+``brotli`` package is installed, next to each text file of a site.
+
+Variants are compressed with the highest levels, once per content: they're
+cached in memory by the SHA-256 hash of the file, so a stylesheet that
+every site in a batch shares is compressed once per build process, and in
+the ``precompress`` on-disk cache (see `spherexlander.cache`), which build
+processes share. Like the files that `spherexlander.placement.place_file`
+places, variants get the modification times of their files, so later
+builds don't read unchanged files again.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from logging import getLogger
+from pathlib import Path, PurePosixPath
+from typing import List, Optional, Sequence, Tuple
+
+from .metrics import CACHE_REQUESTS
+
+__all__ = [
+    "COMPRESSIBLE_SUFFIXES",
+    "Encoding",
+    "available_encodings",
+    "precompress_site",
+    "remove_variants",
+]
+
+logger = getLogger(__name__)
+
+COMPRESSIBLE_SUFFIXES = frozenset(
+    {".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".xml"}
+)
+"""Suffixes of the text files that are precompressed."""
+
+MIN_SIZE = 256
+"""Size, in bytes, below which files aren't precompressed, because the
+saving doesn't outweigh the cost of another file in the site.
+"""
+
+CACHE_FORMAT_VERSION = "1"
+"""Version of the compression settings, which is part of the cache keys."""
+
+MEMORY_CACHE_ENTRIES = 256
+"""Maximum number of variants that each process keeps in memory."""
+
+
+class Encoding(str, Enum):
+    """A content encoding of precompressed variants."""
+
+    gzip = "gzip"
+    brotli = "br"
+
+    @property
+    def suffix(self) -> str:
+        """Suffix of the variants' file names."""
+        return ".gz" if self is Encoding.gzip else ".br"
+
+
+_memory: OrderedDict[Tuple[Encoding, str], bytes] = OrderedDict()
+"""Variants compressed by this process, keyed by their encoding and the
+SHA-256 hash of the uncompressed content, in least recently used order.
+"""
+
+_memory_lock = threading.Lock()
+
+
+def available_encodings() -> List[Encoding]:
+    """The encodings that variants can be compressed with: gzip, and Brotli
+    if the ``brotli`` package is installed.
+    """
+    encodings = [Encoding.gzip]
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        encodings.append(Encoding.brotli)
+    return encodings
+
+
+def precompress_site(
+    output_dir: Path,
+    paths: Sequence[str],
+    *,
+    encodings: Optional[Sequence[Encoding]] = None,
+    max_workers: int = 4,
+) -> List[str]:
+    """Write precompressed variants of a site's text files.
+
+    Parameters
+    ----------
+    output_dir
+        The site's output directory.
+    paths
+        Paths of the site's files, relative to ``output_dir``. Only text
+        files (see `COMPRESSIBLE_SUFFIXES`) that aren't hidden are
+        compressed.
+    encodings
+        The encodings of the variants. The default is all the
+        `available_encodings`.
+    max_workers
+        Maximum number of threads that compress files concurrently.
+
+    Returns
+    -------
+    list of str
+        Paths of the variants, relative to ``output_dir``. Variants that
+        wouldn't be smaller than their files aren't written, and stale
+        variants of those files, and of other encodings, are removed.
+    """
+    if encodings is None:
+        encodings = available_encodings()
+    compressible = [p for p in paths if is_compressible(p)]
+
+    def compress(path: str) -> List[str]:
+        return _precompress_file(output_dir, path, encodings)
+
+    if max_workers <= 1 or len(compressible) <= 1:
+        results = [compress(p) for p in compressible]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(compressible)),
+            thread_name_prefix="precompress",
+        ) as executor:
+            results = list(executor.map(compress, compressible))
+    return [variant for variants in results for variant in variants]
+
+
+def remove_variants(output_dir: Path, paths: Sequence[str]) -> None:
+    """Remove precompressed variants of a site's files, so that they can't
+    be served in place of files that were changed without them.
+    """
+    for path in paths:
+        if is_compressible(path):
+            for encoding in Encoding:
+                _unlink(output_dir.joinpath(path + encoding.suffix))
+
+
+def is_compressible(path: str) -> bool:
+    """Whether a file of a site is precompressed, from its relative path."""
+    pure_path = PurePosixPath(path)
+    return (
+        pure_path.suffix in COMPRESSIBLE_SUFFIXES
+        and not pure_path.name.startswith(".")
+    )
+
+
+def _precompress_file(
+    output_dir: Path, path: str, encodings: Sequence[Encoding]
+) -> List[str]:
+    """Write the variants of a file, returning their relative paths.
+
+    Variants get the file's modification time, so a file whose variants
+    have its modification time isn't read again. Variants of the other
+    encodings are removed, since they would be stale; for example, a
+    Brotli variant from a build with the ``brotli`` package.
+    """
+    from .incremental import write_if_changed
+
+    for encoding in Encoding:
+        if encoding not in encodings:
+            _unlink(output_dir.joinpath(path + encoding.suffix))
+    file_path = output_dir.joinpath(path)
+    file_stat = file_path.stat()
+    variant_paths = [
+        output_dir.joinpath(path + encoding.suffix) for encoding in encodings
+    ]
+    if file_stat.st_size < MIN_SIZE:
+        for variant_path in variant_paths:
+            _unlink(variant_path)
+        return []
+    if all(
+        _mtime_ns(variant_path) == file_stat.st_mtime_ns
+        for variant_path in variant_paths
+    ):
+        return [path + encoding.suffix for encoding in encodings]
+
+    data = file_path.read_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    variants: List[str] = []
+    for encoding, variant_path in zip(encodings, variant_paths):
+        compressed = _compress(data, sha256, encoding)
+        if len(compressed) >= len(data):
+            _unlink(variant_path)
+            continue
+        if write_if_changed(variant_path, compressed):
+            logger.debug(
+                "Compressed %s with %s (%d to %d bytes)",
+                path,
+                encoding.value,
+                len(data),
+                len(compressed),
+            )
+        os.utime(
+            variant_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns)
+        )
+        variants.append(path + encoding.suffix)
+    return variants
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _compress(data: bytes, sha256: str, encoding: Encoding) -> bytes:
+    """Compress content, reusing the variant from the caches."""
+    from .cache import open_cache
+
+    memory_key = (encoding, sha256)
+    with _memory_lock:
+        compressed = _memory.get(memory_key)
+        if compressed is not None:
+            _memory.move_to_end(memory_key)
+    if compressed is not None:
+        CACHE_REQUESTS.inc(cache="precompress-memory", result="hit")
+        return compressed
+    CACHE_REQUESTS.inc(cache="precompress-memory", result="miss")
+
+    cache = open_cache("precompress")
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            CACHE_FORMAT_VERSION, encoding.value, sha256
+        )
+        compressed = cache.get(cache_key)
+    if compressed is None:
+        if encoding is Encoding.gzip:
+            # A fixed modification time makes the variants reproducible,
+            # so unchanged variants aren't rewritten
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        else:
+            import brotli
+
+            compressed = brotli.compress(
+                data, mode=brotli.MODE_TEXT, quality=11
+            )
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, compressed)
+
+    with _memory_lock:
+        _memory[memory_key] = compressed
+        while len(_memory) > MEMORY_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+    return compressed
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
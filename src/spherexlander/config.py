@@ -0,0 +1,132 @@
+"""Configuration of the SPHEREx plugins from the environment."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseSettings, Field
+
+from .placement import PlacementStrategy
+
+__all__ = ["PluginConfig", "load_config"]
+
+
+def _default_cache_dir() -> Path:
+    """The default cache directory, following the XDG base directory
+    specification.
+    """
+    cache_home = os.getenv("XDG_CACHE_HOME")
+    if cache_home:
+        return Path(cache_home).joinpath("spherexlander")
+    return Path.home().joinpath(".cache", "spherexlander")
+
+
+class PluginConfig(BaseSettings):
+    """Configuration for the SPHEREx parser and theme plugins.
+
+    Because the plugins are instantiated by Lander, they are configured by
+    environment variables with a ``SPHEREX_LANDER_`` prefix. For example,
+    ``SPHEREX_LANDER_CACHE_DIR`` sets `cache_dir`.
+    """
+
+    cache_enabled: bool = True
+    """Whether results, such as TeX to plain text conversions, are cached on
+    disk and reused by later builds.
+    """
+
+    cache_dir: Path = Field(default_factory=_default_cache_dir)
+    """Root directory of the on-disk caches.
+
+    Point this at a directory that is saved and restored by the CI service's
+    cache to reuse results across CI runs.
+    """
+
+    cache_max_size: int = 64 * 1024 * 1024
+    """Maximum size, in bytes, of each on-disk cache. The least recently used
+    entries are evicted once a cache exceeds this size.
+    """
+
+    catalogue_path: Optional[Path] = None
+    """Path of a SQLite catalogue of document metadata that builds add their
+    documents to (see `spherexlander.catalogue`).
+    """
+
+    include_cache_persistent: bool = False
+    """Whether the normalized TeX files that parsers read are also stored in
+    an on-disk cache, so that other build processes can reuse them (see
+    `spherexlander.parsers.texinclude.IncludeCache`).
+
+    Each process always keeps the files it reads in memory. The on-disk
+    cache only helps with large shared files, since reading a cache entry
+    costs about as much as reading a small file.
+    """
+
+    inline_critical_css: bool = True
+    """Whether the rules of the theme's stylesheet that a landing page uses
+    are inlined into its head, with the full stylesheet loaded
+    asynchronously (see `spherexlander.themes.spherex.criticalcss`).
+    """
+
+    optimize_images: bool = True
+    """Whether the theme's images, such as the logo, are replaced by
+    variants that are resized for 1x and 2x pixel densities, in WebP and PNG
+    formats (see `spherexlander.themes.spherex.images`). Variants require
+    the Pillow package; without it, the images are copied.
+    """
+
+    parse_preamble_only: bool = False
+    """Whether parsers read the TeX source only up to ``\\begin{document}``.
+
+    The metadata commands of SPHEREx documents are in the preamble, so the
+    body of a document doesn't need to be read to extract its metadata.
+    Macros that are defined in the body aren't replaced in the preamble,
+    though. Parsers read the body on demand (see
+    `spherexlander.parsers.spherexparser.SpherexParser.document_body`).
+    """
+
+    placement: PlacementStrategy = PlacementStrategy.copy
+    """How the PDF, attachments, and theme assets are placed into sites (see
+    `spherexlander.placement`).
+
+    The default copies files. ``reflink`` reflinks files on filesystems that
+    support it, and ``link`` also hard links them, which is fastest but
+    makes a site's files the same files as their sources. Both fall back to
+    copying within the kernel, and then to a copy.
+    """
+
+    placement_threads: int = 8
+    """Maximum number of threads that place a site's PDF and attachments
+    concurrently, and hash them for the landing page (see
+    `spherexlander.attachments.place_downloads`).
+    """
+
+    precompress: bool = True
+    """Whether gzip and Brotli variants of the text files of sites are
+    written next to them, for servers that serve precompressed files (see
+    `spherexlander.compression`). Brotli variants require the ``brotli``
+    package.
+    """
+
+    precompress_threads: int = 4
+    """Maximum number of threads that compress a site's files concurrently.
+    """
+
+    trace: bool = False
+    """Whether to trace the phases of each document build and write the trace
+    next to the built site (see `spherexlander.tracing`).
+    """
+
+    trace_memory: bool = True
+    """Whether traces include the peak memory allocated by each phase.
+    Measuring memory allocations slows down traced builds.
+    """
+
+    class Config:
+        env_prefix = "SPHEREX_LANDER_"
+
+
+def load_config() -> PluginConfig:
+    """Load the plugin configuration from the environment."""
+    return PluginConfig()
@@ -0,0 +1,441 @@
+"""Incremental builds that skip documents whose inputs are unchanged.
+
+A build records a manifest next to the site's output directory (see
+`manifest_path`) with fingerprints of everything that determines the site: the
+TeX source and the files it inputs, the PDF and attachments, the parser,
+the theme assets, the CI metadata, the build settings, and the plugin
+configuration that changes the site's files. A later build
+of the same document can be skipped if `is_up_to_date` finds that none of
+those fingerprints changed.
+
+The manifest is written next to the output directory, rather than in it,
+so that the paths and hashes of the build's inputs aren't published with
+the site.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from logging import getLogger
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from lander import __version__ as lander_version
+from lander.ext.parser import CiMetadata
+from pydantic import BaseModel, Field, ValidationError
+
+from . import __version__ as spherexlander_version
+from .parsers.texinclude import get_include_cache, resolve_include
+from .placement import PlacedFile, place_file
+
+if TYPE_CHECKING:
+    from lander.settings import BuildSettings
+
+__all__ = [
+    "BuildManifest",
+    "FileFingerprint",
+    "MANIFEST_SUFFIX",
+    "compute_build_inputs",
+    "copy_if_changed",
+    "find_tex_files",
+    "is_up_to_date",
+    "manifest_path",
+    "record_build",
+    "write_if_changed",
+]
+
+logger = getLogger(__name__)
+
+MANIFEST_SUFFIX = ".spherex-build.json"
+"""Suffix of the build manifest's file name, after the name of the site's
+output directory.
+"""
+
+LEGACY_MANIFEST_FILENAME = ".spherex-build.json"
+"""Name of the manifest file that earlier versions wrote into sites, which
+builds remove.
+"""
+
+MANIFEST_FORMAT = 1
+"""Version of the manifest's format. Manifests with a different format are
+ignored.
+"""
+
+CHUNK_SIZE = 1024 * 1024
+"""Size of the chunks, in bytes, in which files are read for hashing."""
+
+THEME_DIR = Path(__file__).parent.joinpath("themes", "spherex")
+"""Directory of the spherex theme, whose ``site`` and ``templates``
+directories are fingerprinted.
+"""
+
+
+class FileFingerprint(BaseModel):
+    """The hash of a file, along with the file status it was computed for."""
+
+    size: int
+    """Size of the file, in bytes."""
+
+    mtime_ns: int
+    """Modification time of the file, in nanoseconds."""
+
+    sha256: str
+    """SHA-256 hash of the file's content."""
+
+
+class BuildManifest(BaseModel):
+    """A record of the inputs and outputs of a site build."""
+
+    format: int = MANIFEST_FORMAT
+    """Version of the manifest's format."""
+
+    inputs: Dict[str, str] = Field(default_factory=dict)
+    """Fingerprints of the build inputs, keyed by the name of the input.
+
+    See `compute_build_inputs`.
+    """
+
+    files: Dict[str, FileFingerprint] = Field(default_factory=dict)
+    """Hashes of the input files, keyed by their paths.
+
+    A later build reuses the hash of a file whose size and modification time
+    are unchanged rather than reading the file again.
+    """
+
+    outputs: List[str] = Field(default_factory=list)
+    """Paths of the files in the site, relative to the output directory."""
+
+    @classmethod
+    def read(cls, output_dir: Path) -> Optional[BuildManifest]:
+        """Read the manifest of a site, returning `None` if there is no
+        usable manifest.
+        """
+        path = manifest_path(output_dir)
+        try:
+            manifest = cls.parse_raw(path.read_text())
+        except (OSError, ValueError, ValidationError):
+            return None
+        if manifest.format != MANIFEST_FORMAT:
+            return None
+        return manifest
+
+    def write(self, output_dir: Path) -> None:
+        """Write the manifest of a site, next to its output directory.
+
+        A manifest that an earlier version wrote into the output directory
+        is removed, so that it isn't published.
+        """
+        write_if_changed(
+            manifest_path(output_dir),
+            self.json(indent=2, sort_keys=True).encode("utf-8"),
+        )
+        output_dir.joinpath(LEGACY_MANIFEST_FILENAME).unlink(missing_ok=True)
+
+
+def manifest_path(output_dir: Path) -> Path:
+    """Get the path of a site's build manifest.
+
+    Like the trace (see `spherexlander.tracing.trace_path`), the manifest is
+    written next to the site's output directory, such as
+    ``_build.spherex-build.json`` for ``_build``.
+    """
+    output_dir = Path(os.path.abspath(output_dir))
+    return output_dir.with_name(f"{output_dir.name}{MANIFEST_SUFFIX}")
+
+
+class _FileHasher:
+    """Hashes files, reusing known hashes for files whose size and
+    modification time are unchanged.
+    """
+
+    def __init__(self, known: Optional[Dict[str, FileFingerprint]]) -> None:
+        self._known = known or {}
+        self.files: Dict[str, FileFingerprint] = {}
+
+    def hash(self, path: Path) -> str:
+        """Get the SHA-256 hash of a file, or ``"missing"`` if the file does
+        not exist.
+        """
+        key = str(path.resolve())
+        try:
+            stat = path.stat()
+        except OSError:
+            return "missing"
+        known = self.files.get(key) or self._known.get(key)
+        if (
+            known is None
+            or known.size != stat.st_size
+            or known.mtime_ns != stat.st_mtime_ns
+        ):
+            known = FileFingerprint(
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                sha256=_hash_file(path),
+            )
+        self.files[key] = known
+        return known.sha256
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_parts(parts: Iterator[str]) -> str:
+    """Hash a sequence of strings, without ambiguity between sequences."""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        digest.update(f"{len(encoded)}:".encode("ascii"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def find_tex_files(root_path: Path) -> List[Path]:
+    r"""Find the TeX files that make up a document: the root file and the
+    files it includes, recursively, with ``\input`` and ``\include``
+    commands.
+
+    Included files are resolved as `lander.ext.parser.texutils.normalize
+    .read_tex_file` resolves them: relative to the root file's directory,
+    with a ``.tex`` extension added if necessary. Files that don't exist
+    are included in the list so that they are fingerprinted as missing.
+
+    Files are read through the include cache (see
+    `spherexlander.parsers.texinclude`), so files that the parser already
+    read aren't read again.
+    """
+    cache = get_include_cache()
+    root_dir = root_path.parent
+    files: List[Path] = []
+    pending = [root_path]
+    while pending:
+        path = pending.pop(0)
+        if path in files:
+            continue
+        files.append(path)
+        try:
+            inputs = cache.get(path).inputs
+        except (OSError, UnicodeDecodeError):
+            continue
+        pending.extend(resolve_include(name, root_dir) for name in inputs)
+    return files
+
+
+def compute_build_inputs(
+    settings: BuildSettings, *, manifest: Optional[BuildManifest] = None
+) -> Tuple[Dict[str, str], Dict[str, FileFingerprint]]:
+    """Fingerprint the inputs of a site build.
+
+    Parameters
+    ----------
+    settings
+        The build settings of the document.
+    manifest
+        The manifest of a previous build, whose file hashes are reused for
+        files with the same size and modification time.
+
+    Returns
+    -------
+    inputs : dict
+        Fingerprints of the ``tex`` source files, the ``pdf``, the
+        ``attachments``, the ``parser`` name and version, the ``theme``
+        assets and version, the ``ci`` metadata, the other ``settings``,
+        and the plugin ``config`` that changes the site's files (see
+        `spherexlander.config.PluginConfig`), including which optional
+        codecs are installed.
+    files : dict
+        Hashes of the input files, keyed by their paths, to record in the
+        manifest.
+    """
+    hasher = _FileHasher(manifest.files if manifest else None)
+    source_dir = settings.source_path.parent
+
+    def hash_tex_files() -> Iterator[str]:
+        for path in find_tex_files(settings.source_path):
+            yield os.path.relpath(path, source_dir)
+            yield hasher.hash(path)
+
+    def hash_attachments() -> Iterator[str]:
+        for attachment in settings.attachments:
+            yield attachment.name
+            yield hasher.hash(attachment.file_path)
+
+    def hash_theme_files() -> Iterator[str]:
+        yield settings.theme
+        yield lander_version
+        yield spherexlander_version
+        for dirname in ("site", "templates"):
+            for path in sorted(THEME_DIR.joinpath(dirname).rglob("*")):
+                if path.is_file():
+                    yield path.relative_to(THEME_DIR).as_posix()
+                    yield _hash_file(path)
+
+    ci_metadata = {
+        key: None if value is None else str(value)
+        for key, value in asdict(CiMetadata.create()).items()
+    }
+    build_settings = {
+        "canonical_url": settings.canonical_url,
+        "metadata": settings.metadata,
+        "template_vars": settings.template_vars,
+        "pdf_name": settings.pdf.name,
+    }
+    inputs = {
+        "tex": _hash_parts(hash_tex_files()),
+        "pdf": hasher.hash(settings.pdf.file_path),
+        "attachments": _hash_parts(hash_attachments()),
+        "parser": f"{settings.parser} {spherexlander_version}",
+        "theme": _hash_parts(hash_theme_files()),
+        "ci": json.dumps(ci_metadata, sort_keys=True),
+        "settings": json.dumps(build_settings, sort_keys=True, default=str),
+        "config": json.dumps(_config_inputs(), sort_keys=True),
+    }
+    return inputs, hasher.files
+
+
+def _config_inputs() -> Dict[str, object]:
+    """Get the plugin configuration that changes a site's files, with the
+    encodings and image formats that the installed codecs support.
+    """
+    from .compression import available_encodings
+    from .config import load_config
+    from .themes.spherex.images import available_formats, pillow_available
+
+    config = load_config()
+    encodings = available_encodings() if config.precompress else []
+    image_formats = (
+        available_formats()
+        if config.optimize_images and pillow_available()
+        else []
+    )
+    return {
+        "inline_critical_css": config.inline_critical_css,
+        "optimize_images": config.optimize_images,
+        "parse_preamble_only": config.parse_preamble_only,
+        "placement": config.placement.value,
+        "precompress": config.precompress,
+        "encodings": [encoding.value for encoding in encodings],
+        "image_formats": [
+            image_format.value for image_format in image_formats
+        ],
+    }
+
+
+def is_up_to_date(settings: BuildSettings) -> bool:
+    """Determine whether a document's site is up to date, so that building
+    it again would not change it.
+
+    A site is up to date if its output directory has a build manifest whose
+    inputs match the current inputs (see `compute_build_inputs`), and all of
+    the site's files still exist.
+
+    Notes
+    -----
+    Like ``make``, this check trusts that a file whose size and modification
+    time are unchanged has the same content.
+    """
+    output_dir = settings.output_dir
+    manifest = BuildManifest.read(output_dir)
+    if manifest is None:
+        return False
+    if not all(output_dir.joinpath(p).is_file() for p in manifest.outputs):
+        logger.debug("Files are missing from %s", output_dir)
+        return False
+    inputs, _ = compute_build_inputs(settings, manifest=manifest)
+    changed = [
+        name
+        for name in sorted(set(inputs) | set(manifest.inputs))
+        if inputs.get(name) != manifest.inputs.get(name)
+    ]
+    if changed:
+        logger.debug(
+            "Inputs of %s changed: %s", output_dir, ", ".join(changed)
+        )
+        return False
+    return True
+
+
+def record_build(
+    settings: BuildSettings,
+    output_dir: Path,
+    outputs: List[str],
+    *,
+    placed: Optional[Dict[Path, PlacedFile]] = None,
+) -> None:
+    """Write the build manifest for a site that was built, and remove the
+    files that the previous build wrote but this one didn't (such as
+    precompressed variants after precompression is disabled).
+
+    Parameters
+    ----------
+    settings
+        The build settings of the document.
+    output_dir
+        The site's output directory.
+    outputs
+        Paths of the files in the site, relative to ``output_dir``.
+    placed
+        The files that were placed into the site (see
+        `spherexlander.placement.place_file`), keyed by their source paths.
+        The hashes of files that were read to place them are reused.
+    """
+    previous = BuildManifest.read(output_dir) or BuildManifest()
+    for path, placed_file in (placed or {}).items():
+        if placed_file.sha256 is not None:
+            previous.files[str(path.resolve())] = FileFingerprint(
+                size=placed_file.size,
+                mtime_ns=placed_file.mtime_ns,
+                sha256=placed_file.sha256,
+            )
+    inputs, files = compute_build_inputs(settings, manifest=previous)
+    manifest = BuildManifest(
+        inputs=inputs, files=files, outputs=sorted(outputs)
+    )
+    manifest.write(output_dir)
+    # Paths that leave the site are ignored, in case the manifest was edited
+    for stale in sorted(set(previous.outputs) - set(outputs)):
+        stale_path = PurePosixPath(stale)
+        if stale_path.is_absolute() or ".." in stale_path.parts:
+            continue
+        logger.debug("Removing %s, which the build no longer writes", stale)
+        output_dir.joinpath(stale_path).unlink(missing_ok=True)
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Write a file, unless it already has the same content.
+
+    Leaving an unchanged file in place preserves its modification time.
+
+    Returns
+    -------
+    bool
+        `True` if the file was written.
+    """
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
+
+
+def copy_if_changed(source: Path, destination: Path) -> bool:
+    """Copy a file, unless the destination already has the same content.
+
+    The file is placed with the configured strategy (see
+    `spherexlander.placement.place_file`).
+
+    Returns
+    -------
+    bool
+        `True` if the file was copied.
+    """
+    return place_file(source, destination).placed
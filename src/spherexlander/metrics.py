@@ -0,0 +1,452 @@
+"""Operational metrics of document builds.
+
+The parsers and the theme update the process's `MetricsRegistry` as they
+work: the durations of parsing, pandoc conversions, rendering templates and
+copying files, the number of pandoc invocations, cache hits and misses, and
+the bytes of PDFs and attachments written. A batch build (see
+`spherexlander.batch.run_batch`) collects the metrics of each document from
+its worker process, merges them, and can write them in the Prometheus
+textfile collector format and as JSON (see `write_metrics`), so no metrics
+server needs to be running.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+__all__ = [
+    "BATCH_SECONDS",
+    "BATCH_TIMESTAMP",
+    "CACHE_REQUESTS",
+    "Counter",
+    "DOCUMENTS",
+    "DOWNLOAD_BYTES",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "PANDOC_INVOCATIONS",
+    "PHASE_SECONDS",
+    "REGISTRY",
+    "write_metrics",
+]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+"""Upper bounds of the buckets of duration histograms, in seconds."""
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric(ABC):
+    """A metric with a value for each combination of its label values."""
+
+    type = ""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} has the labels {self.labelnames}, got "
+                f"{tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Clear the values."""
+
+    @abstractmethod
+    def samples(self) -> List[Dict[str, Any]]:
+        """Get the values, as JSON-serializable samples by label values."""
+
+    @abstractmethod
+    def merge(self, samples: List[Dict[str, Any]]) -> None:
+        """Add the values of samples (from `samples`) to the metric."""
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class Counter(_Metric):
+    """A count that only increases, such as the number of documents built."""
+
+    type = "counter"
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increase the count of the given label values."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Get the count of the given label values."""
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"labels": dict(zip(self.labelnames, key)), "value": value}
+                for key, value in sorted(self._values.items())
+            ]
+
+    def merge(self, samples: List[Dict[str, Any]]) -> None:
+        for sample in samples:
+            self.inc(sample["value"], **sample["labels"])
+
+
+class Gauge(Counter):
+    """A value that can go up or down, such as the duration of a batch.
+
+    Merging gauges keeps the merged value.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value of the given label values."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def merge(self, samples: List[Dict[str, Any]]) -> None:
+        for sample in samples:
+            self.set(sample["value"], **sample["labels"])
+
+
+class Histogram(_Metric):
+    """The distribution of observed values, such as durations, in buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self, *args: Any, buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count of each bucket (not cumulative, with
+        # a last bucket for values above the largest bound), and the sum.
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observed value for the given label values."""
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the context, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """Get the number of values observed for the given label values."""
+        values = self._values.get(self._label_values(labels))
+        return sum(values[0]) if values else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "buckets": list(counts),
+                    "sum": total,
+                }
+                for key, (counts, total) in sorted(self._values.items())
+            ]
+
+    def merge(self, samples: List[Dict[str, Any]]) -> None:
+        for sample in samples:
+            key = self._label_values(sample["labels"])
+            with self._lock:
+                counts, total = self._values.get(
+                    key, ([0] * (len(self.buckets) + 1), 0.0)
+                )
+                merged = [a + b for a, b in zip(counts, sample["buckets"])]
+                self._values[key] = (merged, total + sample["sum"])
+
+
+class MetricsRegistry:
+    """A set of metrics, which can be snapshotted, merged, and exported.
+
+    Metrics are updated from any thread. Worker processes send snapshots of
+    their registries (see `snapshot`) to the process that merges them (see
+    `merge`).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Get the counter with a name, creating it if necessary."""
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Get the gauge with a name, creating it if necessary."""
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Histogram:
+        """Get the histogram with a name, creating it if necessary."""
+        return self._get(Histogram, name, documentation, labelnames)
+
+    def like(self, metric: M) -> M:
+        """Get the metric with the name, type, documentation, and labels of
+        another registry's metric, creating it if necessary.
+        """
+        return self._get(
+            type(metric), metric.name, metric.documentation, metric.labelnames
+        )
+
+    def _get(
+        self,
+        metric_type: Any,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+    ) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = metric_type(self, name, documentation, labelnames)
+            self._metrics[name] = metric
+        elif type(metric) is not metric_type:
+            raise ValueError(f"{name} is already a {metric.type}")
+        return metric
+
+    def reset(self) -> None:
+        """Clear the values of every metric."""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the values of the metrics, as JSON-serializable data."""
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "samples": metric.samples(),
+            }
+            for name, metric in sorted(self._metrics.items())
+        }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add the values of a snapshot (from `snapshot`) to the metrics."""
+        types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+        for name, data in snapshot.items():
+            metric = self._get(
+                types[data["type"]], name, data["help"], data["labelnames"]
+            )
+            metric.merge(data["samples"])
+
+    def to_prometheus(self) -> str:
+        """Format the metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample in samples:
+                labels = sample["labels"]
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    bounds = [*map(_format_value, metric.buckets), "+Inf"]
+                    for bound, count in zip(bounds, sample["buckets"]):
+                        cumulative += count
+                        bucket_labels = {**labels, "le": bound}
+                        lines.append(
+                            f"{name}_bucket{_format_labels(bucket_labels)} "
+                            f"{cumulative}"
+                        )
+                    lines.append(
+                        f"{name}_sum{_format_labels(labels)} "
+                        f"{_format_value(sample['sum'])}"
+                    )
+                    lines.append(
+                        f"{name}_count{_format_labels(labels)} {cumulative}"
+                    )
+                else:
+                    lines.append(
+                        f"{name}{_format_labels(labels)} "
+                        f"{_format_value(sample['value'])}"
+                    )
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    formatted = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+    return f"{{{formatted}}}"
+
+
+def _format_value(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def write_metrics(
+    registry: MetricsRegistry, path: Path, json_path: Optional[Path] = None
+) -> None:
+    """Write metrics for the Prometheus textfile collector, and as JSON.
+
+    Each file is replaced atomically, so that a collector never reads a
+    partially written file.
+
+    Parameters
+    ----------
+    registry
+        The metrics.
+    path
+        Path of the Prometheus text file, which should have a ``.prom``
+        extension for the textfile collector.
+    json_path
+        Path of the JSON file. The default is ``path`` with a ``.json``
+        extension.
+    """
+    if json_path is None:
+        json_path = path.with_suffix(".json")
+    _write_atomic(path, registry.to_prometheus())
+    _write_atomic(json_path, json.dumps(registry.snapshot(), indent=2))
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+REGISTRY = MetricsRegistry()
+"""The metrics of this process."""
+
+DOCUMENTS = REGISTRY.counter(
+    "spherex_lander_documents_total",
+    "Documents processed by batch builds, by parser and outcome.",
+    ["parser", "status"],
+)
+
+PHASE_SECONDS = REGISTRY.histogram(
+    "spherex_lander_phase_duration_seconds",
+    "Durations of the phases of document builds: parsing a document, "
+    "a pandoc conversion, rendering a template, copying a file, and "
+    "precompressing a site.",
+    ["phase"],
+)
+
+PANDOC_INVOCATIONS = REGISTRY.counter(
+    "spherex_lander_pandoc_invocations_total",
+    "Number of times pandoc was run.",
+)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "spherex_lander_cache_requests_total",
+    "Lookups in the include cache and the on-disk caches, by result.",
+    ["cache", "result"],
+)
+
+DOWNLOAD_BYTES = REGISTRY.counter(
+    "spherex_lander_download_bytes_written_total",
+    "Bytes of PDFs and attachments copied into sites (unchanged files "
+    "aren't copied).",
+    ["kind"],
+)
+
+BATCH_SECONDS = REGISTRY.gauge(
+    "spherex_lander_batch_duration_seconds",
+    "Wall time of the last batch, in seconds.",
+)
+
+BATCH_TIMESTAMP = REGISTRY.gauge(
+    "spherex_lander_batch_completion_timestamp_seconds",
+    "Unix time when the last batch finished.",
+)
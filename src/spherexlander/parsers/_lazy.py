@@ -0,0 +1,46 @@
+"""Lazy loading of the classes exported by the parser packages."""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any, Callable, Dict
+
+__all__ = ["lazy_getattr"]
+
+
+def lazy_getattr(
+    package: str, attributes: Dict[str, str]
+) -> Callable[[str], Any]:
+    """Create a module ``__getattr__`` function (PEP 562) that imports a
+    package's exported classes from their submodules when they are first
+    used.
+
+    Lander loads every parser entry point when it starts, so the parser
+    packages don't import their submodules eagerly. Loading a parser class
+    imports only its ``parser`` submodule, which in turn defers the import
+    of its data model until metadata is extracted.
+
+    Parameters
+    ----------
+    package
+        Name of the package (the ``__name__`` of its ``__init__`` module).
+    attributes
+        Mapping of exported names to the names of the submodules that
+        define them.
+
+    Returns
+    -------
+    callable
+        The ``__getattr__`` function for the package.
+    """
+
+    def __getattr__(name: str) -> Any:
+        try:
+            module_name = attributes[name]
+        except KeyError:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            ) from None
+        return getattr(import_module(f"{package}.{module_name}"), name)
+
+    return __getattr__
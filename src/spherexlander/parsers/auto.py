@@ -0,0 +1,166 @@
+"""A parser that detects the type of a SPHEREx document and delegates to the
+parser for that type.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from importlib import import_module
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Type
+
+from .spherexparser import SpherexParser
+
+if TYPE_CHECKING:
+    from lander.settings import BuildSettings
+
+__all__ = [
+    "DOCUMENT_PARSERS",
+    "SpherexAutoParser",
+    "detect_document_type",
+    "get_parser_class",
+    "get_parser_name",
+]
+
+logger = getLogger(__name__)
+
+DOCUMENT_PARSERS: Dict[str, Tuple[str, str]] = {
+    "MS": ("pipelinemodule", "SpherexPipelineModuleParser"),
+    "PM": ("projectmanagement", "SpherexProjectManagementParser"),
+    "DP": ("ssdcdp", "SpherexSsdcDpParser"),
+    "IF": ("ssdcif", "SpherexSsdcIfParser"),
+    "OP": ("ssdcop", "SpherexSsdcOpParser"),
+    "TN": ("ssdctn", "SpherexSsdcTnParser"),
+    "TR": ("ssdctr", "SpherexSsdcTrParser"),
+}
+"""The parser for each document type, as the name of its package in
+`spherexlander.parsers` and the name of its class.
+
+The document type is the option of the ``spherex`` document class (such as
+``\\documentclass[MS]{spherex}``), which is also the second part of the
+document's handle (such as ``SSDC-MS-001``).
+"""
+
+SNIFF_SIZE = 8192
+"""Number of bytes at the start of the root TeX file that are read to detect
+the document type.
+"""
+
+DOCUMENTCLASS_PATTERN = re.compile(
+    r"^[^%\n]*?\\documentclass\s*\[(?P<options>[^\]]*)\]\s*\{spherex\}",
+    re.MULTILINE,
+)
+"""Regular expression for the ``spherex`` document class command and its
+options, outside of comments.
+"""
+
+HANDLE_PATTERN = re.compile(
+    r"^[^%\n]*?\\spherexHandle\s*\{\s*(?P<handle>[^}]*?)\s*\}",
+    re.MULTILINE,
+)
+"""Regular expression for the ``\\spherexHandle`` command, outside of
+comments.
+"""
+
+_detected_types: Dict[str, str] = {}
+"""Document types that were detected, keyed by the hash of the start of the
+root file.
+"""
+
+_detected_types_lock = threading.Lock()
+
+
+class SpherexAutoParser(SpherexParser):
+    """A parser that detects the type of a SPHEREx document (see
+    `detect_document_type`) and delegates to the parser for that type.
+
+    Creating this parser creates an instance of the document type's parser,
+    so the metadata has the document type's model. Use this parser (named
+    ``spherex``) for repositories or batches with different document types.
+    """
+
+    def __new__(cls, *, settings: BuildSettings) -> SpherexParser:
+        parser_class = get_parser_class(settings.source_path)
+        logger.debug(
+            "Parsing %s with %s", settings.source_path, parser_class.__name__
+        )
+        # The instance isn't a SpherexAutoParser, so __init__ isn't called
+        # again on it.
+        return parser_class(settings=settings)
+
+
+def get_parser_class(source_path: Path) -> Type[SpherexParser]:
+    """Get the parser class for a document (see `detect_document_type`)."""
+    package, class_name = DOCUMENT_PARSERS[detect_document_type(source_path)]
+    module = import_module(f"{__package__}.{package}")
+    parser_class: Type[SpherexParser] = getattr(module, class_name)
+    return parser_class
+
+
+def get_parser_name(source_path: Path) -> str:
+    """Get the name of the parsing plugin for a document's type, such as
+    ``spherex-ssdc-ms`` (see `detect_document_type`).
+    """
+    return f"spherex-ssdc-{detect_document_type(source_path).lower()}"
+
+
+def detect_document_type(source_path: Path) -> str:
+    r"""Detect the type of a SPHEREx document, such as ``MS`` or ``TR``.
+
+    The type is found from the option of the ``\documentclass{spherex}``
+    command or, if there is no such option, the prefix of the
+    ``\spherexHandle`` command, in the first `SNIFF_SIZE` bytes of the root
+    TeX file. If neither is found there, the document's preamble (including
+    the files it inputs) is searched.
+
+    Types are remembered by the hash of the start of the root file, so
+    documents are only sniffed again when they change.
+
+    Raises
+    ------
+    ValueError
+        Raised if the document's type can't be detected.
+    """
+    with source_path.open("rb") as f:
+        header = f.read(SNIFF_SIZE)
+    key = hashlib.sha256(header).hexdigest()
+    with _detected_types_lock:
+        document_type = _detected_types.get(key)
+    if document_type is not None:
+        return document_type
+
+    document_type = _sniff(header.decode("utf-8", errors="ignore"))
+    if document_type is None:
+        from .texstream import read_tex_preamble
+
+        document_type = _sniff(read_tex_preamble(source_path))
+        if document_type is None:
+            raise ValueError(
+                f"Cannot detect the type of {source_path}: it has no "
+                "\\documentclass{spherex} option or \\spherexHandle prefix "
+                f"of a known type ({', '.join(DOCUMENT_PARSERS)}). Set the "
+                "parser for the document's type."
+            )
+    else:
+        # The type only depends on the header, so it can be remembered
+        with _detected_types_lock:
+            _detected_types[key] = document_type
+    return document_type
+
+
+def _sniff(tex_source: str) -> Optional[str]:
+    """Find the document type in TeX source."""
+    match = DOCUMENTCLASS_PATTERN.search(tex_source)
+    if match is not None:
+        for option in match.group("options").split(","):
+            if option.strip().upper() in DOCUMENT_PARSERS:
+                return option.strip().upper()
+    match = HANDLE_PATTERN.search(tex_source)
+    if match is not None:
+        parts = match.group("handle").split("-")
+        if len(parts) > 1 and parts[1].upper() in DOCUMENT_PARSERS:
+            return parts[1].upper()
+    return None
@@ -0,0 +1,808 @@
+"""Inspection of a PDF's structure and document information, without a PDF
+library.
+
+`inspect_pdf` memory-maps the PDF and only reads the objects it needs: the
+header, the first object (to detect linearization), the trailer and
+cross-reference sections (classic tables and cross-reference streams,
+following ``/Prev`` for incrementally updated files), the document catalog
+and its page tree root, and the document information dictionary. Objects in
+object streams are found through the cross-reference streams. Only the pages
+of the file holding those structures are read from disk, so inspecting a
+large PDF is about as fast as inspecting a small one.
+"""
+
+from __future__ import annotations
+
+import datetime
+import mmap
+import re
+import zlib
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+if TYPE_CHECKING:
+    from .spherexdata import PdfInfo
+
+__all__ = [
+    "PdfError",
+    "PdfReader",
+    "cross_check_pdf",
+    "inspect_pdf",
+    "parse_pdf_date",
+]
+
+HEADER_SIZE = 1024
+"""Number of bytes at the start of the file in which the header and the
+linearization dictionary are searched for.
+"""
+
+TRAILER_SIZE = 2048
+"""Number of bytes at the end of the file in which ``startxref`` is searched
+for.
+"""
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+DELIMITERS = b"()<>[]{}/%"
+
+_NUMBER_PATTERN = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_TOKEN_PATTERN = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]+")
+_NAME_ESCAPE_PATTERN = re.compile(rb"#([0-9A-Fa-f]{2})")
+_HEADER_PATTERN = re.compile(rb"%PDF-(\d+\.\d+)")
+_OBJECT_HEADER_PATTERN = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+_DATE_PATTERN = re.compile(
+    r"^(?:D:)?(?P<year>\d{4})(?P<month>\d{2})?(?P<day>\d{2})?"
+    r"(?P<hour>\d{2})?(?P<minute>\d{2})?(?P<second>\d{2})?"
+    r"(?:(?P<utc>Z)|(?P<sign>[+-])(?P<tzhour>\d{2})'?(?P<tzminute>\d{2})?)?"
+)
+_HANDLE_PATTERN = re.compile(r"\b[A-Z]+-[A-Z]{2}-\d+\b")
+_VERSION_PATTERN = re.compile(
+    r"\b(?:version|ver\.|v)\s*(\d+(?:\.\d+)*[a-z]?)\b", re.IGNORECASE
+)
+
+_PDF_DOC_ENCODING = {
+    0x18: "˘",
+    0x19: "ˇ",
+    0x1A: "ˆ",
+    0x1B: "˙",
+    0x1C: "˝",
+    0x1D: "˛",
+    0x1E: "˚",
+    0x1F: "˜",
+    0x80: "•",
+    0x81: "†",
+    0x82: "‡",
+    0x83: "…",
+    0x84: "—",
+    0x85: "–",
+    0x86: "ƒ",
+    0x87: "⁄",
+    0x88: "‹",
+    0x89: "›",
+    0x8A: "−",
+    0x8B: "‰",
+    0x8C: "„",
+    0x8D: "“",
+    0x8E: "”",
+    0x8F: "‘",
+    0x90: "’",
+    0x91: "‚",
+    0x92: "™",
+    0x93: "ﬁ",
+    0x94: "ﬂ",
+    0x95: "Ł",
+    0x96: "Œ",
+    0x97: "Š",
+    0x98: "Ÿ",
+    0x99: "Ž",
+    0x9A: "ı",
+    0x9B: "ł",
+    0x9C: "œ",
+    0x9D: "š",
+    0x9E: "ž",
+    0xA0: "€",
+}
+"""Characters of PDFDocEncoding that differ from Latin-1."""
+
+
+class PdfError(ValueError):
+    """Raised if a PDF's structure can't be read."""
+
+
+class Name(str):
+    """A PDF name object, such as ``/Type``, without the slash."""
+
+
+class Ref(NamedTuple):
+    """An indirect reference to a PDF object."""
+
+    number: int
+    generation: int
+
+
+class Stream(NamedTuple):
+    """A PDF stream object: its dictionary and the offset of its data."""
+
+    dictionary: Dict[str, Any]
+    offset: int
+
+
+class _Keyword(str):
+    """A bare keyword, such as ``R`` or ``endobj``."""
+
+
+class PdfReader:
+    """A reader of the objects of a PDF, resolving them through its
+    cross-reference sections.
+
+    Parameters
+    ----------
+    data
+        The PDF's content, usually a memory map of the file.
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap]) -> None:
+        self.data = data
+        self.size = len(data)
+        self.trailer: Dict[str, Any] = {}
+        # Object number to (type, field 2, field 3) of the newest entry
+        self._xref: Dict[int, Tuple[int, int, int]] = {}
+        self._object_streams: Dict[int, Tuple[bytes, List[int]]] = {}
+        self._read_xref_sections()
+
+    @property
+    def encrypted(self) -> bool:
+        """Whether the PDF is encrypted, in which case its strings and
+        streams can't be read.
+        """
+        return "Encrypt" in self.trailer
+
+    def header_version(self) -> Optional[str]:
+        """The PDF version in the file's header, such as ``1.5``."""
+        match = _HEADER_PATTERN.search(self.data[:HEADER_SIZE])
+        return match.group(1).decode("ascii") if match else None
+
+    def linearization(self) -> Optional[Dict[str, Any]]:
+        """The linearization parameter dictionary, if the first object in the
+        file is one.
+        """
+        header = self.data[:HEADER_SIZE]
+        match = _OBJECT_HEADER_PATTERN.search(header)
+        if match is None:
+            return None
+        try:
+            value, _ = self._parse(match.end())
+        except PdfError:
+            return None
+        if isinstance(value, Stream):
+            value = value.dictionary
+        if isinstance(value, dict) and "Linearized" in value:
+            return value
+        return None
+
+    def resolve(self, value: Any) -> Any:
+        """Resolve an indirect reference, returning other values as is.
+
+        Missing objects resolve to `None`, as the PDF specification requires.
+        """
+        depth = 0
+        while isinstance(value, Ref):
+            depth += 1
+            if depth > 32:
+                raise PdfError("Too many levels of indirect references")
+            value = self._get_object(value.number)
+        return value
+
+    def get(self, dictionary: Dict[str, Any], key: str) -> Any:
+        """Get a resolved value from a dictionary."""
+        return self.resolve(dictionary.get(key))
+
+    def _get_object(self, number: int) -> Any:
+        entry = self._xref.get(number)
+        if entry is None:
+            return None
+        kind, field2, field3 = entry
+        if kind == 1:
+            return self._parse_indirect(field2, number)
+        if kind == 2:
+            return self._get_compressed_object(field2, field3, number)
+        return None
+
+    def _parse_indirect(self, offset: int, number: Optional[int]) -> Any:
+        """Parse the indirect object (``N G obj ... endobj``) at an offset."""
+        match = _OBJECT_HEADER_PATTERN.match(self.data, offset)
+        if match is None or (
+            number is not None and int(match.group(1)) != number
+        ):
+            raise PdfError(f"No object {number} at offset {offset}")
+        value, _ = self._parse(match.end())
+        return value
+
+    def _get_compressed_object(
+        self, stream_number: int, index: int, number: int
+    ) -> Any:
+        cached = self._object_streams.get(stream_number)
+        if cached is None:
+            stream = self._get_object(stream_number)
+            if not isinstance(stream, Stream):
+                raise PdfError(f"Object {stream_number} isn't a stream")
+            content = self.stream_data(stream)
+            count = self.resolve(stream.dictionary.get("N"))
+            first = self.resolve(stream.dictionary.get("First"))
+            header = _Parser(content, 0).parse_many(2 * int(count))
+            offsets = [int(first) + int(o) for o in header[1::2]]
+            cached = (content, [int(n) for n in header[::2]] + offsets)
+            self._object_streams[stream_number] = cached
+        content, table = cached
+        count = len(table) // 2
+        if index >= count or table[index] != number:
+            # The index is a hint; search the stream's header for the object
+            try:
+                index = table[:count].index(number)
+            except ValueError:
+                return None
+        return _Parser(content, table[count + index]).parse()
+
+    def stream_data(self, stream: Stream) -> bytes:
+        """Read and decode a stream's data.
+
+        Only the ``FlateDecode`` filter (with PNG or TIFF predictors) is
+        supported, which is what cross-reference streams and object streams
+        use.
+        """
+        length = self.resolve(stream.dictionary.get("Length"))
+        if not isinstance(length, int) or length < 0:
+            raise PdfError("Stream has no valid /Length")
+        data = bytes(self.data[stream.offset : stream.offset + length])
+        filters = self.resolve(stream.dictionary.get("Filter"))
+        params = self.resolve(stream.dictionary.get("DecodeParms"))
+        if filters is None:
+            return data
+        if not isinstance(filters, list):
+            filters, params = [filters], [params]
+        elif not isinstance(params, list):
+            params = [params] * len(filters)
+        for name, param in zip(filters, params):
+            if name != "FlateDecode":
+                raise PdfError(f"Unsupported stream filter: /{name}")
+            try:
+                data = zlib.decompressobj().decompress(data)
+            except zlib.error as e:
+                raise PdfError(f"Cannot decompress a stream: {e}") from e
+            param = self.resolve(param)
+            if isinstance(param, dict):
+                data = _unpredict(data, param)
+        return data
+
+    def _read_xref_sections(self) -> None:
+        tail = self.data[max(0, self.size - TRAILER_SIZE) :]
+        position = tail.rfind(b"startxref")
+        if position == -1:
+            raise PdfError("No startxref found; the file isn't a PDF")
+        tokens = _Parser(tail, position + len(b"startxref")).parse_many(1)
+        offset = tokens[0] if tokens else None
+        if not isinstance(offset, int):
+            raise PdfError("Invalid startxref offset")
+
+        visited = set()
+        pending: List[int] = [offset]
+        while pending:
+            offset = pending.pop(0)
+            if offset in visited or not 0 <= offset < self.size:
+                continue
+            visited.add(offset)
+            trailer = self._read_xref_section(offset)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            # A hybrid file's cross-reference stream takes precedence over
+            # the previous sections
+            if isinstance(trailer.get("XRefStm"), int):
+                pending.insert(0, trailer["XRefStm"])
+            if isinstance(trailer.get("Prev"), int):
+                pending.append(trailer["Prev"])
+        if "Root" not in self.trailer:
+            raise PdfError("The trailer has no /Root")
+
+    def _read_xref_section(self, offset: int) -> Dict[str, Any]:
+        parser = _Parser(self.data, offset)
+        parser.skip_whitespace()
+        if self.data[parser.position : parser.position + 4] == b"xref":
+            parser.position += 4
+            return self._read_xref_table(parser)
+
+        stream = self._parse_indirect(offset, None)
+        if not isinstance(stream, Stream):
+            raise PdfError(f"No cross-reference section at offset {offset}")
+        dictionary = stream.dictionary
+        widths = [int(w) for w in dictionary.get("W", [])]
+        if len(widths) != 3:
+            raise PdfError("Invalid /W in a cross-reference stream")
+        index = dictionary.get("Index", [0, dictionary.get("Size", 0)])
+        content = self.stream_data(stream)
+        entry_size = sum(widths)
+        position = 0
+        for first, count in zip(index[::2], index[1::2]):
+            for number in range(int(first), int(first) + int(count)):
+                entry = content[position : position + entry_size]
+                position += entry_size
+                if len(entry) < entry_size:
+                    break
+                fields = []
+                start = 0
+                for width in widths:
+                    fields.append(
+                        int.from_bytes(entry[start : start + width], "big")
+                    )
+                    start += width
+                # The type defaults to 1 if its field has no width
+                kind = fields[0] if widths[0] else 1
+                self._xref.setdefault(number, (kind, fields[1], fields[2]))
+        return dictionary
+
+    def _read_xref_table(self, parser: _Parser) -> Dict[str, Any]:
+        while True:
+            parser.skip_whitespace()
+            if self.data[parser.position : parser.position + 7] == b"trailer":
+                parser.position += 7
+                trailer = parser.parse()
+                if not isinstance(trailer, dict):
+                    raise PdfError("Invalid trailer dictionary")
+                return trailer
+            header = parser.parse_many(2)
+            if len(header) != 2 or not all(isinstance(v, int) for v in header):
+                raise PdfError("Invalid cross-reference table")
+            first, count = header
+            parser.skip_whitespace()
+            start = parser.position
+            # Entries are 20 bytes each, so only the entries that are used
+            # need to be read.
+            for i in range(count):
+                entry = self.data[start + 20 * i : start + 20 * i + 18]
+                try:
+                    field2 = int(entry[0:10])
+                    field3 = int(entry[11:16])
+                except ValueError:
+                    raise PdfError("Invalid cross-reference entry") from None
+                kind = 1 if entry[17:18] == b"n" else 0
+                self._xref.setdefault(first + i, (kind, field2, field3))
+            parser.position = start + 20 * count
+
+    def _parse(self, position: int) -> Tuple[Any, int]:
+        parser = _Parser(self.data, position)
+        value = parser.parse()
+        if isinstance(value, dict):
+            # A dictionary followed by the stream keyword is a stream
+            parser.skip_whitespace()
+            if self.data[parser.position : parser.position + 6] == b"stream":
+                offset = parser.position + 6
+                if self.data[offset : offset + 2] == b"\r\n":
+                    offset += 2
+                elif self.data[offset : offset + 1] in (b"\n", b"\r"):
+                    offset += 1
+                return Stream(value, offset), offset
+        return value, parser.position
+
+
+class _Parser:
+    """A parser of PDF objects from a position in a buffer."""
+
+    def __init__(self, data: Union[bytes, mmap.mmap], position: int) -> None:
+        self.data = data
+        self.position = position
+
+    def skip_whitespace(self) -> None:
+        data = self.data
+        while self.position < len(data):
+            char = data[self.position]
+            if char in WHITESPACE:
+                self.position += 1
+            elif char == 0x25:  # %
+                end = data.find(b"\n", self.position)
+                if end == -1:
+                    end = data.find(b"\r", self.position)
+                self.position = len(data) if end == -1 else end + 1
+            else:
+                break
+
+    def parse_many(self, count: int) -> List[Any]:
+        """Parse a number of objects, or fewer at the end of the buffer."""
+        values = []
+        for _ in range(count):
+            self.skip_whitespace()
+            if self.position >= len(self.data):
+                break
+            values.append(self.parse())
+        return values
+
+    def parse(self) -> Any:
+        """Parse an object, including an indirect reference."""
+        value = self._parse_direct()
+        if isinstance(value, int) and not isinstance(value, bool):
+            # Look ahead for "G R"
+            start = self.position
+            self.skip_whitespace()
+            generation = self._match_number()
+            if isinstance(generation, int):
+                self.skip_whitespace()
+                if self.data[self.position : self.position + 1] == b"R":
+                    self.position += 1
+                    return Ref(value, generation)
+            self.position = start
+        return value
+
+    def _parse_direct(self) -> Any:
+        self.skip_whitespace()
+        data = self.data
+        if self.position >= len(data):
+            raise PdfError("Unexpected end of data")
+        char = data[self.position : self.position + 1]
+        if char == b"/":
+            self.position += 1
+            match = _TOKEN_PATTERN.match(data, self.position)
+            raw = match.group(0) if match else b""
+            self.position += len(raw)
+            raw = _NAME_ESCAPE_PATTERN.sub(
+                lambda m: bytes([int(m.group(1), 16)]), raw
+            )
+            return Name(raw.decode("utf-8", errors="replace"))
+        if data[self.position : self.position + 2] == b"<<":
+            self.position += 2
+            dictionary: Dict[str, Any] = {}
+            while True:
+                self.skip_whitespace()
+                if data[self.position : self.position + 2] == b">>":
+                    self.position += 2
+                    return dictionary
+                key = self._parse_direct()
+                if not isinstance(key, Name):
+                    raise PdfError("Dictionary key isn't a name")
+                dictionary[str(key)] = self.parse()
+        if char == b"[":
+            self.position += 1
+            array: List[Any] = []
+            while True:
+                self.skip_whitespace()
+                if data[self.position : self.position + 1] == b"]":
+                    self.position += 1
+                    return array
+                if self.position >= len(data):
+                    raise PdfError("Unterminated array")
+                array.append(self.parse())
+        if char == b"(":
+            return self._parse_literal_string()
+        if char == b"<":
+            end = data.find(b">", self.position)
+            if end == -1:
+                raise PdfError("Unterminated hexadecimal string")
+            digits = bytes(
+                c for c in data[self.position + 1 : end] if c not in WHITESPACE
+            )
+            self.position = end + 1
+            if len(digits) % 2:
+                digits += b"0"
+            try:
+                return bytes.fromhex(digits.decode("ascii"))
+            except ValueError:
+                raise PdfError("Invalid hexadecimal string") from None
+        number = self._match_number()
+        if number is not None:
+            return number
+        match = _TOKEN_PATTERN.match(data, self.position)
+        if match is None:
+            raise PdfError(f"Unexpected character at offset {self.position}")
+        self.position = match.end()
+        token = match.group(0)
+        if token == b"true":
+            return True
+        if token == b"false":
+            return False
+        if token == b"null":
+            return None
+        return _Keyword(token.decode("latin-1"))
+
+    def _match_number(self) -> Optional[Union[int, float]]:
+        match = _NUMBER_PATTERN.match(self.data, self.position)
+        if match is None:
+            return None
+        end = match.end()
+        # A number is followed by whitespace or a delimiter
+        if end < len(self.data) and (
+            self.data[end] not in WHITESPACE
+            and self.data[end] not in DELIMITERS
+        ):
+            return None
+        self.position = end
+        text = match.group(0)
+        if b"." in text:
+            return float(text)
+        return int(text)
+
+    def _parse_literal_string(self) -> bytes:
+        data = self.data
+        position = self.position + 1
+        depth = 1
+        output = bytearray()
+        while position < len(data):
+            char = data[position]
+            position += 1
+            if char == 0x5C:  # backslash
+                if position >= len(data):
+                    break
+                escaped = data[position]
+                position += 1
+                if escaped in b"01234567":
+                    digits = bytes([escaped])
+                    while (
+                        len(digits) < 3
+                        and position < len(data)
+                        and data[position] in b"01234567"
+                    ):
+                        digits += bytes([data[position]])
+                        position += 1
+                    output.append(int(digits, 8) & 0xFF)
+                elif escaped == 0x0D:  # line continuation
+                    if data[position : position + 1] == b"\n":
+                        position += 1
+                elif escaped != 0x0A:
+                    output.extend(
+                        {
+                            0x6E: b"\n",
+                            0x72: b"\r",
+                            0x74: b"\t",
+                            0x62: b"\b",
+                            0x66: b"\f",
+                        }.get(escaped, bytes([escaped]))
+                    )
+                continue
+            if char == 0x28:
+                depth += 1
+            elif char == 0x29:
+                depth -= 1
+                if depth == 0:
+                    self.position = position
+                    return bytes(output)
+            output.append(char)
+        raise PdfError("Unterminated literal string")
+
+
+def _unpredict(data: bytes, params: Dict[str, Any]) -> bytes:
+    """Reverse a PNG or TIFF predictor of a FlateDecode stream."""
+    predictor = params.get("Predictor", 1)
+    if predictor == 1:
+        return data
+    columns = int(params.get("Columns", 1))
+    colors = int(params.get("Colors", 1))
+    bits = int(params.get("BitsPerComponent", 8))
+    pixel_size = max(1, colors * bits // 8)
+    row_size = (columns * colors * bits + 7) // 8
+    if predictor == 2:
+        if bits != 8:
+            raise PdfError("Unsupported TIFF predictor")
+        output = bytearray(data)
+        for row in range(0, len(output), row_size):
+            for i in range(row + pixel_size, min(row + row_size, len(output))):
+                output[i] = (output[i] + output[i - pixel_size]) & 0xFF
+        return bytes(output)
+
+    output = bytearray()
+    previous = bytearray(row_size)
+    for row in range(0, len(data), row_size + 1):
+        kind = data[row]
+        current = bytearray(data[row + 1 : row + 1 + row_size])
+        current.extend(bytes(row_size - len(current)))
+        for i in range(row_size):
+            left = current[i - pixel_size] if i >= pixel_size else 0
+            up = previous[i]
+            if kind == 1:
+                current[i] = (current[i] + left) & 0xFF
+            elif kind == 2:
+                current[i] = (current[i] + up) & 0xFF
+            elif kind == 3:
+                current[i] = (current[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                up_left = previous[i - pixel_size] if i >= pixel_size else 0
+                estimate = left + up - up_left
+                distances = (
+                    abs(estimate - left),
+                    abs(estimate - up),
+                    abs(estimate - up_left),
+                )
+                if (
+                    distances[0] <= distances[1]
+                    and distances[0] <= distances[2]
+                ):
+                    nearest = left
+                elif distances[1] <= distances[2]:
+                    nearest = up
+                else:
+                    nearest = up_left
+                current[i] = (current[i] + nearest) & 0xFF
+            elif kind != 0:
+                raise PdfError(f"Invalid PNG predictor type {kind}")
+        output.extend(current)
+        previous = current
+    return bytes(output)
+
+
+def decode_text(value: Any) -> Optional[str]:
+    """Decode a PDF text string (UTF-16BE or UTF-8 with a byte order mark,
+    or PDFDocEncoding).
+    """
+    if not isinstance(value, bytes):
+        return None
+    if value.startswith(b"\xfe\xff"):
+        text = value[2:].decode("utf-16-be", errors="replace")
+    elif value.startswith(b"\xef\xbb\xbf"):
+        text = value[3:].decode("utf-8", errors="replace")
+    else:
+        text = "".join(_PDF_DOC_ENCODING.get(b, chr(b)) for b in value)
+    return text.strip() or None
+
+
+def parse_pdf_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a PDF date string, such as ``D:20210527184225-00'00'``.
+
+    Returns `None` if the string isn't a valid date.
+    """
+    if not value:
+        return None
+    match = _DATE_PATTERN.match(value.strip())
+    if match is None:
+        return None
+    fields = match.groupdict()
+    tzinfo: Optional[datetime.tzinfo] = None
+    if fields["utc"]:
+        tzinfo = datetime.timezone.utc
+    elif fields["sign"]:
+        offset = datetime.timedelta(
+            hours=int(fields["tzhour"]),
+            minutes=int(fields["tzminute"] or 0),
+        )
+        tzinfo = datetime.timezone(
+            -offset if fields["sign"] == "-" else offset
+        )
+    try:
+        return datetime.datetime(
+            int(fields["year"]),
+            int(fields["month"] or 1),
+            int(fields["day"] or 1),
+            int(fields["hour"] or 0),
+            int(fields["minute"] or 0),
+            int(fields["second"] or 0),
+            tzinfo=tzinfo,
+        )
+    except ValueError:
+        return None
+
+
+def inspect_pdf(path: Path) -> PdfInfo:
+    """Inspect a PDF's structure and document information.
+
+    Parameters
+    ----------
+    path
+        Path of the PDF.
+
+    Returns
+    -------
+    PdfInfo
+        The PDF's version, page count, whether it is linearized, and its
+        document information.
+
+    Raises
+    ------
+    PdfError
+        Raised if the file isn't a PDF or its structure can't be read.
+    """
+    from .spherexdata import PdfInfo
+
+    with path.open("rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise PdfError(f"{path} is empty") from None
+    try:
+        reader = PdfReader(data)
+        root = reader.get(reader.trailer, "Root")
+        if not isinstance(root, dict):
+            raise PdfError("The document catalog isn't a dictionary")
+        version = reader.header_version()
+        catalog_version = reader.get(root, "Version")
+        if isinstance(catalog_version, Name) and (
+            version is None
+            or _version_key(catalog_version) > _version_key(version)
+        ):
+            version = str(catalog_version)
+        pages = reader.get(root, "Pages")
+        page_count = None
+        if isinstance(pages, dict):
+            count = reader.get(pages, "Count")
+            if isinstance(count, int) and not isinstance(count, bool):
+                page_count = count
+        linearization = reader.linearization()
+        # Linearization is invalid after an incremental update, which changes
+        # the file's length.
+        linearized = (
+            linearization is not None
+            and reader.resolve(linearization.get("L")) == reader.size
+        )
+
+        info: Dict[str, Any] = {}
+        if not reader.encrypted:
+            info_dict = reader.get(reader.trailer, "Info")
+            if isinstance(info_dict, dict):
+                info = {
+                    key: decode_text(reader.get(info_dict, key))
+                    for key in (
+                        "Title",
+                        "Author",
+                        "Subject",
+                        "Keywords",
+                        "CreationDate",
+                    )
+                }
+        return PdfInfo(
+            pdf_version=version,
+            page_count=page_count,
+            linearized=linearized,
+            encrypted=reader.encrypted,
+            title=info.get("Title"),
+            author=info.get("Author"),
+            subject=info.get("Subject"),
+            keywords=info.get("Keywords"),
+            creation_date=parse_pdf_date(info.get("CreationDate")),
+        )
+    except (IndexError, TypeError, ValueError, RecursionError) as e:
+        if isinstance(e, PdfError):
+            raise
+        raise PdfError(f"Cannot read the structure of {path}: {e}") from e
+    finally:
+        data.close()
+
+
+def cross_check_pdf(
+    info: PdfInfo, *, handle: Optional[str], version: Optional[str]
+) -> List[str]:
+    r"""Compare the document information of a PDF with the document's
+    ``\spherexHandle`` and ``\version``.
+
+    Only handles and versions that the PDF's title, subject, or keywords
+    state are compared, since most PDFs don't state them.
+
+    Returns
+    -------
+    list of str
+        Descriptions of the mismatches.
+    """
+    text = " ".join(
+        value for value in (info.title, info.subject, info.keywords) if value
+    )
+    mismatches = []
+    pdf_handles = sorted(set(_HANDLE_PATTERN.findall(text)))
+    if handle and pdf_handles and handle not in pdf_handles:
+        mismatches.append(
+            f"The PDF's metadata names {', '.join(pdf_handles)}, but the "
+            f"document's handle is {handle}"
+        )
+    pdf_versions = sorted(set(_VERSION_PATTERN.findall(text)))
+    if version and pdf_versions and version.strip() not in pdf_versions:
+        mismatches.append(
+            f"The PDF's metadata has version {', '.join(pdf_versions)}, but "
+            f"the document's version is {version}"
+        )
+    return mismatches
+
+
+def _version_key(version: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in version.split("."))
+    except ValueError:
+        return (0,)
@@ -1,10 +1,25 @@
 """Parser for SPHEREx Module Specification (SSDC-MS) documents."""
 
-from spherexlander.parsers.pipelinemodule.datamodel import (
-    SpherexPipelineModuleMetadata,
-)
-from spherexlander.parsers.pipelinemodule.parser import (
-    SpherexPipelineModuleParser,
-)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spherexlander.parsers.pipelinemodule.datamodel import (
+        SpherexPipelineModuleMetadata,
+    )
+    from spherexlander.parsers.pipelinemodule.parser import (
+        SpherexPipelineModuleParser,
+    )
 
 __all__ = ["SpherexPipelineModuleParser", "SpherexPipelineModuleMetadata"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexPipelineModuleMetadata": "datamodel",
+        "SpherexPipelineModuleParser": "parser",
+    },
+)
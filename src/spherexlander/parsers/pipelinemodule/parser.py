@@ -5,7 +5,7 @@ documents.
 from __future__ import annotations
 
 from logging import getLogger
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from lander.ext.parser.texutils.extract import (
     LaTeXCommand,
@@ -13,7 +13,9 @@ from lander.ext.parser.texutils.extract import (
 )
 
 from ..spherexparser import SpherexParser
-from .datamodel import Difficulty, SpherexPipelineModuleMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import Difficulty, SpherexPipelineModuleMetadata
 
 __all__ = ["SpherexPipelineModuleParser"]
 
@@ -27,6 +29,8 @@ class SpherexPipelineModuleParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexPipelineModuleMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexPipelineModuleMetadata
+
         m = self._collect_common_metadata()
         m["title"] = self._parse_module_name()
         m["pipeline_level"] = self._parse_pipeline_level()
@@ -42,7 +46,7 @@ class SpherexPipelineModuleParser(SpherexParser):
             "modulename",
             LaTeXCommandElement(name="name", required=True, bracket="{"),
         )
-        names = [n for n in command.parse(self.tex_source)]
+        names = self.command_index.parse(command)
         if len(names) == 0:
             raise RuntimeError("Could not parse a modulename command.")
         return names[-1]["name"]
@@ -53,7 +57,7 @@ class SpherexPipelineModuleParser(SpherexParser):
             "pipelevel",
             LaTeXCommandElement(name="level", required=True, bracket="{"),
         )
-        levels = [i for i in command.parse(self.tex_source)]
+        levels = self.command_index.parse(command)
         if len(levels) == 0:
             logger.warning("No pipelevel command detected")
             return None
@@ -61,11 +65,13 @@ class SpherexPipelineModuleParser(SpherexParser):
 
     def _parse_difficulty(self) -> Difficulty:
         """Parse the difficulty command."""
+        from .datamodel import Difficulty
+
         command = LaTeXCommand(
             "difficulty",
             LaTeXCommandElement(name="difficulty", required=True, bracket="{"),
         )
-        difficulties = [d for d in command.parse(self.tex_source)]
+        difficulties = self.command_index.parse(command)
         if len(difficulties) == 0:
             logger.warning("No difficulty command detected")
             return Difficulty.Unassigned
@@ -87,7 +93,7 @@ class SpherexPipelineModuleParser(SpherexParser):
             "diagramindex",
             LaTeXCommandElement(name="di", required=True, bracket="{"),
         )
-        diagramindices = [di for di in command.parse(self.tex_source)]
+        diagramindices = self.command_index.parse(command)
         if len(diagramindices) == 0:
             logger.warning("No diagramindex command detected")
             return None
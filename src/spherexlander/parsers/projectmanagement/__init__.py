@@ -1,13 +1,28 @@
 """Parser for SPHEREx Project Management (SSDC-PM) documents."""
 
-from spherexlander.parsers.projectmanagement.datamodel import (
-    SpherexProjectManagementMetadata,
-)
-from spherexlander.parsers.projectmanagement.parser import (
-    SpherexProjectManagementParser,
-)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spherexlander.parsers.projectmanagement.datamodel import (
+        SpherexProjectManagementMetadata,
+    )
+    from spherexlander.parsers.projectmanagement.parser import (
+        SpherexProjectManagementParser,
+    )
 
 __all__ = [
     "SpherexProjectManagementParser",
     "SpherexProjectManagementMetadata",
 ]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexProjectManagementMetadata": "datamodel",
+        "SpherexProjectManagementParser": "parser",
+    },
+)
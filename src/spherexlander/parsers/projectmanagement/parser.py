@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 from ..spherexparser import SpherexParser
-from .datamodel import SpherexProjectManagementMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexProjectManagementMetadata
 
 __all__ = ["SpherexProjectManagementParser"]
 
@@ -17,6 +20,8 @@ class SpherexProjectManagementParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexProjectManagementMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexProjectManagementMetadata
+
         m = self._collect_common_metadata()
         m["approval"] = self._parse_approved()
         metadata = SpherexProjectManagementMetadata(**m)
@@ -2,13 +2,54 @@
 
 from __future__ import annotations
 
+import datetime
 import urllib.parse
-from typing import Optional
+from typing import Any, Optional
 
 from lander.ext.parser import Contributor, DocumentMetadata
 from pydantic import BaseModel, Field, HttpUrl
 
-__all__ = ["SpherexMetadata", "ApprovalInfo"]
+from ..tracing import span
+
+__all__ = ["SpherexMetadata", "ApprovalInfo", "PdfInfo"]
+
+
+class PdfInfo(BaseModel):
+    """Information about a document's PDF, from its structure and its
+    document information dictionary (see
+    `spherexlander.parsers.pdfinspect.inspect_pdf`).
+    """
+
+    pdf_version: Optional[str] = None
+    """Version of the PDF format, such as ``1.5``."""
+
+    page_count: Optional[int] = None
+    """Number of pages."""
+
+    linearized: bool = False
+    """Whether the PDF is linearized for fast web view, so that browsers
+    can show its first page before the whole file is downloaded.
+    """
+
+    encrypted: bool = False
+    """Whether the PDF is encrypted, in which case its document information
+    isn't read.
+    """
+
+    title: Optional[str] = None
+    """The PDF's Title entry."""
+
+    author: Optional[str] = None
+    """The PDF's Author entry."""
+
+    subject: Optional[str] = None
+    """The PDF's Subject entry."""
+
+    keywords: Optional[str] = None
+    """The PDF's Keywords entry."""
+
+    creation_date: Optional[datetime.datetime] = None
+    """The PDF's CreationDate entry."""
 
 
 class SpherexMetadata(DocumentMetadata):
@@ -35,6 +76,15 @@ class SpherexMetadata(DocumentMetadata):
     github_slug: Optional[str]
     """The slug (``org/name``) of the repository on GitHub."""
 
+    pdf_info: Optional[PdfInfo] = None
+    """Information about the document's PDF, or `None` if the PDF couldn't
+    be inspected.
+    """
+
+    def __init__(self, **data: Any) -> None:
+        with span(f"validate {type(self).__name__}", "validate"):
+            super().__init__(**data)
+
     @property
     def github_ref_url(self) -> Optional[str]:
         """The GitHub web URL corresponding to the branch or tag."""
@@ -4,31 +4,270 @@ from __future__ import annotations
 
 import datetime
 from collections import UserDict
+from functools import cached_property
 from logging import getLogger
-from typing import Any, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import dateutil.parser
 from lander.ext.parser import CiPlatform, Contributor, Parser
-from lander.ext.parser.pandoc import convert_text
 from lander.ext.parser.texutils.extract import (
     LaTeXCommand,
     LaTeXCommandElement,
+    ParsedCommand,
 )
 
-from .spherexdata import ApprovalInfo
+if TYPE_CHECKING:
+    from lander.ext.parser import DocumentMetadata
+    from lander.ext.parser._gitdata import GitRepository
+    from lander.settings import BuildSettings
+
+    from .spherexdata import ApprovalInfo, PdfInfo
+    from .texindex import TexCommandIndex
 
 __all__ = ["SpherexParser", "KVOptionMap"]
 
 logger = getLogger(__name__)
 
 
+def __getattr__(name: str) -> Any:
+    # convert_tex_span was imported here before the TeX conversion moved to
+    # the texconvert module, which is imported when it's first used.
+    if name == "convert_tex_span":
+        from .texconvert import convert_tex_span
+
+        return convert_tex_span
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class SpherexParser(Parser):
     """A base parser for documents that use the ``spherex`` tex class.
 
     Parsers for specific document types can inherit from this base class
     to implement their specific data models.
+
+    Lander imports every parser plugin when it starts, so modules that are
+    only needed to extract metadata (such as the data models and the TeX
+    conversion machinery) are imported by the methods that use them.
+
+    If tracing is enabled (see `spherexlander.tracing`), the parser starts a
+    trace of the document's build and records reading and normalizing the
+    TeX source, `extract_metadata`, and each ``_parse_*`` method. The
+    duration of parsing is also recorded in the process's metrics (see
+    `spherexlander.metrics`).
     """
 
+    def __init__(self, *, settings: BuildSettings) -> None:
+        from ..config import load_config
+        from ..metrics import PHASE_SECONDS
+        from ..tracing import start_trace
+
+        config = load_config()
+        self._preamble_only = config.parse_preamble_only
+        self._config = config
+        tracer = start_trace(str(settings.source_path), config=config)
+        if tracer is None:
+            with PHASE_SECONDS.time(phase="parse"):
+                self._init_parser(settings)
+            return
+
+        # Instance attributes shadow the methods, so the class's methods are
+        # unchanged when tracing is disabled.
+        for name in dir(self):
+            if name.startswith("_parse_") or name == "extract_metadata":
+                method = getattr(self, name)
+                if callable(method):
+                    setattr(self, name, tracer.wrap(method, name, "parse"))
+        self._trace_read_start: Optional[float] = tracer.now()
+        with PHASE_SECONDS.time(phase="parse"), tracer.span(
+            "parser", "parse", parser=type(self).__name__
+        ):
+            self._init_parser(settings)
+
+    def _init_parser(self, settings: BuildSettings) -> None:
+        """Read the TeX source and extract the metadata.
+
+        This mirrors `lander.ext.parser.Parser.__init__`, except that the
+        source is read through the process's include cache (see
+        `spherexlander.parsers.texinclude`), and, in the preamble-only mode
+        (see `spherexlander.config.PluginConfig.parse_preamble_only`), only
+        the preamble is read. The Git repository's metadata is only read if
+        it is used (see `git_repository`).
+        """
+        from lander.ext.parser import CiMetadata
+        from lander.ext.parser.texutils.extract import get_macros
+
+        self._settings = settings
+        tex_source = self._read_source(preamble_only=self._preamble_only)
+        self._tex_macros = get_macros(tex_source)
+        self._tex_source = self.normalize_source(tex_source)
+        self._ci_metadata = CiMetadata.create()
+        self._metadata = self.extract_metadata()
+
+    def _read_source(self, *, preamble_only: bool) -> str:
+        """Read the TeX source, or only its preamble, with the content of
+        input files inserted.
+        """
+        from .texinclude import get_include_cache, read_tex_source
+        from .texstream import read_tex_preamble
+
+        cache = get_include_cache(self._config)
+        if preamble_only:
+            return read_tex_preamble(self.tex_path, cache=cache)
+        return read_tex_source(self.tex_path, cache=cache)
+
+    def update_pdf(self, settings: BuildSettings) -> DocumentMetadata:
+        """Inspect the document's PDF again after it changed, without parsing
+        the TeX source again.
+
+        Only `_parse_pdf_info` is run again, so this is how watch mode (see
+        `spherexlander.watch`) updates the metadata when only the PDF
+        changes.
+
+        Parameters
+        ----------
+        settings
+            The build settings, with the PDF's new size.
+
+        Returns
+        -------
+        lander.ext.parser.DocumentMetadata
+            The metadata with the new ``pdf_info``, which is also the
+            parser's `metadata`.
+        """
+        from ..metrics import PHASE_SECONDS
+
+        self._settings = settings
+        metadata = self._metadata
+        with PHASE_SECONDS.time(phase="parse"):
+            pdf_info = self._parse_pdf_info(
+                handle=metadata.identifier, version=metadata.version
+            )
+        self._metadata = metadata.copy(update={"pdf_info": pdf_info})
+        return self._metadata
+
+    @cached_property
+    def git_repository(self) -> Optional[GitRepository]:
+        """Metadata from the local Git repository, or `None` if the document
+        isn't in a Git repository.
+
+        Unlike in `lander.ext.parser.Parser`, the repository is only read
+        the first time this is used, since reading it runs many ``git``
+        subprocesses and the SPHEREx parsers don't use it.
+        """
+        from lander.ext.parser._gitdata import GitRepository
+
+        try:
+            return GitRepository.create(self.tex_path.parent)
+        except Exception:
+            return None
+
+    @property
+    def preamble_only(self) -> bool:
+        """Whether `tex_source` is only the preamble of the document, up to
+        ``\\begin{document}``.
+        """
+        return self._preamble_only
+
+    @cached_property
+    def document_body(self) -> str:
+        """The normalized TeX source of the document's body, from
+        ``\\begin{document}``, or an empty string if the document has no
+        body.
+
+        If the parser only read the preamble, the whole source is read again
+        the first time the body is used.
+        """
+        from .texstream import extract_body
+
+        if self._preamble_only:
+            tex_source = self.normalize_source(
+                self._read_source(preamble_only=False)
+            )
+        else:
+            tex_source = self.tex_source
+        return extract_body(tex_source)
+
+    def normalize_source(self, tex_source: str) -> str:
+        """Process the TeX source after it is read, but before metadata is
+        extracted.
+        """
+        from ..tracing import active_tracer
+
+        tracer = active_tracer()
+        if tracer is None:
+            return super().normalize_source(tex_source)
+
+        # The source is read just before it is normalized.
+        read_start = getattr(self, "_trace_read_start", None)
+        if read_start is not None:
+            tracer.add_event(
+                "read_tex",
+                "parse",
+                read_start,
+                tracer.now(),
+                {
+                    "characters": len(tex_source),
+                    "preamble_only": self._preamble_only,
+                },
+            )
+            self._trace_read_start = None
+        with tracer.span("normalize_source", "parse"):
+            return super().normalize_source(tex_source)
+
+    @cached_property
+    def command_index(self) -> TexCommandIndex:
+        """An index of the commands in the TeX source.
+
+        The index is built with a single scan of `tex_source` the first time
+        it is used. The ``_parse_*`` methods query this index rather than
+        rescanning the source for each command.
+        """
+        from ..tracing import span
+        from .texindex import TexCommandIndex
+
+        with span("command_index", "parse"):
+            return TexCommandIndex(self.tex_source)
+
+    @cached_property
+    def _tex_span_conversions(self) -> Dict[str, str]:
+        """Plain text conversions of the spans from `_collect_tex_spans`.
+
+        All spans are converted together, with a single pandoc invocation,
+        the first time a span is converted with `_convert_tex_span`.
+        """
+        from ..tracing import span
+        from .texconvert import convert_tex_spans
+
+        spans = self._collect_tex_spans()
+        with span("convert_tex_spans", "convert", spans=len(spans)):
+            return dict(zip(spans, convert_tex_spans(spans)))
+
+    def _collect_tex_spans(self) -> List[str]:
+        """Collect the TeX spans that the parser converts to plain text.
+
+        Parsers that convert additional spans with `_convert_tex_span` should
+        extend this list so that those spans are included in the batched
+        conversion.
+        """
+        spans: List[str] = []
+        for kind in ("spherex", "ipac"):
+            lead_instance = self._find_lead(kind=kind)
+            if lead_instance is not None:
+                spans.append(lead_instance["name"])
+        for person_instance in self._find_people():
+            spans.append(person_instance["name"])
+        return spans
+
+    def _convert_tex_span(self, content: str) -> str:
+        """Convert a span of TeX source into plain text, using the batched
+        conversions if the span was collected by `_collect_tex_spans`.
+        """
+        try:
+            return self._tex_span_conversions[content]
+        except KeyError:
+            from .texconvert import convert_tex_span
+
+            return convert_tex_span(content)
+
     def _collect_common_metadata(self) -> dict[str, Any]:
         """Collect metadata common to most SPHEREx documents.
 
@@ -48,6 +287,10 @@ class SpherexParser(Parser):
         except Exception:
             pass
 
+        m["pdf_info"] = self._parse_pdf_info(
+            handle=m["identifier"], version=m["version"]
+        )
+
         # Incorporate metadata from the CI environment
         if self.ci_metadata.platform is not CiPlatform.null:
             m["git_commit_sha"] = self.ci_metadata.git_sha
@@ -77,7 +320,7 @@ class SpherexParser(Parser):
             ),
             LaTeXCommandElement(name="long_title", required=True, bracket="{"),
         )
-        titles = [t for t in command.parse(self.tex_source)]
+        titles = self.command_index.parse(command)
         if len(titles) == 0:
             raise RuntimeError("Could not parse a title command.")
         return titles[-1]["long_title"]
@@ -88,7 +331,7 @@ class SpherexParser(Parser):
             "version",
             LaTeXCommandElement(name="version", required=True, bracket="{"),
         )
-        versions = [v for v in command.parse(self.tex_source)]
+        versions = self.command_index.parse(command)
         if len(versions) == 0:
             logger.warning("No version command detected")
             return None
@@ -106,6 +349,22 @@ class SpherexParser(Parser):
         if ipac_lead:
             authors.append(ipac_lead)
 
+        for person_instance in self._find_people():
+            name = self._convert_tex_span(person_instance["name"])
+            if "options" in person_instance:
+                option_map = KVOptionMap.parse(person_instance["options"])
+            else:
+                option_map = KVOptionMap()
+            if "email" in option_map:
+                email = option_map["email"]
+            else:
+                email = None
+            authors.append(Contributor(name=name, email=email))
+
+        return authors
+
+    def _find_people(self) -> List[ParsedCommand]:
+        """Find the person commands inside author commands."""
         author_command = LaTeXCommand(
             "author",
             LaTeXCommandElement(name="body", required=True, bracket="{"),
@@ -115,38 +374,22 @@ class SpherexParser(Parser):
             LaTeXCommandElement(name="options", required=False, bracket="["),
             LaTeXCommandElement(name="name", required=True, bracket="{"),
         )
-
-        for author_instance in author_command.parse(self.tex_source):
-            for person_instance in person_command.parse(
-                author_instance["body"]
-            ):
-                name = convert_tex_span(person_instance["name"])
-                if "options" in person_instance:
-                    option_map = KVOptionMap.parse(person_instance["options"])
-                else:
-                    option_map = KVOptionMap()
-                if "email" in option_map:
-                    email = option_map["email"]
-                else:
-                    email = None
-                authors.append(Contributor(name=name, email=email))
-
-        return authors
+        people: List[ParsedCommand] = []
+        for author_instance in self.command_index.parse(author_command):
+            people.extend(
+                self.command_index.parse(
+                    person_command, within=author_instance
+                )
+            )
+        return people
 
     def _parse_lead(self, *, kind: str, role: str) -> Optional[Contributor]:
-        command_name = f"{kind}lead"
-        command = LaTeXCommand(
-            command_name,
-            LaTeXCommandElement(name="options", required=False, bracket="["),
-            LaTeXCommandElement(name="name", required=True, bracket="{"),
-        )
-        instances = [i for i in command.parse(self.tex_source)]
-        if len(instances) == 0:
-            logger.warning("No %s command detected", command_name)
+        instance = self._find_lead(kind=kind)
+        if instance is None:
+            logger.warning("No %slead command detected", kind)
             return None
 
-        instance = instances[-1]
-        name = convert_tex_span(instance["name"])
+        name = self._convert_tex_span(instance["name"])
         if "options" in instance:
             option_map = KVOptionMap.parse(instance["options"])
         else:
@@ -157,6 +400,18 @@ class SpherexParser(Parser):
             email = None
         return Contributor(name=name, email=email, role=role)
 
+    def _find_lead(self, *, kind: str) -> Optional[ParsedCommand]:
+        """Find the last lead command of a kind (``spherex`` or ``ipac``)."""
+        command = LaTeXCommand(
+            f"{kind}lead",
+            LaTeXCommandElement(name="options", required=False, bracket="["),
+            LaTeXCommandElement(name="name", required=True, bracket="{"),
+        )
+        instances = self.command_index.parse(command)
+        if len(instances) == 0:
+            return None
+        return instances[-1]
+
     def _parse_date(self) -> Optional[datetime.date]:
         """Parse the date from either the docDate or vcsDate commands."""
         # Try docDate first
@@ -167,6 +422,8 @@ class SpherexParser(Parser):
             value = self.tex_macros[r"\vcsDate"]
 
         if value:
+            import dateutil.parser
+
             return dateutil.parser.isoparse(value).date()
         else:
             return None
@@ -177,21 +434,42 @@ class SpherexParser(Parser):
             "spherexHandle",
             LaTeXCommandElement(name="value", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
             logger.warning("No spherexHandle command detected")
             return None
 
         return instances[-1]["value"]
 
+    def _parse_pdf_info(
+        self, *, handle: Optional[str], version: Optional[str]
+    ) -> Optional[PdfInfo]:
+        """Inspect the document's PDF, and warn if its metadata names a
+        different handle or version than the TeX source.
+        """
+        from .pdfinspect import PdfError, cross_check_pdf, inspect_pdf
+
+        try:
+            pdf_info = inspect_pdf(self.settings.pdf.file_path)
+        except (OSError, PdfError) as e:
+            logger.warning("Cannot inspect the PDF: %s", e)
+            return None
+        for mismatch in cross_check_pdf(
+            pdf_info, handle=handle, version=version
+        ):
+            logger.warning("%s", mismatch)
+        return pdf_info
+
     def _parse_approved(self) -> Optional[ApprovalInfo]:
         """Parse the approved command."""
+        from .spherexdata import ApprovalInfo
+
         command = LaTeXCommand(
             "approved",
             LaTeXCommandElement(name="date", required=True, bracket="{"),
             LaTeXCommandElement(name="name", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
             logger.warning("No approved command detected")
             return None
@@ -214,12 +492,3 @@ class KVOptionMap(UserDict):
         split_keyvalues = [tuple(kv.split("=")[:2]) for kv in keyvalues]
         # A work-around for type checking; could be improved
         return KVOptionMap({k: v for k, v in split_keyvalues})
-
-
-def convert_tex_span(content: str) -> str:
-    return convert_text(
-        content=content,
-        source_fmt="latex",
-        output_fmt="plain",
-        deparagraph=True,
-    )
@@ -1,6 +1,21 @@
 """Parser for SPHEREx SSDC-DP documents."""
 
-from spherexlander.parsers.ssdcdp.datamodel import SpherexSsdcDpMetadata
-from spherexlander.parsers.ssdcdp.parser import SpherexSsdcDpParser
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spherexlander.parsers.ssdcdp.datamodel import SpherexSsdcDpMetadata
+    from spherexlander.parsers.ssdcdp.parser import SpherexSsdcDpParser
 
 __all__ = ["SpherexSsdcDpMetadata", "SpherexSsdcDpParser"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexSsdcDpMetadata": "datamodel",
+        "SpherexSsdcDpParser": "parser",
+    },
+)
@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 from ..spherexparser import SpherexParser
-from .datamodel import SpherexSsdcDpMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcDpMetadata
 
 __all__ = ["SpherexSsdcDpParser"]
 
@@ -17,6 +20,8 @@ class SpherexSsdcDpParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexSsdcDpMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexSsdcDpMetadata
+
         m = self._collect_common_metadata()
         m["approval"] = self._parse_approved()
         metadata = SpherexSsdcDpMetadata(**m)
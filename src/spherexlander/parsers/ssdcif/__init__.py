@@ -1,6 +1,21 @@
 """Parser for SPHEREx SSDC-IF documents."""
 
-from spherexlander.parsers.ssdcif.datamodel import SpherexSsdcIfMetadata
-from spherexlander.parsers.ssdcif.parser import SpherexSsdcIfParser
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spherexlander.parsers.ssdcif.datamodel import SpherexSsdcIfMetadata
+    from spherexlander.parsers.ssdcif.parser import SpherexSsdcIfParser
 
 __all__ = ["SpherexSsdcIfMetadata", "SpherexSsdcIfParser"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexSsdcIfMetadata": "datamodel",
+        "SpherexSsdcIfParser": "parser",
+    },
+)
@@ -3,15 +3,18 @@
 from __future__ import annotations
 
 from logging import getLogger
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional
 
 from lander.ext.parser.texutils.extract import (
     LaTeXCommand,
     LaTeXCommandElement,
+    ParsedCommand,
 )
 
-from ..spherexparser import SpherexParser, convert_tex_span
-from .datamodel import SpherexSsdcIfMetadata
+from ..spherexparser import SpherexParser
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcIfMetadata
 
 __all__ = ["SpherexSsdcIfParser"]
 
@@ -23,23 +26,38 @@ class SpherexSsdcIfParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexSsdcIfMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexSsdcIfMetadata
+
         m = self._collect_common_metadata()
         m["interface_partner"] = self._parse_interface_partner()
         m["approval"] = self._parse_approved()
         metadata = SpherexSsdcIfMetadata(**m)
         return metadata
 
+    def _collect_tex_spans(self) -> List[str]:
+        """Collect TeX spans, including the interface partner's name."""
+        spans = super()._collect_tex_spans()
+        instance = self._find_interface_partner()
+        if instance is not None:
+            spans.append(instance["name"])
+        return spans
+
     def _parse_interface_partner(self) -> Optional[str]:
-        command_name = "interfacepartner"
+        """Parse the interfacepartner command."""
+        instance = self._find_interface_partner()
+        if instance is None:
+            logger.warning("No interfacepartner command detected")
+            return None
+
+        return self._convert_tex_span(instance["name"])
+
+    def _find_interface_partner(self) -> Optional[ParsedCommand]:
+        """Find the last interfacepartner command."""
         command = LaTeXCommand(
-            command_name,
+            "interfacepartner",
             LaTeXCommandElement(name="name", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
-            logger.warning("No %s command detected", command_name)
             return None
-
-        instance = instances[-1]
-        name = convert_tex_span(instance["name"])
-        return name
+        return instances[-1]
@@ -1,6 +1,21 @@
 """Parser for SPHEREx SSDC-OP documents."""
 
-from .datamodel import SpherexSsdcOpMetadata
-from .parser import SpherexSsdcOpParser
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcOpMetadata
+    from .parser import SpherexSsdcOpParser
 
 __all__ = ["SpherexSsdcOpMetadata", "SpherexSsdcOpParser"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexSsdcOpMetadata": "datamodel",
+        "SpherexSsdcOpParser": "parser",
+    },
+)
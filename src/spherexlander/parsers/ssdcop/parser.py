@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 from ..spherexparser import SpherexParser
-from .datamodel import SpherexSsdcOpMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcOpMetadata
 
 __all__ = ["SpherexSsdcOpParser"]
 
@@ -17,6 +20,8 @@ class SpherexSsdcOpParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexSsdcOpMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexSsdcOpMetadata
+
         m = self._collect_common_metadata()
         m["approval"] = self._parse_approved()
         metadata = SpherexSsdcOpMetadata(**m)
@@ -1,6 +1,21 @@
 """Parser for SPHEREx SSDC-OP documents."""
 
-from .datamodel import SpherexSsdcTnMetadata
-from .parser import SpherexSsdcTnParser
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcTnMetadata
+    from .parser import SpherexSsdcTnParser
 
 __all__ = ["SpherexSsdcTnMetadata", "SpherexSsdcTnParser"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "SpherexSsdcTnMetadata": "datamodel",
+        "SpherexSsdcTnParser": "parser",
+    },
+)
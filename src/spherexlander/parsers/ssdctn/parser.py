@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 from logging import getLogger
+from typing import TYPE_CHECKING
 
 from ..spherexparser import SpherexParser
-from .datamodel import SpherexSsdcTnMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import SpherexSsdcTnMetadata
 
 __all__ = ["SpherexSsdcTnParser"]
 
@@ -17,6 +20,8 @@ class SpherexSsdcTnParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexSsdcTnMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexSsdcTnMetadata
+
         m = self._collect_common_metadata()
         metadata = SpherexSsdcTnMetadata(**m)
         return metadata
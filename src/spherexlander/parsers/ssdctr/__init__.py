@@ -1,9 +1,25 @@
 """Parser for SPHEREx SSDC-TR documents."""
 
-from spherexlander.parsers.ssdctr.datamodel import (
-    DoorsID,
-    SpherexSsdcTrMetadata,
-)
-from spherexlander.parsers.ssdctr.parser import SpherexSsdcTrParser
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_getattr
+
+if TYPE_CHECKING:
+    from spherexlander.parsers.ssdctr.datamodel import (
+        DoorsID,
+        SpherexSsdcTrMetadata,
+    )
+    from spherexlander.parsers.ssdctr.parser import SpherexSsdcTrParser
 
 __all__ = ["SpherexSsdcTrMetadata", "DoorsID", "SpherexSsdcTrParser"]
+
+__getattr__ = lazy_getattr(
+    __name__,
+    {
+        "DoorsID": "datamodel",
+        "SpherexSsdcTrMetadata": "datamodel",
+        "SpherexSsdcTrParser": "parser",
+    },
+)
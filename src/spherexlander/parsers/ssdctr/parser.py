@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from logging import getLogger
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from lander.ext.parser.texutils.extract import (
     LaTeXCommand,
@@ -11,7 +11,9 @@ from lander.ext.parser.texutils.extract import (
 )
 
 from ..spherexparser import SpherexParser
-from .datamodel import DoorsID, SpherexSsdcTrMetadata
+
+if TYPE_CHECKING:
+    from .datamodel import DoorsID, SpherexSsdcTrMetadata
 
 __all__ = ["SpherexSsdcTrParser"]
 
@@ -23,6 +25,8 @@ class SpherexSsdcTrParser(SpherexParser):
 
     def extract_metadata(self) -> SpherexSsdcTrMetadata:
         """Plugin entrypoint for metadata extraction."""
+        from .datamodel import SpherexSsdcTrMetadata
+
         m = self._collect_common_metadata()
         m["approval"] = self._parse_approved()
         m["ipac_jira_id"] = self._parse_ipac_jira_id()
@@ -37,7 +41,7 @@ class SpherexSsdcTrParser(SpherexParser):
             "IPACJiraID",
             LaTeXCommandElement(name="id", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
             logger.warning("No IPACJiraID command detected")
             return None
@@ -46,12 +50,14 @@ class SpherexSsdcTrParser(SpherexParser):
 
     def _parse_req_doors_id(self) -> Optional[DoorsID]:
         """Parse the ReqDoorsID command."""
+        from .datamodel import DoorsID
+
         command = LaTeXCommand(
             "ReqDoorsID",
             LaTeXCommandElement(name="url", required=False, bracket="["),
             LaTeXCommandElement(name="id", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
             logger.warning("No ReqDoorsID command detected")
             return None
@@ -60,12 +66,14 @@ class SpherexSsdcTrParser(SpherexParser):
 
     def _parse_va_doors_id(self) -> Optional[DoorsID]:
         """Parse the ReqDoorsID command."""
+        from .datamodel import DoorsID
+
         command = LaTeXCommand(
             "VADoorsID",
             LaTeXCommandElement(name="url", required=False, bracket="["),
             LaTeXCommandElement(name="id", required=True, bracket="{"),
         )
-        instances = [i for i in command.parse(self.tex_source)]
+        instances = self.command_index.parse(command)
         if len(instances) == 0:
             logger.warning("No VADoorsID command detected")
             return None
@@ -0,0 +1,417 @@
+"""Conversion of TeX spans (such as author names) into plain text."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from logging import getLogger
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pypandoc
+from lander.ext.parser.pandoc import convert_text
+
+from ..cache import ContentCache, open_cache
+from ..metrics import PANDOC_INVOCATIONS, PHASE_SECONDS
+from ..tracing import span
+
+__all__ = ["convert_tex_span", "convert_tex_spans", "convert_simple_tex_span"]
+
+logger = getLogger(__name__)
+
+OUTPUT_FORMAT = "plain+deparagraph"
+"""Identifier of the pandoc output format and options, for cache keys."""
+
+SPAN_SEPARATOR = "SPHEREXLANDERSPANSEPARATOR"
+"""A paragraph that separates spans in a batched pandoc conversion.
+
+The separator consists only of letters so that pandoc passes it through
+unchanged.
+"""
+
+UNBATCHABLE_PATTERN = re.compile(
+    r"\\(?:[egx]?def|let|(?:re)?newcommand|providecommand|if[a-zA-Z]*"
+    r"|begingroup|makeatletter)(?![a-zA-Z])"
+)
+"""Regular expression for commands whose effects could leak into other spans
+in a batched conversion (definitions and conditionals).
+"""
+
+SYMBOL_ACCENTS = {
+    "'": "\u0301",
+    "`": "\u0300",
+    "^": "\u0302",
+    '"': "\u0308",
+    "~": "\u0303",
+    "=": "\u0304",
+    ".": "\u0307",
+}
+"""Combining characters for accent commands with a symbol name, such as
+``\\'e``.
+"""
+
+LETTER_ACCENTS = {
+    "u": "\u0306",
+    "v": "\u030c",
+    "H": "\u030b",
+    "c": "\u0327",
+    "k": "\u0328",
+    "r": "\u030a",
+}
+"""Combining characters for accent commands with a letter name, such as
+``\\v{s}``.
+"""
+
+SPECIAL_LETTERS = {
+    "ss": "\u00df",
+    "o": "\u00f8",
+    "O": "\u00d8",
+    "ae": "\u00e6",
+    "AE": "\u00c6",
+    "oe": "\u0153",
+    "OE": "\u0152",
+    "aa": "\u00e5",
+    "AA": "\u00c5",
+    "l": "\u0142",
+    "L": "\u0141",
+    "i": "\u0131",
+}
+"""Characters produced by special letter commands, such as ``\\ss``."""
+
+ESCAPED_CHARACTERS = set("&%$#_{}")
+"""Characters that are escaped with a backslash, such as ``\\&``."""
+
+TEXT_STYLE_COMMANDS = {"textit", "textbf"}
+"""Commands whose argument is rendered as unstyled plain text."""
+
+PUNCTUATION = set(",;:!?()/@+=*")
+"""Punctuation that pandoc passes through unchanged."""
+
+CONTROL_WORD_PATTERN = re.compile(r"[a-zA-Z]+")
+
+WHITESPACE_PATTERN = re.compile(r"[ \t\n]+")
+
+
+def convert_tex_span(content: str) -> str:
+    """Convert a span of TeX source into plain text.
+
+    This is a thin wrapper around `convert_tex_spans` for a single span.
+
+    Parameters
+    ----------
+    content
+        TeX source, such as an author's name.
+
+    Returns
+    -------
+    str
+        The plain text content.
+    """
+    return convert_tex_spans([content])[0]
+
+
+def convert_tex_spans(contents: Sequence[str]) -> List[str]:
+    """Convert several spans of TeX source into plain text with a single
+    pandoc invocation.
+
+    Parameters
+    ----------
+    contents
+        TeX source spans, such as author names.
+
+    Returns
+    -------
+    list of str
+        The plain text content of each span, in the same order as
+        ``contents``.
+
+    Notes
+    -----
+    Spans that `convert_simple_tex_span` can convert do not use pandoc.
+    Pandoc conversions are stored in the ``texconvert`` on-disk cache (see
+    `spherexlander.cache.open_cache`), keyed by the span, the output format,
+    and the pandoc version, so that later builds reuse them. The remaining
+    unique spans are joined into a single document, with each span
+    separated by a paragraph that contains only `SPAN_SEPARATOR`. After
+    conversion, the output is split on those paragraphs. If pandoc fails, or
+    the output does not split into the expected number of spans, each span is
+    converted with its own pandoc invocation instead. Spans with macro
+    definitions or conditionals (`UNBATCHABLE_PATTERN`) are always converted
+    individually so that they cannot affect other spans.
+    """
+    conversions: Dict[str, str] = {}
+    pending: List[str] = []
+    for content in dict.fromkeys(contents):
+        simple_conversion = convert_simple_tex_span(content)
+        if simple_conversion is not None:
+            conversions[content] = simple_conversion
+        else:
+            pending.append(content)
+
+    if pending:
+        cache = _open_conversion_cache()
+        if cache is None:
+            conversions.update(_convert_with_pandoc(pending))
+        else:
+            conversions.update(_convert_with_cache(pending, *cache))
+    return [conversions[content] for content in contents]
+
+
+def _convert_with_cache(
+    contents: List[str], cache: ContentCache, pandoc_version: str
+) -> Dict[str, str]:
+    """Convert unique spans, using and updating the conversion cache."""
+    conversions: Dict[str, str] = {}
+    keys = {
+        content: cache.make_key(content, OUTPUT_FORMAT, pandoc_version)
+        for content in contents
+    }
+    misses: List[str] = []
+    for content in contents:
+        data = cache.get(keys[content])
+        if data is None:
+            misses.append(content)
+        else:
+            conversions[content] = data.decode("utf-8")
+    logger.debug(
+        "Conversion cache: %d hits, %d misses",
+        len(contents) - len(misses),
+        len(misses),
+    )
+
+    if misses:
+        converted = _convert_with_pandoc(misses)
+        for content, output in converted.items():
+            cache.set(keys[content], output.encode("utf-8"))
+        conversions.update(converted)
+    return conversions
+
+
+def _open_conversion_cache() -> Optional[Tuple[ContentCache, str]]:
+    """Open the conversion cache, along with the pandoc version that is part
+    of its keys, or return `None` if caching is disabled or pandoc is not
+    installed.
+    """
+    cache = open_cache("texconvert")
+    if cache is None:
+        return None
+    try:
+        pandoc_version = pypandoc.get_pandoc_version()
+    except OSError:
+        return None
+    return cache, pandoc_version
+
+
+def _convert_with_pandoc(contents: List[str]) -> Dict[str, str]:
+    """Convert unique spans with pandoc, batching them where possible."""
+    conversions: Dict[str, str] = {}
+    batch: List[str] = []
+    for content in contents:
+        if UNBATCHABLE_PATTERN.search(content) or SPAN_SEPARATOR in content:
+            conversions[content] = _run_pandoc(content)
+        else:
+            batch.append(content)
+
+    if len(batch) == 1:
+        conversions[batch[0]] = _run_pandoc(batch[0])
+    elif len(batch) > 1:
+        conversions.update(_convert_batch(batch))
+    return conversions
+
+
+def _convert_batch(contents: List[str]) -> Dict[str, str]:
+    """Convert unique spans with a single pandoc invocation, if possible."""
+    delimiter = f"\n\n{SPAN_SEPARATOR}\n\n"
+    try:
+        output = _run_pandoc(delimiter.join(contents))
+    except RuntimeError:
+        logger.debug("Batched pandoc conversion failed")
+        return {content: _run_pandoc(content) for content in contents}
+
+    converted = output.split(delimiter)
+    if len(converted) != len(contents):
+        logger.debug(
+            "Batched pandoc conversion produced %d spans, expected %d; "
+            "converting spans individually",
+            len(converted),
+            len(contents),
+        )
+        return {content: _run_pandoc(content) for content in contents}
+
+    # Pandoc terminates its output with a newline, which the split removes
+    # from all but the last span.
+    converted = [f"{c}\n" for c in converted[:-1]] + converted[-1:]
+    return dict(zip(contents, converted))
+
+
+def _run_pandoc(content: str) -> str:
+    """Convert TeX source to plain text with pandoc."""
+    PANDOC_INVOCATIONS.inc()
+    with PHASE_SECONDS.time(phase="pandoc"), span(
+        "pandoc", "convert", characters=len(content)
+    ):
+        return convert_text(
+            content=content,
+            source_fmt="latex",
+            output_fmt="plain",
+            deparagraph=True,
+        )
+
+
+def convert_simple_tex_span(content: str) -> Optional[str]:
+    """Convert a simple span of TeX source into plain text, without pandoc.
+
+    The output is identical to `convert_tex_span`, but only a subset of TeX
+    is supported:
+
+    - letters, digits, spaces, and common punctuation,
+    - apostrophes between letters (converted to a right single quotation
+      mark, as pandoc does),
+    - accents, such as ``\\'e``, ``{\\"o}``, and ``\\v{s}``,
+    - special letters, such as ``\\ss`` and ``\\o``,
+    - escaped special characters, such as ``\\&``,
+    - ``~`` (a non-breaking space),
+    - braces for grouping, and
+    - the ``\\textit`` and ``\\textbf`` commands.
+
+    Parameters
+    ----------
+    content
+        TeX source, such as an author's name.
+
+    Returns
+    -------
+    str or None
+        The plain text content, or `None` if the span is not in the supported
+        subset of TeX and must be converted with pandoc.
+    """
+    try:
+        text = _SimpleSpanReader(content).read()
+    except _UnsupportedSpan:
+        return None
+    text = WHITESPACE_PATTERN.sub(" ", text).strip(" ")
+    if not text:
+        return None
+    return f"{text}\n"
+
+
+class _UnsupportedSpan(Exception):
+    """Raised when a span is outside the subset supported by
+    `convert_simple_tex_span`.
+    """
+
+
+class _SimpleSpanReader:
+    """A reader for the TeX subset supported by `convert_simple_tex_span`."""
+
+    def __init__(self, source: str) -> None:
+        self._source = source
+        self._position = 0
+        self._output: List[str] = []
+
+    def read(self) -> str:
+        """Read the source, returning its plain text content.
+
+        Raises
+        ------
+        _UnsupportedSpan
+            Raised if the source contains unsupported TeX.
+        """
+        depth = 0
+        while self._position < len(self._source):
+            c = self._source[self._position]
+            if c == "\\":
+                self._read_command()
+                continue
+            elif c == "{":
+                if self._peek(1).isspace():
+                    raise _UnsupportedSpan
+                depth += 1
+            elif c == "}":
+                if depth == 0 or self._peek(-1).isspace():
+                    raise _UnsupportedSpan
+                depth -= 1
+            elif c == "~":
+                self._output.append("\u00a0")
+            elif c == "'":
+                if not (self._peek(-1).isalnum() and self._peek(1).isalnum()):
+                    raise _UnsupportedSpan
+                self._output.append("\u2019")
+            elif c == "\n":
+                if (
+                    self._source[self._position + 1 :].lstrip(" \t")[:1]
+                    == "\n"
+                ):
+                    # A blank line starts a new paragraph
+                    raise _UnsupportedSpan
+                self._output.append(c)
+            elif c in "-.":
+                if self._peek(1) == c:
+                    # Dashes and ellipses
+                    raise _UnsupportedSpan
+                self._output.append(c)
+            elif c.isalnum() or c in PUNCTUATION or c in " \t":
+                self._output.append(c)
+            else:
+                raise _UnsupportedSpan
+            self._position += 1
+
+        if depth != 0:
+            raise _UnsupportedSpan
+        return "".join(self._output)
+
+    def _peek(self, offset: int) -> str:
+        """Get the character at an offset from the current position, or an
+        empty string if the offset is outside the source.
+        """
+        index = self._position + offset
+        if 0 <= index < len(self._source):
+            return self._source[index]
+        return ""
+
+    def _read_command(self) -> None:
+        """Read a command that starts at the current position."""
+        name = self._peek(1)
+        if name in ESCAPED_CHARACTERS:
+            self._output.append(name)
+            self._position += 2
+        elif name in SYMBOL_ACCENTS:
+            self._position += 2
+            self._output.append(self._read_accent(SYMBOL_ACCENTS[name]))
+        else:
+            match = CONTROL_WORD_PATTERN.match(
+                self._source, self._position + 1
+            )
+            if match is None:
+                raise _UnsupportedSpan
+            name = match.group(0)
+            self._position = match.end()
+            if name in LETTER_ACCENTS and self._peek(0) == "{":
+                self._output.append(self._read_accent(LETTER_ACCENTS[name]))
+            elif name in SPECIAL_LETTERS:
+                self._output.append(SPECIAL_LETTERS[name])
+                # Spaces following a control word are ignored
+                while self._peek(0) in (" ", "\t"):
+                    self._position += 1
+                # Pandoc reads a following star as the starred form of the
+                # command, and drops it
+                if self._peek(0) == "*":
+                    raise _UnsupportedSpan
+            elif name in TEXT_STYLE_COMMANDS and self._peek(0) == "{":
+                # The braced argument is read as a group
+                pass
+            else:
+                raise _UnsupportedSpan
+
+    def _read_accent(self, combining_character: str) -> str:
+        """Read the argument of an accent command (either a single letter or
+        a single letter in braces) and return the accented character.
+        """
+        if self._peek(0) == "{" and self._peek(2) == "}":
+            letter = self._peek(1)
+            self._position += 3
+        else:
+            letter = self._peek(0)
+            self._position += 1
+        if not letter.isalpha():
+            raise _UnsupportedSpan
+        return unicodedata.normalize("NFC", letter + combining_character)
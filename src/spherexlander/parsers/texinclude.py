@@ -0,0 +1,390 @@
+"""A shared cache of normalized TeX files, and the graph of the files that
+each document includes.
+
+Most SPHEREx documents input the same kinds of files (such as the
+``meta.tex`` file that the build generates, or acronym lists and preambles
+that are shared by the documents of a repository). The `IncludeCache` keeps
+the normalized source of each file that a parser reads (with comments and
+trailing whitespace removed), so a batch build reads and normalizes a
+shared file once. `read_tex_source` assembles a document's source from the
+cache, like `lander.ext.parser.texutils.normalize.read_tex_file`.
+
+The `IncludeGraph` records the files that each document includes, so that
+the documents that an edited file affects can be found.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass
+from logging import getLogger
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from lander.ext.parser.texutils.normalize import (
+    input_include_pattern,
+    remove_comments,
+    remove_trailing_whitespace,
+)
+
+from ..cache import ContentCache, open_cache
+from ..metrics import CACHE_REQUESTS
+
+if TYPE_CHECKING:
+    from ..config import PluginConfig
+
+__all__ = [
+    "IncludeCache",
+    "IncludeFile",
+    "IncludeGraph",
+    "get_include_cache",
+    "get_include_graph",
+    "read_tex_source",
+    "resolve_include",
+]
+
+logger = getLogger(__name__)
+
+INCLUDE_CACHE_FORMAT = "1"
+"""Version of the format of persistent cache entries, which is part of
+their keys.
+"""
+
+
+@dataclass(frozen=True)
+class IncludeFile:
+    """The normalized source of a TeX file, along with the file status that
+    it was read with.
+    """
+
+    path: str
+    """Absolute path of the file."""
+
+    mtime_ns: int
+    """Modification time of the file, in nanoseconds."""
+
+    size: int
+    """Size of the file, in bytes."""
+
+    sha256: str
+    """SHA-256 hash of the file's content."""
+
+    source: str
+    """The file's source, with comments and trailing whitespace removed.
+
+    Input commands aren't expanded, since files are resolved relative to
+    the root directory of the document that includes them.
+    """
+
+    @property
+    def inputs(self) -> List[str]:
+        r"""Names of the files that are input with ``\input`` or
+        ``\include`` commands, as they appear in the commands.
+        """
+        return [
+            match.group("filename")
+            for match in input_include_pattern.finditer(self.source)
+        ]
+
+
+class IncludeCache:
+    """A cache of normalized TeX files, keyed by their absolute paths.
+
+    An entry is reused if the file's size and modification time are
+    unchanged. If they changed, but the file's content hash is unchanged
+    (for example, if the file was touched or checked out again), the entry
+    is also reused.
+
+    Parameters
+    ----------
+    persistent
+        An on-disk cache where entries are also stored, keyed by the file's
+        path, size, and modification time, so that other processes can reuse
+        them.
+
+    Notes
+    -----
+    The cache is thread-safe. Like ``make``, it trusts that a file whose
+    size and modification time are unchanged has the same content.
+    """
+
+    def __init__(self, persistent: Optional[ContentCache] = None) -> None:
+        self._persistent = persistent
+        self._entries: Dict[str, IncludeFile] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        """Number of lookups that reused an entry."""
+
+        self.misses = 0
+        """Number of lookups that read and normalized a file."""
+
+    def get(self, path: Path) -> IncludeFile:
+        """Get the normalized source of a file.
+
+        Parameters
+        ----------
+        path
+            Path of the file.
+
+        Raises
+        ------
+        OSError
+            Raised if the file can't be read.
+        """
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and _is_current(entry, stat):
+            self._hit()
+            return entry
+
+        persistent_key = self._persistent_key(key, stat)
+        if persistent_key is not None:
+            cached = self._read_persistent(persistent_key)
+            if cached is not None and cached.path == key:
+                self._hit()
+                return self._store(cached)
+
+        with open(key, "rb") as f:
+            data = f.read()
+            # The entry records the status of the file as it was read.
+            stat = os.fstat(f.fileno())
+        sha256 = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry.sha256 == sha256:
+            self._hit()
+            source = entry.source
+        else:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="include", result="miss")
+            source = _normalize(data)
+        new_entry = IncludeFile(
+            path=key,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            sha256=sha256,
+            source=source,
+        )
+        if persistent_key is not None and self._persistent is not None:
+            self._persistent.set(
+                persistent_key, json.dumps(asdict(new_entry)).encode("utf-8")
+            )
+        return self._store(new_entry)
+
+    def _hit(self) -> None:
+        self.hits += 1
+        CACHE_REQUESTS.inc(cache="include", result="hit")
+
+    def clear(self) -> None:
+        """Delete the entries in memory."""
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, entry: IncludeFile) -> IncludeFile:
+        with self._lock:
+            self._entries[entry.path] = entry
+        return entry
+
+    def _persistent_key(
+        self, path: str, stat: os.stat_result
+    ) -> Optional[str]:
+        if self._persistent is None:
+            return None
+        return self._persistent.make_key(
+            INCLUDE_CACHE_FORMAT,
+            path,
+            str(stat.st_mtime_ns),
+            str(stat.st_size),
+        )
+
+    def _read_persistent(self, key: str) -> Optional[IncludeFile]:
+        assert self._persistent is not None
+        data = self._persistent.get(key)
+        if data is None:
+            return None
+        try:
+            return IncludeFile(**json.loads(data))
+        except (ValueError, TypeError):
+            return None
+
+
+def _is_current(entry: IncludeFile, stat: os.stat_result) -> bool:
+    return entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns
+
+
+def _normalize(data: bytes) -> str:
+    """Decode a TeX file (with universal newlines, as `pathlib.Path.read_text`
+    does) and remove its comments and trailing whitespace.
+    """
+    text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    return remove_trailing_whitespace(remove_comments(text))
+
+
+class IncludeGraph:
+    """The files that each document includes.
+
+    The graph is updated whenever a parser reads a document's source (see
+    `read_tex_source`), and is thread-safe.
+    """
+
+    def __init__(self) -> None:
+        self._includes: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, root_path: Path, files: Iterable[Path]) -> None:
+        """Record the files that a document includes.
+
+        Parameters
+        ----------
+        root_path
+            Path of the document's root TeX file.
+        files
+            Paths of the files that the document includes, recursively.
+        """
+        root = os.path.abspath(root_path)
+        included = frozenset(os.path.abspath(path) for path in files)
+        with self._lock:
+            self._includes[root] = included - {root}
+
+    def includes(self, root_path: Path) -> Set[Path]:
+        """Get the files that a document includes, or an empty set if the
+        document's source hasn't been read.
+        """
+        with self._lock:
+            included = self._includes.get(os.path.abspath(root_path), ())
+        return {Path(path) for path in included}
+
+    def dependents(self, path: Path) -> Set[Path]:
+        """Get the root files of the documents that are affected by a change
+        to a file: the documents that include it, and the document itself if
+        the file is a root file.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            roots = {
+                root
+                for root, included in self._includes.items()
+                if root == key or key in included
+            }
+        return {Path(root) for root in roots}
+
+    @property
+    def documents(self) -> List[Path]:
+        """Root files of the documents in the graph."""
+        with self._lock:
+            return [Path(root) for root in sorted(self._includes)]
+
+
+def resolve_include(filename: str, root_dir: Path) -> Path:
+    r"""Resolve the file name of an ``\input`` or ``\include`` command, as
+    `lander.ext.parser.texutils.normalize.process_inputs` does: relative to
+    the document's root directory, with a ``.tex`` extension added if
+    necessary.
+    """
+    if not filename.endswith(".tex"):
+        filename = f"{filename}.tex"
+    return Path(os.path.abspath(root_dir.joinpath(filename)))
+
+
+def read_tex_source(
+    root_path: Path,
+    *,
+    cache: Optional[IncludeCache] = None,
+    graph: Optional[IncludeGraph] = None,
+) -> str:
+    r"""Read a TeX document's source, with the content of ``\input`` and
+    ``\include`` files inserted.
+
+    The result is the same as that of
+    `lander.ext.parser.texutils.normalize.read_tex_file`, but the files are
+    read through the include cache.
+
+    Parameters
+    ----------
+    root_path
+        Path of the document's root TeX file.
+    cache
+        The include cache. The default is the process's cache (see
+        `get_include_cache`).
+    graph
+        The include graph that is updated with the document's files. The
+        default is the process's graph (see `get_include_graph`).
+
+    Raises
+    ------
+    ValueError
+        Raised if the root file or an included file is not a file (as in
+        ``read_tex_file``).
+    """
+    include_cache = cache if cache is not None else get_include_cache()
+    root_dir = root_path.parent
+    files: List[Path] = []
+
+    def read(path: Path) -> str:
+        if not path.is_file():
+            raise ValueError(f"root_filepath must be a file (got {path}).")
+        files.append(path)
+        return input_include_pattern.sub(
+            expand, include_cache.get(path).source
+        )
+
+    def expand(match: re.Match) -> str:
+        path = resolve_include(match.group("filename"), root_dir)
+        try:
+            return read(path)
+        except ValueError:
+            logger.error("Cannot open %s for inclusion", path)
+            raise
+
+    source = read(root_path)
+    (graph if graph is not None else _include_graph).update(root_path, files)
+    return source
+
+
+_include_caches: Dict[Optional[Path], IncludeCache] = {}
+"""The include caches of this process, keyed by the directory of their
+persistent cache.
+"""
+
+_include_graph = IncludeGraph()
+
+
+def get_include_cache(config: Optional[PluginConfig] = None) -> IncludeCache:
+    """Get the process's include cache.
+
+    The cache is also persistent if
+    `~spherexlander.config.PluginConfig.include_cache_persistent` is set.
+
+    Parameters
+    ----------
+    config
+        The plugin configuration, if it is already loaded.
+    """
+    from ..config import load_config
+
+    if config is None:
+        config = load_config()
+    persistent = None
+    if config.include_cache_persistent:
+        persistent = open_cache("texinclude")
+    cache_id = persistent.directory if persistent is not None else None
+    if cache_id not in _include_caches:
+        _include_caches[cache_id] = IncludeCache(persistent)
+    return _include_caches[cache_id]
+
+
+def get_include_graph() -> IncludeGraph:
+    """Get the process's include graph."""
+    return _include_graph
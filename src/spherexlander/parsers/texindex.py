@@ -0,0 +1,155 @@
+"""A single-pass index of the LaTeX commands in a document's source."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from lander.ext.parser.texutils.extract import LaTeXCommand, ParsedCommand
+
+__all__ = ["TexCommandIndex", "IndexedCommand"]
+
+COMMAND_PATTERN = re.compile(r"\\(?:(?P<name>[a-zA-Z@]+)|.)", re.S)
+"""Regular expression for a control sequence.
+
+Control symbols such as ``\\\\`` or ``\\{`` are matched (and skipped) so that
+the letters following them are not mistaken for a command name.
+"""
+
+DELIMITER_PATTERN = re.compile(r"[\s{[%]")
+"""Regular expression for the character that must follow a command's name
+for `lander.ext.parser.texutils.extract.LaTeXCommand.parse` to match it (so
+that, for example, ``\\title*`` isn't a ``\\title`` command).
+"""
+
+
+@dataclass(frozen=True)
+class IndexedCommand:
+    """An occurrence of a command in the source."""
+
+    name: str
+    """Name of the command, without the backslash prefix."""
+
+    start: int
+    """Character index where the command (the backslash) begins."""
+
+    end: int
+    """Character index following the command name."""
+
+
+class TexCommandIndex:
+    """An index of every command in a TeX source, built with a single scan of
+    the source.
+
+    The scan records the name and location of every command. The arguments
+    of a command's occurrences are parsed when the command is looked up, so
+    the cost of a lookup depends on the number of occurrences rather than
+    the size of the source.
+
+    Metadata parsers query the index with the same
+    `~lander.ext.parser.texutils.extract.LaTeXCommand` definitions they would
+    otherwise use to rescan the full source for each command. Each
+    occurrence is parsed by the command definition itself, so the results
+    are the same as `~lander.ext.parser.texutils.extract.LaTeXCommand.parse`
+    with one difference: control symbols are skipped, so the ``\\title``
+    in ``\\\\title`` (a line break followed by "title") isn't a command.
+
+    Parameters
+    ----------
+    source
+        The (normalized) TeX source.
+    """
+
+    def __init__(self, source: str) -> None:
+        self._source = source
+        self._starts: Dict[str, List[int]] = {}
+        for match in COMMAND_PATTERN.finditer(source):
+            name = match.group("name")
+            if name is not None:
+                self._starts.setdefault(name, []).append(match.start())
+        self._occurrences: Dict[str, List[IndexedCommand]] = {}
+
+    @property
+    def source(self) -> str:
+        """The indexed TeX source."""
+        return self._source
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the commands found in the source."""
+        return sorted(self._starts.keys())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._starts
+
+    def occurrences(
+        self, name: str, *, within: Optional[ParsedCommand] = None
+    ) -> List[IndexedCommand]:
+        """Get the occurrences of a command, in source order.
+
+        Parameters
+        ----------
+        name
+            Name of the command, without the backslash prefix.
+        within
+            If set, only occurrences inside the source span of this parsed
+            command are included (for example, the ``\\person`` commands
+            inside an ``\\author`` command).
+        """
+        if name not in self._occurrences:
+            self._occurrences[name] = [
+                IndexedCommand(
+                    name=name, start=start, end=start + len(name) + 1
+                )
+                for start in self._starts.get(name, [])
+            ]
+        commands = self._occurrences[name]
+        if within is None:
+            return list(commands)
+        start = within.start_index
+        end = start + len(within.command_source)
+        return [c for c in commands if start < c.start < end]
+
+    def parse(
+        self, command: LaTeXCommand, *, within: Optional[ParsedCommand] = None
+    ) -> List[ParsedCommand]:
+        """Parse the occurrences of a command with the given syntax.
+
+        This is the indexed equivalent of
+        `lander.ext.parser.texutils.extract.LaTeXCommand.parse`: like it,
+        occurrences whose name isn't followed by whitespace, a bracket, or a
+        comment are skipped, a required argument that doesn't start on the
+        command's line is read as a whitespace-delimited argument (such as
+        ``\\input file``), and malformed occurrences raise `RuntimeError`.
+
+        Parameters
+        ----------
+        command
+            The command definition.
+        within
+            If set, only occurrences inside the source span of this parsed
+            command are included.
+
+        Returns
+        -------
+        list of `lander.ext.parser.texutils.extract.ParsedCommand`
+            The parsed occurrences, in source order.
+
+        Raises
+        ------
+        RuntimeError
+            Raised if an occurrence lacks a required element, or has an
+            unbalanced bracket.
+        """
+        parsed_commands = []
+        for occurrence in self.occurrences(command.name, within=within):
+            if DELIMITER_PATTERN.match(self._source, occurrence.end) is None:
+                continue
+            # The single-occurrence parser of the command definition, which
+            # LaTeXCommand.parse applies to each match of its pattern (lander
+            # is pinned, so this private method is stable)
+            parsed_commands.append(
+                command._parse_command(self._source, occurrence.start)
+            )
+        return parsed_commands
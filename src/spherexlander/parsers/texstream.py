@@ -0,0 +1,151 @@
+"""Streaming reader for the preamble of a TeX document.
+
+The metadata commands of SPHEREx documents are in the preamble, before
+``\\begin{document}``. `read_tex_preamble` reads the source line by line,
+opening files included with ``\\input`` and ``\\include`` only as they are
+reached, and stops reading at ``\\begin{document}``, so the document's body
+is never read. Included files are read through the include cache (see
+`spherexlander.parsers.texinclude`).
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from logging import getLogger
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from lander.ext.parser.texutils.normalize import input_include_pattern
+
+from .texinclude import (
+    IncludeCache,
+    IncludeGraph,
+    get_include_cache,
+    get_include_graph,
+    resolve_include,
+)
+
+__all__ = ["BEGIN_DOCUMENT_PATTERN", "read_tex_preamble", "extract_body"]
+
+logger = getLogger(__name__)
+
+BEGIN_DOCUMENT_PATTERN = re.compile(r"\\begin[ \t]*\{document\}")
+"""Regular expression for the ``\\begin{document}`` command."""
+
+COMMENT_PATTERN = re.compile(r"(?<!\\)%.*$")
+"""Regular expression for a comment in a line, as removed by
+`lander.ext.parser.texutils.normalize.remove_comments`.
+"""
+
+TRAILING_WHITESPACE_PATTERN = re.compile(r"[ \t]+$")
+
+
+def read_tex_preamble(
+    root_path: Path,
+    *,
+    cache: Optional[IncludeCache] = None,
+    graph: Optional[IncludeGraph] = None,
+) -> str:
+    r"""Read the preamble of a TeX document, up to ``\begin{document}``.
+
+    The preamble is normalized like
+    `lander.ext.parser.texutils.normalize.read_tex_file` normalizes a whole
+    document: comments and trailing whitespace are removed and the content
+    of ``\input`` and ``\include`` files is inserted.
+
+    Parameters
+    ----------
+    root_path
+        Path of the document's root TeX file.
+    cache
+        The include cache for included files. The default is the process's
+        cache (see `~spherexlander.parsers.texinclude.get_include_cache`).
+    graph
+        The include graph that is updated with the files that the preamble
+        includes. The default is the process's graph.
+
+    Returns
+    -------
+    str
+        The normalized preamble. If the source has no ``\begin{document}``
+        command, the whole normalized source is returned.
+
+    Raises
+    ------
+    ValueError
+        Raised if ``root_path``, or a file included in the preamble, is not
+        a file (as in ``read_tex_file``).
+    """
+    if not root_path.is_file():
+        raise ValueError(f"root_filepath must be a file (got {root_path}).")
+    reader = _PreambleReader(
+        root_path.parent,
+        cache if cache is not None else get_include_cache(),
+    )
+
+    preamble: List[str] = []
+    with root_path.open() as f:
+        for part in reader.read_lines(_normalize_lines(f)):
+            match = BEGIN_DOCUMENT_PATTERN.search(part)
+            if match is not None:
+                preamble.append(part[: match.start()])
+                break
+            preamble.append(part)
+    (graph if graph is not None else get_include_graph()).update(
+        root_path, reader.files
+    )
+    return "".join(preamble)
+
+
+def extract_body(tex_source: str) -> str:
+    r"""Get the body of a TeX document's source, after ``\begin{document}``,
+    or an empty string if the source has no ``\begin{document}`` command.
+    """
+    match = BEGIN_DOCUMENT_PATTERN.search(tex_source)
+    if match is None:
+        return ""
+    return tex_source[match.start() :]
+
+
+def _normalize_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Remove the comments and trailing whitespace of each line."""
+    for line in lines:
+        newline = "\n" if line.endswith("\n") else ""
+        line = COMMENT_PATTERN.sub("", line.rstrip("\n"))
+        yield TRAILING_WHITESPACE_PATTERN.sub("", line) + newline
+
+
+class _PreambleReader:
+    """Reads lines, with the lines of included files in place of the input
+    commands.
+
+    As in `lander.ext.parser.texutils.normalize.process_inputs`, an input
+    command is replaced along with the character that closes it (such as the
+    closing brace or the newline). Included files are only read as they are
+    reached.
+    """
+
+    def __init__(self, root_dir: Path, cache: IncludeCache) -> None:
+        self._root_dir = root_dir
+        self._cache = cache
+        self.files: List[Path] = []
+        """Paths of the files that were included."""
+
+    def read_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            yield from self._expand_inputs(line)
+
+    def _expand_inputs(self, line: str) -> Iterator[str]:
+        position = 0
+        for match in input_include_pattern.finditer(line):
+            yield line[position : match.start()]
+            position = match.end()
+            path = resolve_include(match.group("filename"), self._root_dir)
+            if not path.is_file():
+                logger.error("Cannot open %s for inclusion", path)
+                raise ValueError(f"root_filepath must be a file (got {path}).")
+            self.files.append(path)
+            source = self._cache.get(path).source
+            yield from self.read_lines(io.StringIO(source))
+        yield line[position:]
@@ -0,0 +1,349 @@
+"""Placement of the PDF, attachments, and theme assets into a site.
+
+`place_file` puts a file into a site's output directory with the configured
+`PlacementStrategy` (see `spherexlander.config.PluginConfig.placement`).
+The default strategy copies files through this process, hashing them in the
+same pass, so the build manifest doesn't read them again (see
+`spherexlander.incremental.record_build`). The other strategies avoid
+copying data where the filesystem allows it:
+
+1. A reflink (``FICLONE``) shares the source's blocks copy-on-write, on
+   filesystems such as Btrfs and XFS.
+2. A hard link makes the site's file the same file as the source, which
+   only suits sources that are replaced rather than modified in place.
+3. ``copy_file_range`` or ``sendfile`` copies the data within the kernel.
+4. Otherwise, the file is copied.
+
+Each method that isn't supported falls through to the next. Files are
+placed through a temporary file that replaces the destination, so a hard
+link is never written through, and the destination gets the source's
+modification time, so a file with the same size and modification time as
+its source is left in place by later builds.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import secrets
+import stat
+import sys
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from logging import getLogger
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+__all__ = [
+    "PlacedFile",
+    "PlacementMethod",
+    "PlacementStrategy",
+    "place_file",
+]
+
+logger = getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+"""Size of the chunks, in bytes, in which files are copied and compared."""
+
+FICLONE = 0x40049409
+"""The Linux ioctl request that reflinks a file (from ``linux/fs.h``)."""
+
+UNSUPPORTED_ERRNOS = frozenset(
+    {
+        errno.EXDEV,
+        errno.EINVAL,
+        errno.ENOSYS,
+        errno.EOPNOTSUPP,
+        errno.ENOTTY,
+        errno.EPERM,
+        errno.EMLINK,
+    }
+)
+"""Error numbers that mean a placement method isn't supported for a pair of
+files, rather than that placing the file failed.
+"""
+
+
+class PlacementStrategy(str, Enum):
+    """How files are placed into a site."""
+
+    copy = "copy"
+    """Copy files, hashing them in the same pass."""
+
+    reflink = "reflink"
+    """Reflink files, falling back to a copy within the kernel, and then to
+    a copy. The site's files are independent of their sources.
+    """
+
+    link = "link"
+    """Reflink or hard link files, falling back to a copy within the kernel,
+    and then to a copy. A hard-linked file in the site changes if its source
+    is modified in place.
+    """
+
+
+class PlacementMethod(str, Enum):
+    """How a file was placed into a site."""
+
+    unchanged = "unchanged"
+    """The destination already had the source's content, so it was left in
+    place.
+    """
+
+    reflink = "reflink"
+    """The file was reflinked."""
+
+    hardlink = "hardlink"
+    """The file was hard linked."""
+
+    copy_file_range = "copy_file_range"
+    """The file was copied in the kernel with ``copy_file_range``."""
+
+    sendfile = "sendfile"
+    """The file was copied in the kernel with ``sendfile``."""
+
+    copy = "copy"
+    """The file was copied through this process."""
+
+
+@dataclass
+class PlacedFile:
+    """The result of placing a file."""
+
+    method: PlacementMethod
+    """How the file was placed."""
+
+    size: int
+    """Size of the source file, in bytes, when it was placed."""
+
+    mtime_ns: int
+    """Modification time of the source file, in nanoseconds, when it was
+    placed.
+    """
+
+    sha256: Optional[str] = None
+    """SHA-256 hash of the file's content, if the file was read to place it.
+    """
+
+    @property
+    def placed(self) -> bool:
+        """Whether the destination was written."""
+        return self.method != PlacementMethod.unchanged
+
+
+_unsupported: Set[Tuple[PlacementMethod, int, int]] = set()
+"""Methods that aren't supported from a source device to a destination
+device, which aren't tried again for those devices.
+"""
+
+_unsupported_lock = threading.Lock()
+
+
+def place_file(
+    source: Path,
+    destination: Path,
+    strategy: Optional[PlacementStrategy] = None,
+) -> PlacedFile:
+    """Place a file into a site, unless the destination already has the
+    same content.
+
+    Parameters
+    ----------
+    source
+        The file to place.
+    destination
+        The path of the file in the site.
+    strategy
+        How to place the file. The default is the configured strategy (see
+        `spherexlander.config.PluginConfig.placement`).
+
+    Returns
+    -------
+    PlacedFile
+        How the file was placed, with the source's size, and its hash if it
+        was read.
+
+    Notes
+    -----
+    Like ``make``, a destination with the same size and modification time
+    as its source is trusted to have the same content.
+    """
+    if strategy is None:
+        from .config import load_config
+
+        strategy = load_config().placement
+
+    with source.open("rb") as f:
+        source_fd = f.fileno()
+        source_stat = os.fstat(source_fd)
+        unchanged = _check_unchanged(source_fd, source_stat, destination)
+        if unchanged is not None:
+            return unchanged
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        devices = (source_stat.st_dev, destination.parent.stat().st_dev)
+        temp_path = destination.with_name(
+            f".{destination.name}.{secrets.token_hex(4)}.tmp"
+        )
+        for method in _methods(strategy):
+            if (method, *devices) in _unsupported:
+                continue
+            try:
+                sha256 = _place(
+                    method, source, source_fd, source_stat, temp_path
+                )
+            except OSError as e:
+                _unlink(temp_path)
+                if (
+                    method == PlacementMethod.copy
+                    or e.errno not in UNSUPPORTED_ERRNOS
+                ):
+                    raise
+                logger.debug(
+                    "Cannot place %s with %s: %s", source, method.value, e
+                )
+                with _unsupported_lock:
+                    _unsupported.add((method, *devices))
+                continue
+            except BaseException:
+                _unlink(temp_path)
+                raise
+            os.replace(temp_path, destination)
+            return PlacedFile(
+                method=method,
+                size=source_stat.st_size,
+                mtime_ns=source_stat.st_mtime_ns,
+                sha256=sha256,
+            )
+    # A copy is always the last method, and it raises if it fails
+    raise AssertionError(f"No placement method for {source}")
+
+
+def _methods(strategy: PlacementStrategy) -> List[PlacementMethod]:
+    """The methods that a strategy tries, in order, on this platform."""
+    methods: List[PlacementMethod] = []
+    if strategy != PlacementStrategy.copy:
+        linux = sys.platform.startswith("linux")
+        if linux:
+            methods.append(PlacementMethod.reflink)
+        if strategy == PlacementStrategy.link:
+            methods.append(PlacementMethod.hardlink)
+        if hasattr(os, "copy_file_range"):
+            methods.append(PlacementMethod.copy_file_range)
+        if linux:
+            methods.append(PlacementMethod.sendfile)
+    methods.append(PlacementMethod.copy)
+    return methods
+
+
+def _check_unchanged(
+    source_fd: int, source_stat: os.stat_result, destination: Path
+) -> Optional[PlacedFile]:
+    """Check whether the destination already has the source's content.
+
+    A destination with a different modification time but the same size is
+    compared with the source, hashing the source in the same pass.
+    """
+    try:
+        destination_stat = destination.stat()
+    except FileNotFoundError:
+        return None
+    if destination_stat.st_size != source_stat.st_size:
+        return None
+    result = PlacedFile(
+        method=PlacementMethod.unchanged,
+        size=source_stat.st_size,
+        mtime_ns=source_stat.st_mtime_ns,
+    )
+    if (
+        os.path.samestat(source_stat, destination_stat)
+        or destination_stat.st_mtime_ns == source_stat.st_mtime_ns
+    ):
+        return result
+    digest = hashlib.sha256()
+    offset = 0
+    with destination.open("rb") as destination_file:
+        while True:
+            chunk = os.pread(source_fd, CHUNK_SIZE, offset)
+            if chunk != destination_file.read(len(chunk) or 1):
+                return None
+            if not chunk:
+                break
+            digest.update(chunk)
+            offset += len(chunk)
+    result.sha256 = digest.hexdigest()
+    return result
+
+
+def _place(
+    method: PlacementMethod,
+    source: Path,
+    source_fd: int,
+    source_stat: os.stat_result,
+    temp_path: Path,
+) -> Optional[str]:
+    """Place the source at the temporary path with a method, returning the
+    hash of the source if the method read it.
+    """
+    if method == PlacementMethod.hardlink:
+        os.link(source, temp_path)
+        return None
+
+    sha256 = None
+    size = source_stat.st_size
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        if method == PlacementMethod.reflink:
+            import fcntl
+
+            fcntl.ioctl(fd, FICLONE, source_fd)
+        elif method == PlacementMethod.copy_file_range:
+            offset = 0
+            while offset < size:
+                copied = os.copy_file_range(
+                    source_fd,
+                    fd,
+                    min(size - offset, 1 << 30),
+                    offset,
+                    offset,
+                )
+                if copied == 0:
+                    break
+                offset += copied
+        elif method == PlacementMethod.sendfile:
+            offset = 0
+            while offset < size:
+                copied = os.sendfile(
+                    fd, source_fd, offset, min(size - offset, 1 << 30)
+                )
+                if copied == 0:
+                    break
+                offset += copied
+        else:
+            digest = hashlib.sha256()
+            offset = 0
+            while True:
+                chunk = os.pread(source_fd, CHUNK_SIZE, offset)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(fd, view) :]
+                offset += len(chunk)
+            sha256 = digest.hexdigest()
+    finally:
+        os.close(fd)
+    os.chmod(temp_path, stat.S_IMODE(source_stat.st_mode))
+    os.utime(temp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+    return sha256
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
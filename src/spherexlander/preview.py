@@ -0,0 +1,250 @@
+"""A local HTTP server that previews a site and reloads its pages when the
+site is rebuilt, for watch mode (see `spherexlander.watch`).
+
+The server injects a small script into the HTML pages that it serves. The
+script listens to the server's `RELOAD_PATH` event stream (server-sent
+events), and reloads the page once the site is rebuilt (see
+`PreviewServer.reload`).
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+__all__ = ["PreviewServer", "RELOAD_PATH", "inject_reload_script"]
+
+logger = getLogger(__name__)
+
+RELOAD_PATH = "/__spherex-lander/reload"
+"""Path of the event stream that notifies pages of rebuilds."""
+
+KEEPALIVE_INTERVAL = 15.0
+"""Interval, in seconds, between the comments that keep event streams open
+(and detect closed connections).
+"""
+
+_BODY_END_PATTERN = re.compile(rb"</body\s*>", re.IGNORECASE)
+
+
+def inject_reload_script(html: bytes, version: int) -> bytes:
+    """Add the script that reloads a page on rebuilds to its HTML.
+
+    Parameters
+    ----------
+    html
+        The page's HTML.
+    version
+        The number of the build that the page is from, so that the page
+        reloads if it's already out of date when the script runs.
+    """
+    script = (
+        "<script>(function () {"
+        f'var source = new EventSource("{RELOAD_PATH}?version={version}");'
+        "source.onmessage = function () {"
+        "source.close(); window.location.reload();"
+        "};"
+        "})();</script>\n"
+    ).encode("utf-8")
+    matches = list(_BODY_END_PATTERN.finditer(html))
+    if not matches:
+        return html + script
+    position = matches[-1].start()
+    return html[:position] + script + html[position:]
+
+
+class PreviewServer:
+    """A threaded HTTP server of a site's directory that reloads pages when
+    the site is rebuilt.
+
+    The server is a context manager that closes it.
+
+    Parameters
+    ----------
+    directory
+        The site's output directory.
+    host
+        Host name or address to listen on. The default only accepts
+        connections from the local host.
+    port
+        Port to listen on, or ``0`` for any free port.
+    version
+        Number of the site's current build.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        version: int = 0,
+    ) -> None:
+        self.directory = directory
+        self._host = host
+        self._version = version
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        preview = self
+
+        class Handler(_PreviewHandler):
+            server_preview = preview
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """URL of the site's root."""
+        return f"http://{self._host}:{self._server.server_port}/"
+
+    @property
+    def version(self) -> int:
+        """Number of the site's current build."""
+        with self._condition:
+            return self._version
+
+    @property
+    def closed(self) -> bool:
+        """Whether the server was closed."""
+        return self._closed
+
+    def start(self) -> None:
+        """Serve the site in a background thread."""
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="spherex-lander-preview",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info("Serving %s at %s", self.directory, self.url)
+
+    def reload(self, version: Optional[int] = None) -> None:
+        """Reload the pages that are open, after the site is rebuilt.
+
+        Parameters
+        ----------
+        version
+            Number of the new build. The default increments the current
+            number.
+        """
+        with self._condition:
+            self._version = self._version + 1 if version is None else version
+            self._condition.notify_all()
+
+    def wait_for_reload(self, version: int, timeout: float) -> Optional[int]:
+        """Wait until the site has a build other than a version.
+
+        Returns
+        -------
+        int or None
+            The number of the site's build, or `None` if the timeout expired
+            or the server was closed first.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._version != version or self._closed, timeout
+            )
+            if self._closed or self._version == version:
+                return None
+            return self._version
+
+    def close(self) -> None:
+        """Stop the server, and close the event streams of pages."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> PreviewServer:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class _PreviewHandler(SimpleHTTPRequestHandler):
+    """Serves the files of a `PreviewServer`'s site, with the reload script
+    injected into HTML pages, and the server's event stream.
+    """
+
+    server_preview: PreviewServer
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(
+            *args, directory=str(self.server_preview.directory), **kwargs
+        )
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == RELOAD_PATH:
+            self._send_events(parse_qs(url.query).get("version", [""])[0])
+            return
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and url.path.endswith("/"):
+            path = path.joinpath("index.html")
+        if path.suffix == ".html" and path.is_file():
+            self._send_page(path)
+            return
+        super().do_GET()
+
+    def end_headers(self) -> None:
+        # Pages are rebuilt in place, so browsers shouldn't cache them
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_page(self, path: Path) -> None:
+        # The version is read first, so that a page that is rebuilt while
+        # it's read is reloaded rather than left out of date.
+        version = self.server_preview.version
+        try:
+            html = path.read_bytes()
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        content = inject_reload_script(html, version)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_events(self, version_query: str) -> None:
+        preview = self.server_preview
+        try:
+            version = int(version_query)
+        except ValueError:
+            version = preview.version
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while not preview.closed:
+                new_version = preview.wait_for_reload(
+                    version, KEEPALIVE_INTERVAL
+                )
+                if new_version is None:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    self.wfile.write(f"data: {new_version}\n\n".encode())
+                    version = new_version
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
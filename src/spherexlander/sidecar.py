@@ -0,0 +1,272 @@
+"""Metadata sidecars, which let a site be rendered again without parsing
+its document.
+
+Each build writes a sidecar next to the site's output directory (see
+`sidecar_path`) with the document's metadata model and the build settings.
+When only the theme changes (its templates or stylesheets), `rerender_site`
+rebuilds a site from its sidecar, skipping the TeX parser and Pandoc.
+
+Like the build manifest (see `spherexlander.incremental.manifest_path`),
+the sidecar isn't written into the output directory, since it has the
+absolute paths of the build host's files.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field, ValidationError
+
+from . import __version__ as spherexlander_version
+
+if TYPE_CHECKING:
+    from lander.ext.parser import DocumentMetadata
+    from lander.settings import BuildSettings
+
+__all__ = [
+    "MetadataSidecar",
+    "SIDECAR_SUFFIX",
+    "find_sites",
+    "rerender_site",
+    "sidecar_path",
+]
+
+logger = getLogger(__name__)
+
+SIDECAR_SUFFIX = ".spherex-metadata.json"
+"""Suffix of the metadata sidecar's file name, after the name of the site's
+output directory.
+"""
+
+LEGACY_SIDECAR_FILENAME = ".spherex-metadata.json"
+"""Name of the sidecar file that earlier versions wrote into sites, which
+builds remove.
+"""
+
+SIDECAR_FORMAT = 1
+"""Version of the sidecar's format. Sidecars with a different format are
+ignored.
+"""
+
+
+class MetadataSidecar(BaseModel):
+    """The metadata of a document and the settings that its site was built
+    with.
+    """
+
+    format: int = SIDECAR_FORMAT
+    """Version of the sidecar's format."""
+
+    spherexlander_version: str = spherexlander_version
+    """Version of spherex-lander that wrote the sidecar."""
+
+    metadata_class: str
+    """Import path of the metadata model's class, as
+    ``module:QualifiedName``.
+    """
+
+    metadata: Dict[str, Any]
+    """The metadata, in its JSON form."""
+
+    source_path: Path
+    """Absolute path of the document's root TeX file."""
+
+    pdf: Path
+    """Absolute path of the document's PDF."""
+
+    attachments: List[Path] = Field(default_factory=list)
+    """Absolute paths of the document's attachments."""
+
+    parser: str
+    """Name of the parser plugin that extracted the metadata."""
+
+    theme: str
+    """Name of the theme plugin."""
+
+    canonical_url: Optional[str] = None
+    """The canonical URL of the landing page."""
+
+    settings_metadata: Dict[str, Any] = Field(default_factory=dict)
+    """Metadata overrides from the build settings."""
+
+    template_vars: Dict[str, Any] = Field(default_factory=dict)
+    """Template variables from the build settings."""
+
+    @classmethod
+    def create(
+        cls,
+        metadata: DocumentMetadata,
+        settings: BuildSettings,
+        *,
+        metadata_json: Optional[str] = None,
+    ) -> MetadataSidecar:
+        """Create the sidecar for a document's build.
+
+        Parameters
+        ----------
+        metadata
+            The document's metadata.
+        settings
+            The build settings.
+        metadata_json
+            The metadata's JSON, if it is already serialized.
+        """
+        metadata_type = type(metadata)
+        if metadata_json is None:
+            metadata_json = metadata.json()
+        return cls(
+            metadata_class=(
+                f"{metadata_type.__module__}:{metadata_type.__qualname__}"
+            ),
+            metadata=json.loads(metadata_json),
+            source_path=settings.source_path.resolve(),
+            pdf=settings.pdf.file_path.resolve(),
+            attachments=[a.file_path.resolve() for a in settings.attachments],
+            parser=settings.parser,
+            theme=settings.theme,
+            canonical_url=(
+                str(settings.canonical_url) if settings.canonical_url else None
+            ),
+            settings_metadata=settings.metadata,
+            template_vars=settings.template_vars,
+        )
+
+    @classmethod
+    def read(cls, output_dir: Path) -> Optional[MetadataSidecar]:
+        """Read the sidecar of a site, returning `None` if there is no usable
+        sidecar.
+        """
+        path = sidecar_path(output_dir)
+        try:
+            sidecar = cls.parse_raw(path.read_text())
+        except (OSError, ValueError, ValidationError):
+            return None
+        if sidecar.format != SIDECAR_FORMAT:
+            return None
+        return sidecar
+
+    def write(self, output_dir: Path) -> None:
+        """Write the sidecar of a site, next to its output directory.
+
+        A sidecar that an earlier version wrote into the output directory is
+        removed, so that it isn't published.
+        """
+        from .incremental import write_if_changed
+
+        # Without indentation, the json module's C encoder is used, which is
+        # several times faster for documents with many authors.
+        write_if_changed(
+            sidecar_path(output_dir),
+            self.json(sort_keys=True).encode("utf-8"),
+        )
+        output_dir.joinpath(LEGACY_SIDECAR_FILENAME).unlink(missing_ok=True)
+
+    def load_metadata(self) -> DocumentMetadata:
+        """Create the document's metadata model.
+
+        Raises
+        ------
+        ImportError
+            Raised if the metadata model's class can't be imported.
+        pydantic.ValidationError
+            Raised if the metadata isn't valid for the model.
+        """
+        module_name, _, qualname = self.metadata_class.partition(":")
+        model: Any = importlib.import_module(module_name)
+        for name in qualname.split("."):
+            try:
+                model = getattr(model, name)
+            except AttributeError:
+                raise ImportError(
+                    f"Cannot import {self.metadata_class}"
+                ) from None
+        metadata_type: Type[DocumentMetadata] = model
+        return metadata_type.parse_obj(self.metadata)
+
+    def load_settings(self, output_dir: Path) -> BuildSettings:
+        """Create the build settings for rendering the site into an output
+        directory.
+
+        The sizes and types of the PDF and attachments are read again, since
+        the files may have been replaced.
+        """
+        from lander.settings import BuildSettings, DownloadableFile
+
+        return BuildSettings.parse_obj(
+            {
+                "source_path": self.source_path,
+                "pdf": DownloadableFile.load(self.pdf),
+                "attachments": [
+                    DownloadableFile.load(p) for p in self.attachments
+                ],
+                "parser": self.parser,
+                "theme": self.theme,
+                "canonical_url": self.canonical_url,
+                "output_dir": output_dir,
+                "metadata": self.settings_metadata,
+                "template_vars": self.template_vars,
+            }
+        )
+
+
+def sidecar_path(output_dir: Path) -> Path:
+    """Get the path of a site's metadata sidecar, such as
+    ``_build.spherex-metadata.json`` for ``_build``.
+    """
+    output_dir = Path(os.path.abspath(output_dir))
+    return output_dir.with_name(f"{output_dir.name}{SIDECAR_SUFFIX}")
+
+
+def find_sites(root_dir: Path) -> List[Path]:
+    """Find the output directories of the sites under a directory (including
+    the directory itself) that have metadata sidecars.
+    """
+    sites = set()
+    if sidecar_path(root_dir).is_file():
+        sites.add(root_dir)
+    for path in root_dir.rglob(f"*{SIDECAR_SUFFIX}"):
+        output_dir = path.with_name(path.name[: -len(SIDECAR_SUFFIX)])
+        if output_dir.is_dir():
+            sites.add(output_dir)
+    return sorted(sites)
+
+
+def rerender_site(output_dir: Path) -> BuildSettings:
+    """Build a site again from its metadata sidecar, without parsing the
+    document.
+
+    Parameters
+    ----------
+    output_dir
+        The site's output directory.
+
+    Returns
+    -------
+    lander.settings.BuildSettings
+        The settings that the site was built with.
+
+    Raises
+    ------
+    ValueError
+        Raised if the site has no usable sidecar.
+    """
+    from lander.plugins import themes
+
+    sidecar = MetadataSidecar.read(output_dir)
+    if sidecar is None:
+        raise ValueError(
+            f"{output_dir} has no usable metadata sidecar "
+            f"({sidecar_path(output_dir).name}); build the document again."
+        )
+    logger.info("Rendering %s from its metadata sidecar", output_dir)
+    settings = sidecar.load_settings(output_dir)
+    theme = themes[settings.theme](
+        metadata=sidecar.load_metadata(), settings=settings
+    )
+    theme.build_site()
+    return settings
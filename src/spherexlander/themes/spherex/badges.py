@@ -0,0 +1,201 @@
+"""Rendering of metadata badges (such as the pipeline level) as inline SVG.
+
+The badges mimic the "flat" style of https://shields.io badges, but are
+rendered at build time so that landing pages don't request images from
+another site.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import lru_cache
+from html import escape
+from typing import Dict
+
+from markupsafe import Markup
+
+__all__ = [
+    "badge",
+    "difficulty_color",
+    "pipeline_level_color",
+    "render_badge_svg",
+]
+
+PIPELINE_LEVEL_COLORS = {"L1": "88BFFE", "L2": "1AC604", "L3": "BEB1D0"}
+"""Badge colors for pipeline levels, taken from Brendan Crill's pipeline
+overview diagram.
+"""
+
+DEFAULT_PIPELINE_LEVEL_COLOR = "FEBCFF"
+"""Badge color for other pipeline levels."""
+
+DIFFICULTY_COLORS = {"High": "red", "Medium": "yellow", "Low": "green"}
+"""Badge colors for difficulty levels."""
+
+DEFAULT_DIFFICULTY_COLOR = "blue"
+"""Badge color for other difficulty levels."""
+
+NAMED_COLORS = {
+    "red": "E05D44",
+    "yellow": "DFB317",
+    "green": "97CA00",
+    "blue": "007EC6",
+    "grey": "555555",
+}
+"""Hex values of the named colors, matching those of shields.io."""
+
+LABEL_COLOR = "555555"
+"""Background color of a badge's label."""
+
+FONT_SIZE = 11
+"""Font size of the badge text, in pixels."""
+
+HORIZONTAL_PADDING = 5
+"""Padding on each side of the label and value text, in pixels."""
+
+# fmt: off
+VERDANA_WIDTHS: Dict[str, int] = {
+    " ": 720,
+    "-": 883,
+    ".": 748,
+    "_": 1302,
+    "/": 1178,
+    **{c: 1302 for c in "0123456789"},
+    **dict(
+        zip(
+            "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+            [
+                1401, 1405, 1430, 1577, 1294, 1178, 1587, 1540, 862,
+                931, 1419, 1141, 1718, 1533, 1612, 1235, 1612, 1424,
+                1400, 1252, 1500, 1401, 2025, 1405, 1253, 1403,
+            ],
+        )
+    ),
+    **dict(
+        zip(
+            "abcdefghijklmnopqrstuvwxyz",
+            [
+                1229, 1276, 1067, 1276, 1220, 720, 1276, 1296, 562,
+                698, 1193, 562, 1992, 1296, 1243, 1276, 1276, 874,
+                1067, 807, 1296, 1193, 1630, 1193, 1193, 1056,
+            ],
+        )
+    ),
+}
+# fmt: on
+"""Advance widths of characters in the Verdana font, in font units (2048
+per em), used to size the badges.
+"""
+
+VERDANA_UNITS_PER_EM = 2048
+
+
+def pipeline_level_color(level: str) -> str:
+    """Get the badge color for a pipeline level (``L1``, ``L2``, or
+    ``L3``).
+    """
+    return PIPELINE_LEVEL_COLORS.get(level, DEFAULT_PIPELINE_LEVEL_COLOR)
+
+
+def difficulty_color(difficulty: str) -> str:
+    """Get the badge color for a difficulty level (``High``, ``Medium``, or
+    ``Low``).
+    """
+    return DIFFICULTY_COLORS.get(difficulty, DEFAULT_DIFFICULTY_COLOR)
+
+
+def badge(label: str, value: object, color: str) -> Markup:
+    """Render a badge as inline SVG markup.
+
+    This function is available as the ``badge`` global in the theme's
+    templates.
+
+    Parameters
+    ----------
+    label
+        Text on the left side of the badge.
+    value
+        Text on the right side of the badge. Values that aren't strings
+        (such as integers) are converted to strings.
+    color
+        Background color of the value, either a hex value (such as
+        ``88BFFE``) or a named color (``red``, ``yellow``, ``green``,
+        ``blue``, or ``grey``).
+    """
+    return Markup(render_badge_svg(label, str(value), color))
+
+
+@lru_cache(maxsize=256)
+def render_badge_svg(label: str, value: str, color: str) -> str:
+    """Render the SVG source of a badge.
+
+    Badges are memoized, so each distinct badge is rendered only once per
+    process.
+
+    See also
+    --------
+    badge
+    """
+    fill = NAMED_COLORS.get(color, color).lstrip("#").upper()
+    label_width = _text_width(label) + 2 * HORIZONTAL_PADDING
+    value_width = _text_width(value) + 2 * HORIZONTAL_PADDING
+    width = label_width + value_width
+    # IDs are unique to the badge's content so that several badges can be
+    # inlined in the same page.
+    badge_id = hashlib.sha1(
+        f"{label}\0{value}\0{fill}".encode("utf-8")
+    ).hexdigest()[:10]
+    title = escape(f"{label}: {value}")
+    label_text = _render_text(label, label_width / 2, LABEL_COLOR)
+    value_text = _render_text(value, label_width + value_width / 2, fill)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" class="spherex-badge" '
+        f'width="{width}" height="20" role="img" aria-label="{title}">'
+        f"<title>{title}</title>"
+        f'<linearGradient id="badge-s-{badge_id}" x2="0" y2="100%">'
+        f'<stop offset="0" stop-color="#bbb" stop-opacity=".1"/>'
+        f'<stop offset="1" stop-opacity=".1"/>'
+        f"</linearGradient>"
+        f'<clipPath id="badge-r-{badge_id}">'
+        f'<rect width="{width}" height="20" rx="3" fill="#fff"/>'
+        f"</clipPath>"
+        f'<g clip-path="url(#badge-r-{badge_id})">'
+        f'<rect width="{label_width}" height="20" fill="#{LABEL_COLOR}"/>'
+        f'<rect x="{label_width}" width="{value_width}" height="20" '
+        f'fill="#{fill}"/>'
+        f'<rect width="{width}" height="20" fill="url(#badge-s-{badge_id})"/>'
+        f"</g>"
+        f'<g text-anchor="middle" '
+        f'font-family="Verdana,Geneva,DejaVu Sans,sans-serif" '
+        f'font-size="{FONT_SIZE}">'
+        f"{label_text}{value_text}"
+        f"</g>"
+        f"</svg>"
+    )
+
+
+def _text_width(text: str) -> int:
+    """Estimate the width of text in the badge font, in pixels."""
+    units = sum(VERDANA_WIDTHS.get(c, 1302) for c in text)
+    return round(units * FONT_SIZE / VERDANA_UNITS_PER_EM)
+
+
+def _render_text(text: str, x: float, background: str) -> str:
+    """Render text, with a shadow, centered on a background color."""
+    escaped = escape(text)
+    if _is_light(background):
+        return f'<text x="{x:g}" y="14" fill="#333">{escaped}</text>'
+    return (
+        f'<text x="{x:g}" y="15" fill="#010101" fill-opacity=".3">'
+        f"{escaped}</text>"
+        f'<text x="{x:g}" y="14" fill="#fff">{escaped}</text>'
+    )
+
+
+def _is_light(color: str) -> bool:
+    """Determine whether a hex color is light enough to need dark text."""
+    try:
+        r, g, b = (int(color[i : i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return False
+    return (r * 299 + g * 587 + b * 114) / 255000 >= 0.69
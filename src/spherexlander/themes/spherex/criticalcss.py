@@ -0,0 +1,391 @@
+"""Inlining of the critical CSS of landing pages.
+
+A stylesheet that is linked from a page's head blocks its rendering until
+the stylesheet is downloaded. `inline_critical_css` replaces the link to
+the theme's stylesheet with a ``<style>`` element that has the rules whose
+selectors can match the page, and loads the full stylesheet asynchronously
+for the elements that scripts add later.
+
+Selectors are matched conservatively: a rule is kept if the page has every
+element type, class, ID, and attribute that its selectors name, regardless
+of their structure, pseudo-classes, and pseudo-elements. At-rules other
+than conditional group rules (such as ``@media``) are always kept.
+
+Stylesheets are parsed once per process, and the critical CSS is
+memoized by the set of the stylesheet's selector features that a page has,
+so pages with the same structure (such as the pages of a batch) share it.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from ...metrics import CACHE_REQUESTS
+
+__all__ = [
+    "DYNAMIC_FEATURES",
+    "Stylesheet",
+    "find_page_features",
+    "inline_critical_css",
+    "load_stylesheet",
+]
+
+DYNAMIC_FEATURES = frozenset({".pdfobject-container", ".pdfobject"})
+"""Selector features of the elements that the base theme's scripts add to
+pages (PDFObject's container and embed), which the critical CSS keeps
+because they size the page's layout.
+"""
+
+GROUP_AT_RULES = frozenset({"media", "supports", "document", "layer"})
+"""At-rules that group style rules, which are pruned like style rules."""
+
+MAX_MEMOIZED = 256
+"""Maximum number of critical stylesheets that each stylesheet memoizes."""
+
+_PSEUDO_PATTERN = re.compile(r"::?[-\w]+")
+_ATTRIBUTE_PATTERN = re.compile(r"\[\s*(?:[-\w]*\|)?([-\w]+)[^\]]*\]")
+_FEATURE_PATTERN = re.compile(
+    r"(?P<kind>[.#]?)(?P<name>-?[_a-zA-Z][-\w]*)|(?P<other>.)"
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@dataclass
+class _StyleRule:
+    selectors: List[Tuple[str, FrozenSet[str]]]
+    """The rule's selectors, with the features that each requires."""
+
+    declarations: str
+
+
+@dataclass
+class _GroupRule:
+    prelude: str
+    rules: List[_Rule]
+
+
+@dataclass
+class _OpaqueRule:
+    text: str
+
+
+_Rule = Union[_StyleRule, _GroupRule, _OpaqueRule]
+
+
+@dataclass
+class Stylesheet:
+    """A parsed stylesheet that can be pruned to the rules used by a page.
+
+    Create stylesheets with `Stylesheet.parse` or `load_stylesheet`.
+    """
+
+    rules: List[_Rule]
+    """The stylesheet's rules, in order."""
+
+    license_comments: List[str]
+    """Comments that start with ``/*!``, such as licenses, which are kept in
+    the critical CSS.
+    """
+
+    features: FrozenSet[str] = frozenset()
+    """The element types (``div``), classes (``.name``), IDs (``#name``),
+    and attributes (``[name``) that the stylesheet's selectors name.
+    """
+
+    _critical: Dict[FrozenSet[str], str] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def parse(cls, css: str) -> Stylesheet:
+        """Parse a stylesheet."""
+        license_comments = re.findall(r"/\*!.*?\*/", css, flags=re.DOTALL)
+        rules, _ = _parse_rules(_strip_comments(css), 0)
+        features: Set[str] = set()
+        _collect_features(rules, features)
+        return cls(
+            rules=rules,
+            license_comments=license_comments,
+            features=frozenset(features),
+        )
+
+    def critical_css(self, page_features: FrozenSet[str]) -> str:
+        """Get the minified rules that can match a page.
+
+        Parameters
+        ----------
+        page_features
+            The features of the page (see `find_page_features`).
+        """
+        key = (page_features | DYNAMIC_FEATURES) & self.features
+        with self._lock:
+            css = self._critical.get(key)
+        if css is not None:
+            CACHE_REQUESTS.inc(cache="critical-css", result="hit")
+            return css
+        CACHE_REQUESTS.inc(cache="critical-css", result="miss")
+        css = "".join(self.license_comments) + _serialize(self.rules, key)
+        with self._lock:
+            if len(self._critical) >= MAX_MEMOIZED:
+                self._critical.clear()
+            self._critical[key] = css
+        return css
+
+
+_stylesheets: Dict[Path, Tuple[Tuple[int, int], Stylesheet]] = {}
+_stylesheets_lock = threading.Lock()
+
+
+def load_stylesheet(path: Path) -> Stylesheet:
+    """Load and parse a stylesheet, reusing the stylesheet that was parsed
+    by this process if the file is unchanged.
+    """
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _stylesheets_lock:
+        cached = _stylesheets.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    stylesheet = Stylesheet.parse(path.read_text(encoding="utf-8"))
+    with _stylesheets_lock:
+        _stylesheets[path] = (version, stylesheet)
+    return stylesheet
+
+
+def find_page_features(html: str) -> FrozenSet[str]:
+    """Find the element types, classes, IDs, and attributes of a page, in
+    the notation of `Stylesheet.features`.
+    """
+    finder = _FeatureFinder()
+    finder.feed(html)
+    finder.close()
+    return frozenset(finder.features)
+
+
+def inline_critical_css(html: str, stylesheet_path: Path, href: str) -> str:
+    """Replace a page's link to a stylesheet with its critical CSS, and load
+    the full stylesheet asynchronously.
+
+    Parameters
+    ----------
+    html
+        The page's HTML.
+    stylesheet_path
+        Path of the stylesheet's file.
+    href
+        The stylesheet's URL in the page's ``<link rel="stylesheet">``
+        element.
+
+    Returns
+    -------
+    str
+        The page's HTML, which is unchanged if the page doesn't link to the
+        stylesheet.
+    """
+    link_pattern = re.compile(
+        r"<link\s+rel=\"stylesheet\"\s+href=\"" + re.escape(href) + r"\"\s*/?>"
+    )
+    match = link_pattern.search(html)
+    if match is None:
+        return html
+    stylesheet = load_stylesheet(stylesheet_path)
+    css = stylesheet.critical_css(find_page_features(html))
+    if "</style" in css.lower():
+        return html
+    replacement = (
+        f"<style>{css}</style>\n"
+        f'<link rel="preload" href="{href}" as="style" '
+        "onload=\"this.onload=null;this.rel='stylesheet'\">\n"
+        f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+    )
+    return html[: match.start()] + replacement + html[match.end() :]
+
+
+class _FeatureFinder(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.features: Set[str] = set()
+
+    def handle_starttag(
+        self, tag: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self.features.add(tag)
+        for name, value in attrs:
+            self.features.add(f"[{name}")
+            if value is None:
+                continue
+            if name == "class":
+                self.features.update(f".{c}" for c in value.split())
+            elif name == "id":
+                self.features.add(f"#{value}")
+
+
+def _strip_comments(css: str) -> str:
+    """Remove the comments of a stylesheet, outside strings."""
+    return re.sub(
+        r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|/\*.*?\*/",
+        lambda m: m.group(1) or "",
+        css,
+        flags=re.DOTALL,
+    )
+
+
+def _parse_rules(css: str, position: int) -> Tuple[List[_Rule], int]:
+    """Parse the rules of a stylesheet or group rule, up to the end of the
+    stylesheet or the block's closing brace.
+    """
+    rules: List[_Rule] = []
+    while True:
+        prelude, position, terminator = _read_prelude(css, position)
+        if terminator in ("", "}"):
+            return rules, position
+        if terminator == ";":
+            # A statement at-rule, such as @import or @charset
+            if prelude:
+                rules.append(_OpaqueRule(f"{prelude};"))
+            continue
+        at_rule = re.match(r"@([-\w]+)", prelude)
+        if at_rule is not None and at_rule.group(1).lower() in GROUP_AT_RULES:
+            nested, position = _parse_rules(css, position)
+            rules.append(_GroupRule(prelude, nested))
+            continue
+        block_end = _find_block_end(css, position)
+        block = _minify(css[position:block_end])
+        position = block_end + 1
+        if at_rule is not None:
+            rules.append(_OpaqueRule(f"{prelude}{{{block}}}"))
+        else:
+            selectors = [
+                (selector, _selector_features(selector))
+                for selector in _split_selectors(prelude)
+            ]
+            rules.append(_StyleRule(selectors, block))
+
+
+def _read_prelude(css: str, position: int) -> Tuple[str, int, str]:
+    """Read a rule's prelude, returning it with the position after its
+    terminator (``{``, ``;``, or ``}``), and the terminator.
+    """
+    start = position
+    depth = 0
+    while position < len(css):
+        char = css[position]
+        if char in "\"'":
+            position = _skip_string(css, position)
+            continue
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth == 0 and char in "{;}":
+            return _minify(css[start:position]), position + 1, char
+        position += 1
+    return _minify(css[start:]), position, ""
+
+
+def _find_block_end(css: str, position: int) -> int:
+    """Find the closing brace of a block that starts at a position."""
+    depth = 1
+    while position < len(css):
+        char = css[position]
+        if char in "\"'":
+            position = _skip_string(css, position)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    return position
+
+
+def _skip_string(css: str, position: int) -> int:
+    quote = css[position]
+    position += 1
+    while position < len(css) and css[position] != quote:
+        position += 2 if css[position] == "\\" else 1
+    return position + 1
+
+
+def _minify(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    selectors: List[str] = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(prelude):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _selector_features(selector: str) -> FrozenSet[str]:
+    """Find the features that a selector requires of a page.
+
+    The arguments of functional pseudo-classes (such as ``:not()``) are
+    ignored, and selectors with escapes require nothing, so that selectors
+    are only ever pruned if they can't match.
+    """
+    if "\\" in selector:
+        return frozenset()
+    # Remove the arguments of functional pseudo-classes, innermost first
+    previous = None
+    while previous != selector:
+        previous = selector
+        selector = re.sub(r"\([^()]*\)", "", selector)
+    features = {
+        f"[{m.group(1)}" for m in _ATTRIBUTE_PATTERN.finditer(selector)
+    }
+    selector = _ATTRIBUTE_PATTERN.sub(" ", selector)
+    selector = _PSEUDO_PATTERN.sub(" ", selector)
+    for match in _FEATURE_PATTERN.finditer(selector):
+        name = match.group("name")
+        if name is None:
+            continue
+        kind = match.group("kind")
+        features.add(f"{kind}{name}" if kind else name.lower())
+    return frozenset(features)
+
+
+def _collect_features(rules: List[_Rule], features: Set[str]) -> None:
+    for rule in rules:
+        if isinstance(rule, _StyleRule):
+            for _, selector_features in rule.selectors:
+                features.update(selector_features)
+        elif isinstance(rule, _GroupRule):
+            _collect_features(rule.rules, features)
+
+
+def _serialize(rules: List[_Rule], page_features: FrozenSet[str]) -> str:
+    """Serialize the rules that can match a page."""
+    parts: List[str] = []
+    for rule in rules:
+        if isinstance(rule, _StyleRule):
+            selectors = [
+                selector
+                for selector, selector_features in rule.selectors
+                if selector_features <= page_features
+            ]
+            if selectors:
+                parts.append(f"{','.join(selectors)}{{{rule.declarations}}}")
+        elif isinstance(rule, _GroupRule):
+            nested = _serialize(rule.rules, page_features)
+            if nested:
+                parts.append(f"{rule.prelude}{{{nested}}}")
+        else:
+            parts.append(rule.text)
+    return "".join(parts)
@@ -0,0 +1,289 @@
+"""Responsive variants of the theme's images.
+
+Images such as the SPHEREx logo are displayed much smaller than their
+files. `optimize_image` resizes an image to its display width for 1x and 2x
+pixel densities, in WebP and PNG formats, so browsers download the smallest
+variant they can display sharply (see `ResponsiveImage`).
+
+Variants require the Pillow package (the ``images`` extra), and WebP
+variants require a Pillow build with WebP support (see
+`available_formats`). They're cached
+in the ``images`` on-disk cache (see `spherexlander.cache`) and in memory
+by the SHA-256 hash of the image, so the builds of a batch encode each
+variant once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from logging import getLogger
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ...metrics import CACHE_REQUESTS
+
+__all__ = [
+    "ImageFormat",
+    "ImageVariant",
+    "ResponsiveImage",
+    "available_formats",
+    "optimize_image",
+    "pillow_available",
+]
+
+logger = getLogger(__name__)
+
+CACHE_FORMAT_VERSION = "1"
+"""Version of the encoding settings, which is part of the cache keys."""
+
+DENSITIES = (1, 2)
+"""Pixel densities of the variants."""
+
+WEBP_QUALITY = 90
+"""Quality of the lossy WebP variants of images without a palette, from 0 to
+100. Palette images get lossless WebP variants.
+"""
+
+
+class ImageFormat(str, Enum):
+    """A format of image variants, in order of preference."""
+
+    webp = "webp"
+    png = "png"
+
+    @property
+    def mimetype(self) -> str:
+        """The format's media type."""
+        return f"image/{self.value}"
+
+
+@dataclass
+class ImageVariant:
+    """A variant of an image for a pixel density and format."""
+
+    name: str
+    """Path of the variant in the site."""
+
+    density: int
+    """Pixel density, such as 2 for a variant with twice the pixels of the
+    display size.
+    """
+
+    format: ImageFormat
+    """Format of the variant."""
+
+
+@dataclass
+class ResponsiveImage:
+    """An image with variants for pixel densities and formats."""
+
+    width: int
+    """Display width, in CSS pixels."""
+
+    height: int
+    """Display height, in CSS pixels."""
+
+    variants: List[ImageVariant]
+    """The variants, by format and then by density."""
+
+    @property
+    def src(self) -> str:
+        """The 1x PNG variant, for browsers without ``srcset`` support."""
+        return self.variants_for(ImageFormat.png)[0].name
+
+    def srcset(self, image_format: ImageFormat = ImageFormat.png) -> str:
+        """The ``srcset`` attribute of a format's variants."""
+        return ", ".join(
+            f"{v.name} {v.density}x" for v in self.variants_for(image_format)
+        )
+
+    @property
+    def sources(self) -> List[Tuple[str, str]]:
+        """The media types and ``srcset`` attributes of the ``<source>``
+        elements of a ``<picture>``, for the formats other than PNG.
+        """
+        return [
+            (image_format.mimetype, self.srcset(image_format))
+            for image_format in ImageFormat
+            if image_format != ImageFormat.png
+            and self.variants_for(image_format)
+        ]
+
+    def variants_for(self, image_format: ImageFormat) -> List[ImageVariant]:
+        """The variants of a format, by density."""
+        return [v for v in self.variants if v.format == image_format]
+
+
+_sources: Dict[Path, Tuple[Tuple[int, int], str, Tuple[int, int]]] = {}
+"""The hashes and pixel sizes of the images that were read by this process,
+keyed by path, with the modification times and sizes of their files.
+"""
+
+_encoded: Dict[Tuple[str, int, ImageFormat], bytes] = {}
+"""Variants encoded or read from the cache by this process, keyed by their
+image's hash, pixel width, and format.
+"""
+
+_lock = threading.Lock()
+
+
+def pillow_available() -> bool:
+    """Whether the Pillow package is installed."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats() -> List[ImageFormat]:
+    """The formats that variants can be encoded in: PNG, and WebP if Pillow
+    was built with WebP support.
+
+    Raises
+    ------
+    ImportError
+        Raised if Pillow isn't installed.
+    """
+    from PIL import features
+
+    formats = [ImageFormat.png]
+    if features.check("webp"):
+        formats.insert(0, ImageFormat.webp)
+    return formats
+
+
+def optimize_image(
+    source: Path,
+    output_dir: Path,
+    relative_path: PurePosixPath,
+    width: int,
+    *,
+    formats: Sequence[ImageFormat] = tuple(ImageFormat),
+) -> ResponsiveImage:
+    """Write the variants of an image into a site.
+
+    Parameters
+    ----------
+    source
+        The image's file.
+    output_dir
+        The site's output directory.
+    relative_path
+        Path of the image in the site. Variants are named after it, such as
+        ``spherex-logo-240w.webp`` for ``spherex-logo.png``.
+    width
+        Display width of the image, in CSS pixels.
+    formats
+        Formats of the variants. PNG variants are always written.
+
+    Returns
+    -------
+    ResponsiveImage
+        The image's variants. Images aren't enlarged, so densities whose
+        width would be larger than the image's are skipped.
+
+    Raises
+    ------
+    ImportError
+        Raised if Pillow isn't installed.
+    """
+    from ...incremental import write_if_changed
+
+    sha256, (pixel_width, pixel_height) = _read_source(source)
+    height = round(width * pixel_height / pixel_width)
+    formats = [f for f in ImageFormat if f in formats or f == ImageFormat.png]
+    variants: List[ImageVariant] = []
+    for image_format in formats:
+        for density in DENSITIES:
+            variant_width = width * density
+            if variant_width > pixel_width and density > 1:
+                continue
+            variant_width = min(variant_width, pixel_width)
+            name = relative_path.with_name(
+                f"{relative_path.stem}-{variant_width}w.{image_format.value}"
+            ).as_posix()
+            data = _encode(source, sha256, variant_width, image_format)
+            if write_if_changed(output_dir.joinpath(name), data):
+                logger.debug("Wrote %s (%d bytes)", name, len(data))
+            variants.append(ImageVariant(name, density, image_format))
+    return ResponsiveImage(width=width, height=height, variants=variants)
+
+
+def _read_source(path: Path) -> Tuple[str, Tuple[int, int]]:
+    """Get the hash and pixel size of an image, reusing them while the file
+    is unchanged.
+    """
+    from PIL import Image
+
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _sources.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    data = path.read_bytes()
+    with Image.open(io.BytesIO(data)) as image:
+        size = image.size
+    sha256 = hashlib.sha256(data).hexdigest()
+    with _lock:
+        _sources[path] = (version, sha256, size)
+    return sha256, size
+
+
+def _encode(
+    source: Path, sha256: str, width: int, image_format: ImageFormat
+) -> bytes:
+    """Encode a variant of an image, reusing it from the caches."""
+    from ...cache import open_cache
+
+    memory_key = (sha256, width, image_format)
+    with _lock:
+        data = _encoded.get(memory_key)
+    if data is not None:
+        CACHE_REQUESTS.inc(cache="images-memory", result="hit")
+        return data
+    CACHE_REQUESTS.inc(cache="images-memory", result="miss")
+
+    cache = open_cache("images")
+    cache_key: Optional[str] = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            CACHE_FORMAT_VERSION, sha256, str(width), image_format.value
+        )
+        data = cache.get(cache_key)
+    if data is None:
+        data = _resize(source, width, image_format)
+        if cache is not None and cache_key is not None:
+            cache.set(cache_key, data)
+    with _lock:
+        _encoded[memory_key] = data
+    return data
+
+
+def _resize(source: Path, width: int, image_format: ImageFormat) -> bytes:
+    from PIL import Image
+
+    with Image.open(source) as source_image:
+        palette = source_image.mode == "P"
+        image = source_image.convert("RGBA")
+    height = max(1, round(width * image.height / image.width))
+    if (width, height) != image.size:
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+    if palette:
+        # Palette images, such as logos, are smallest as palette PNGs and
+        # lossless WebPs
+        image = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    output = io.BytesIO()
+    if image_format == ImageFormat.webp:
+        if palette:
+            image.save(output, "WEBP", lossless=True, quality=100, method=6)
+        else:
+            image.save(output, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(output, "PNG", optimize=True)
+    return output.getvalue()
@@ -1,14 +1,82 @@
 from __future__ import annotations
 
-from pathlib import Path
+from logging import getLogger
+from pathlib import Path, PurePath, PurePosixPath
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, List, Optional
 
+import jinja2
 from lander.ext.theme import ThemePlugin
 
+if TYPE_CHECKING:
+    from lander.ext.parser import DocumentMetadata
+    from lander.settings import BuildSettings
+
+    from ...attachments import DownloadRecord
+    from ...placement import PlacedFile, PlacementStrategy
+    from .images import ResponsiveImage
+
 __all__ = ["SpherexTheme"]
 
+logger = getLogger(__name__)
+
+BYTECODE_CACHE_NAME = "jinja"
+"""Name of the Jinja bytecode cache's directory in the cache directory."""
+
+STYLESHEET_NAME = "spherex.css"
+"""Name of the theme's stylesheet in the site directory."""
+
+RESPONSIVE_IMAGES = {"spherex-logo.png": 120}
+"""Display widths, in CSS pixels, of the images in the site directory that
+are replaced by responsive variants (see
+`spherexlander.themes.spherex.images`).
+"""
+
 
 class SpherexTheme(ThemePlugin):
-    """A theme plugin for SPHEREx PDF landing pages."""
+    """A theme plugin for SPHEREx PDF landing pages.
+
+    Lander imports every theme plugin when it starts, so the modules that
+    are only needed to build a site are imported by the methods that use
+    them.
+    """
+
+    _shared_jinja_env: ClassVar[Optional[jinja2.Environment]] = None
+    """The Jinja environment shared by theme instances in this process."""
+
+    _outputs: List[str]
+    """Paths of the files in the site being built, relative to the output
+    directory.
+    """
+
+    _placement: PlacementStrategy
+    """How files are placed into the site being built."""
+
+    _inline_critical_css: bool
+    """Whether the critical CSS of the stylesheet is inlined into pages."""
+
+    _placed: Dict[Path, PlacedFile]
+    """The files that were placed into the site being built, keyed by their
+    source paths.
+    """
+
+    _downloads: List[DownloadRecord]
+    """Records of the PDF and attachments that were placed into the site
+    being built, in that order.
+    """
+
+    _images: Dict[str, ResponsiveImage]
+    """The responsive variants of the images of the site being built, keyed
+    by the images' paths in the site directory.
+    """
+
+    def __init__(
+        self, *, metadata: DocumentMetadata, settings: BuildSettings
+    ) -> None:
+        # Templates can be rendered before a site is built, without
+        # downloads or image variants
+        self._downloads = []
+        self._images = {}
+        super().__init__(metadata=metadata, settings=settings)
 
     @property
     def name(self) -> str:
@@ -31,3 +99,379 @@ class SpherexTheme(ThemePlugin):
         files in the site.
         """
         return Path(__file__).parent.joinpath("templates")
+
+    def create_jinja_env(self) -> jinja2.Environment:
+        """Create the Jinja environment, or reuse the environment that was
+        created for an earlier instance of the theme in this process.
+
+        Reusing the environment reuses its compiled templates when many
+        sites are built by the same process, as in a batch build. Templates
+        don't depend on the theme instance, since the document metadata and
+        settings are passed to each template as its rendering context.
+
+        Compiled templates are also stored in a bytecode cache in the
+        configured cache directory (see `spherexlander.config.PluginConfig`)
+        so that other processes don't compile them again. Jinja checks the
+        checksum of a template's source before using its cached bytecode, so
+        edited templates are compiled again.
+
+        In addition to Lander's filters, templates can use the ``badge``,
+        ``pipeline_level_color``, and ``difficulty_color`` functions (see
+        `spherexlander.themes.spherex.badges`).
+        """
+        from .badges import badge, difficulty_color, pipeline_level_color
+
+        if SpherexTheme._shared_jinja_env is None:
+            env = super().create_jinja_env()
+            env.bytecode_cache = _create_bytecode_cache()
+            env.globals["badge"] = badge
+            env.globals["pipeline_level_color"] = pipeline_level_color
+            env.globals["difficulty_color"] = difficulty_color
+            SpherexTheme._shared_jinja_env = env
+        return SpherexTheme._shared_jinja_env
+
+    @classmethod
+    def precompile_templates(cls) -> List[str]:
+        """Compile the site and included templates of the theme and its base
+        themes into the bytecode cache.
+
+        Builds compile templates into the bytecode cache as they use them,
+        but precompiling the templates (for example, when a CI image is
+        created) removes that cost from the first builds.
+
+        Returns
+        -------
+        list of str
+            Names of the compiled templates.
+        """
+        from lander.ext.parser import DocumentMetadata
+        from lander.settings import BuildSettings
+
+        # Templates don't depend on the document, so the theme is
+        # instantiated without metadata and settings.
+        theme = cls(
+            metadata=DocumentMetadata.construct(),
+            settings=BuildSettings.construct(),
+        )
+        env = theme.jinja_env
+        names: List[str] = []
+        current: Optional[ThemePlugin] = theme
+        while current is not None:
+            site_dir = current.site_dir
+            for path in sorted(site_dir.rglob("*.jinja")):
+                relative_path = path.relative_to(site_dir).as_posix()
+                names.append(f"${current.name}/{relative_path}")
+            templates_dir = current.templates_dir
+            if templates_dir.is_dir():
+                for path in sorted(templates_dir.rglob("*.jinja")):
+                    names.append(path.relative_to(templates_dir).as_posix())
+            current = current.base_theme
+        names = list(dict.fromkeys(names))
+        for name in names:
+            env.get_template(name)
+        return names
+
+    def build_site(self, output_dir: Optional[Path] = None) -> None:
+        """Build the landing page site into the output directory.
+
+        Unlike the base implementation, files that already have the same
+        content in the output directory are not rewritten, so that their
+        modification times are preserved. The build is recorded in a manifest
+        (see `spherexlander.incremental`) so that a later build can be
+        skipped if the document's inputs are unchanged. A metadata sidecar is
+        also written so that the site can be rendered again without parsing
+        the document (see `spherexlander.sidecar`). If a catalogue is
+        configured, the document's metadata is added to it (see
+        `spherexlander.catalogue`). The PDF, attachments, and theme assets
+        are placed with the configured strategy (see
+        `spherexlander.placement`), and the PDF and attachments are placed
+        and hashed concurrently (see `spherexlander.attachments`). The
+        critical CSS of the theme's stylesheet is inlined into pages, the
+        theme's images are replaced by responsive variants, and the site's
+        text files are precompressed (see `run_post_build`).
+
+        If tracing is enabled, the phases of the build are added to the
+        document's trace, which is then written next to the output directory
+        (see `spherexlander.tracing`). The durations of rendering, copying,
+        and precompressing and the bytes of downloads written are added to
+        the process's metrics (see `spherexlander.metrics`).
+        """
+        from ...catalogue import record_metadata
+        from ...config import load_config
+        from ...incremental import record_build
+        from ...tracing import active_tracer, finish_trace, span, start_trace
+
+        if output_dir is None:
+            output_dir = self.settings.output_dir
+        if active_tracer() is None:
+            # The site is built without a parser, such as from saved metadata
+            start_trace(str(self.settings.source_path))
+
+        with span("build_site", "render", theme=self.name):
+            output_dir.mkdir(parents=True, exist_ok=True)
+            self._outputs = []
+            config = load_config()
+            self._placement = config.placement
+            self._inline_critical_css = config.inline_critical_css
+            self._placed = {}
+            self._downloads = []
+            self._images = {}
+
+            # The downloads are placed first, so that the pages show the
+            # sizes of the files that were placed.
+            self._place_downloads(output_dir)
+            if config.optimize_images:
+                self._optimize_images(output_dir)
+
+            with span("site_inventory", "render"):
+                site_inventory = self._build_site_inventory()
+            for relative_path, file_path in site_inventory.items():
+                if PurePosixPath(relative_path).as_posix() in self._images:
+                    continue
+                if file_path.suffix == ".jinja":
+                    self._render_path(file_path, relative_path, output_dir)
+                else:
+                    self._copy_path(file_path, relative_path, output_dir)
+
+            with span("write_metadata", "render"):
+                self._write_metadata(output_dir)
+            with span("run_post_build", "render"):
+                self.run_post_build(output_dir)
+            with span("record_build", "render"):
+                record_build(
+                    self.settings,
+                    output_dir,
+                    self._outputs,
+                    placed=self._placed,
+                )
+            with span("record_catalogue", "render"):
+                record_metadata(self.metadata, self.settings)
+
+        trace_path = finish_trace(output_dir)
+        if trace_path is not None:
+            logger.info("Wrote the build trace to %s", trace_path)
+
+    def run_post_build(self, output_dir: Path) -> None:
+        """Write precompressed variants of the site's text files, such as
+        ``index.html.gz`` (see `spherexlander.compression`).
+
+        If precompression is disabled, existing variants are removed, since
+        they would be stale. The PDF and attachments aren't compressed: they
+        are served as they were provided, and variants that earlier builds
+        wrote of them are removed.
+        """
+        from ...compression import Encoding, precompress_site, remove_variants
+        from ...config import load_config
+        from ...metrics import PHASE_SECONDS
+
+        config = load_config()
+        downloads = {record.name for record in self._downloads}
+        remove_variants(
+            output_dir,
+            [
+                name
+                for name in sorted(downloads)
+                if not any(name + e.suffix in downloads for e in Encoding)
+            ],
+        )
+        outputs = [path for path in self._outputs if path not in downloads]
+        if not config.precompress:
+            remove_variants(output_dir, outputs)
+            return
+        with PHASE_SECONDS.time(phase="compress"):
+            self._outputs.extend(
+                precompress_site(
+                    output_dir,
+                    outputs,
+                    max_workers=config.precompress_threads,
+                )
+            )
+
+    def _place_downloads(self, output_dir: Path) -> None:
+        """Place the PDF and attachments into the output directory
+        concurrently, unless they are unchanged, and record their sizes and
+        hashes for the templates.
+        """
+        from ...attachments import place_downloads
+        from ...incremental import BuildManifest
+        from ...metrics import DOWNLOAD_BYTES, PHASE_SECONDS
+
+        downloadables = [self.settings.pdf, *self.settings.attachments]
+        previous = BuildManifest.read(output_dir)
+        with PHASE_SECONDS.time(phase="copy"):
+            placed_downloads = place_downloads(
+                downloadables,
+                output_dir,
+                strategy=self._placement,
+                known_files=previous.files if previous else None,
+            )
+        self._downloads = []
+        for downloadable, (record, placed) in zip(
+            downloadables, placed_downloads
+        ):
+            downloadable.size = record.size
+            if placed.placed:
+                self.logger.debug(
+                    "Placed %s (%s)", downloadable.name, placed.method.value
+                )
+                DOWNLOAD_BYTES.inc(
+                    placed.size,
+                    kind=(
+                        "pdf"
+                        if downloadable is self.settings.pdf
+                        else "attachment"
+                    ),
+                )
+            self._downloads.append(record)
+            self._placed[downloadable.file_path] = placed
+            self._outputs.append(downloadable.name)
+
+    def create_jinja_context(
+        self, *, path: PurePosixPath, template_name: str
+    ) -> Dict[str, Any]:
+        """Create the context for rendering a Jinja template.
+
+        The ``pdf`` and ``attachments`` variables are the records of the
+        files that were placed into the site (see
+        `spherexlander.attachments.DownloadRecord`), which also have the
+        files' SHA-256 hashes. The ``images`` variable has the responsive
+        variants of the theme's images, keyed by their paths (see
+        `spherexlander.themes.spherex.images.ResponsiveImage`).
+        """
+        context = super().create_jinja_context(
+            path=path, template_name=template_name
+        )
+        if self._downloads:
+            context["pdf"] = self._downloads[0]
+            context["attachments"] = self._downloads[1:]
+        context["images"] = self._images
+        return context
+
+    def _optimize_images(self, output_dir: Path) -> None:
+        """Write the responsive variants of the theme's images into the
+        output directory, in place of the images, if Pillow is installed.
+
+        WebP variants are only written if Pillow supports WebP.
+        """
+        from ...metrics import PHASE_SECONDS
+        from ...tracing import span
+        from .images import available_formats, optimize_image, pillow_available
+
+        if not pillow_available():
+            self.logger.debug("Pillow isn't installed; images are copied")
+            return
+        formats = available_formats()
+        for name, width in RESPONSIVE_IMAGES.items():
+            with span(
+                "optimize_image", "copy", image=name
+            ), PHASE_SECONDS.time(phase="copy"):
+                image = optimize_image(
+                    self.site_dir.joinpath(name),
+                    output_dir,
+                    PurePosixPath(name),
+                    width,
+                    formats=formats,
+                )
+            self._images[name] = image
+            self._outputs.extend(v.name for v in image.variants)
+
+    def _copy_path(
+        self, site_path: Path, relative_path: PurePath, output_dir: Path
+    ) -> None:
+        """Place a path in the theme's site directory into the same relative
+        path in the output directory, unless it is unchanged.
+        """
+        from ...metrics import PHASE_SECONDS
+        from ...placement import place_file
+
+        output_path = output_dir.joinpath(relative_path)
+        with PHASE_SECONDS.time(phase="copy"):
+            placed = place_file(site_path, output_path, self._placement)
+        if placed.placed:
+            self.logger.debug("Copied %s to %s", relative_path, output_path)
+        self._outputs.append(PurePosixPath(relative_path).as_posix())
+
+    def _render_path(
+        self, site_path: Path, relative_path: PurePath, output_dir: Path
+    ) -> None:
+        """Render a Jinja2 template and write it to the same relative path
+        in the output directory (without the ``.jinja`` extension), unless
+        the rendered content is unchanged.
+        """
+        from ...incremental import write_if_changed
+        from ...metrics import PHASE_SECONDS
+        from ...tracing import span
+
+        relative_output_path = relative_path.with_suffix("").with_suffix(
+            "".join(site_path.suffixes[:-1])
+        )
+        output_path = output_dir.joinpath(relative_output_path)
+
+        template_name = f"${self.name}/{relative_path!s}"
+        with span("load_template", "render", template=template_name):
+            jinja_template = self.jinja_env.get_template(template_name)
+        context = self.create_jinja_context(
+            path=PurePosixPath(relative_output_path),
+            template_name=template_name,
+        )
+        with span(
+            "render_template", "render", template=template_name
+        ), PHASE_SECONDS.time(phase="render"):
+            content = jinja_template.render(**context)
+            if (
+                self._inline_critical_css
+                and relative_output_path.suffix == ".html"
+            ):
+                content = self._inline_stylesheet(content)
+        if write_if_changed(output_path, content.encode("utf-8")):
+            self.logger.debug("Rendered %s", relative_output_path)
+        self._outputs.append(PurePosixPath(relative_output_path).as_posix())
+
+    def _inline_stylesheet(self, html: str) -> str:
+        """Inline the critical CSS of the theme's stylesheet into a page (see
+        `spherexlander.themes.spherex.criticalcss`).
+        """
+        from ...tracing import span
+        from .criticalcss import inline_critical_css
+
+        with span("inline_critical_css", "render"):
+            return inline_critical_css(
+                html, self.site_dir.joinpath(STYLESHEET_NAME), STYLESHEET_NAME
+            )
+
+    def _write_metadata(self, output_dir: Path) -> None:
+        """Write the metadata as JSON, along with the metadata sidecar that
+        the site can be rendered again from (see `spherexlander.sidecar`).
+        """
+        from ...incremental import write_if_changed
+        from ...sidecar import MetadataSidecar
+
+        metadata_json = self.metadata.json()
+        write_if_changed(
+            output_dir.joinpath("metadata.json"),
+            metadata_json.encode("utf-8"),
+        )
+        self._outputs.append("metadata.json")
+
+        sidecar = MetadataSidecar.create(
+            self.metadata, self.settings, metadata_json=metadata_json
+        )
+        sidecar.write(output_dir)
+
+
+def _create_bytecode_cache() -> Optional[jinja2.BytecodeCache]:
+    """Create the Jinja bytecode cache in the configured cache directory, or
+    return `None` if caching is disabled.
+    """
+    from ...config import load_config
+
+    config = load_config()
+    if not config.cache_enabled:
+        return None
+    directory = config.cache_dir.joinpath(BYTECODE_CACHE_NAME)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        logger.warning("Could not create the bytecode cache %s", directory)
+        return None
+    return jinja2.FileSystemBytecodeCache(str(directory))
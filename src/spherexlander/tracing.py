@@ -0,0 +1,345 @@
+"""Opt-in tracing of the phases of a document build.
+
+When tracing is enabled (set ``SPHEREX_LANDER_TRACE=true``, see
+`spherexlander.config.PluginConfig`), the parser starts a `Tracer` for each
+document, and the theme writes the trace next to the built site once the
+site is built. Each phase of the build (reading and normalizing the TeX
+source, each ``_parse_*`` method, pandoc conversions, validation of the
+metadata model, rendering each template, and copying the PDF) is recorded
+with its wall time, the number of subprocesses it started, and its peak
+memory allocation (measured with `tracemalloc`).
+
+Traces are written in the Chrome trace event format, which can be opened
+with https://ui.perfetto.dev or ``chrome://tracing``.
+
+Instrumented code calls `span`, which returns a shared no-op context
+manager when no trace is active, so tracing costs a function call per
+phase when it is disabled.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    from .config import PluginConfig
+
+__all__ = [
+    "TRACE_SUFFIX",
+    "Tracer",
+    "active_tracer",
+    "finish_trace",
+    "span",
+    "start_trace",
+    "trace_path",
+]
+
+TRACE_SUFFIX = ".trace.json"
+"""Suffix of a trace file's name, which is otherwise the name of the site's
+output directory.
+"""
+
+T = TypeVar("T")
+
+_active_tracer: Optional[Tracer] = None
+"""The tracer of the document that is being built in this process."""
+
+_subprocess_count = 0
+"""Number of subprocesses started since the audit hook was installed."""
+
+_audit_hook_installed = False
+
+_NULL_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class _Span:
+    """An open span, which accumulates the peak memory of its children."""
+
+    __slots__ = ("start_memory", "peak_memory")
+
+    def __init__(self, start_memory: int) -> None:
+        self.start_memory = start_memory
+        self.peak_memory = start_memory
+
+
+class Tracer:
+    """A recorder of trace events for the build of one document.
+
+    Parameters
+    ----------
+    name
+        Name of the traced process, such as the document's source file.
+    trace_memory
+        Whether to measure peak memory allocations with `tracemalloc`.
+        Tracing memory allocations slows down the build.
+    """
+
+    def __init__(self, name: str, *, trace_memory: bool = True) -> None:
+        self.name = name
+        self.events: List[Dict[str, Any]] = []
+        self._pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+        self._stack: List[_Span] = []
+        self._tracemalloc: Any = None
+        self._started_tracemalloc = False
+        if trace_memory:
+            import tracemalloc
+
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        _install_audit_hook()
+
+    def now(self) -> float:
+        """Time since the tracer was created, in microseconds."""
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    @contextmanager
+    def span(
+        self, name: str, category: str = "build", **args: Any
+    ) -> Iterator[None]:
+        """Record the time, subprocesses, and peak memory of a phase.
+
+        Parameters
+        ----------
+        name
+            Name of the phase, such as ``extract_metadata``.
+        category
+            Category of the phase, such as ``parse`` or ``render``.
+        **args
+            Additional details that are shown with the phase.
+        """
+        current = self._enter_memory()
+        subprocesses = _subprocess_count
+        start = self.now()
+        try:
+            yield
+        finally:
+            end = self.now()
+            args["subprocesses"] = _subprocess_count - subprocesses
+            if current is not None:
+                args["peak_memory_kb"] = round(
+                    (self._exit_memory(current) - current.start_memory) / 1024,
+                    1,
+                )
+            self.add_event(name, category, start, end, args)
+
+    def add_event(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Add a complete event, with start and end times in microseconds
+        (see `now`).
+        """
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start, 3),
+                "dur": round(end - start, 3),
+                "pid": self._pid,
+                "tid": threading.get_ident(),
+                "args": args or {},
+            }
+        )
+
+    def wrap(
+        self, func: Callable[..., T], name: str, category: str
+    ) -> Callable[..., T]:
+        """Wrap a function so that each call is recorded as a span."""
+
+        @wraps(func)
+        def traced(*args: Any, **kwargs: Any) -> T:
+            with self.span(name, category):
+                return func(*args, **kwargs)
+
+        return traced
+
+    def _enter_memory(self) -> Optional[_Span]:
+        if (
+            self._tracemalloc is None
+            or threading.current_thread() is not threading.main_thread()
+        ):
+            # Peaks of concurrent threads can't be attributed to a span.
+            return None
+        current, peak = self._tracemalloc.get_traced_memory()
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak_memory = max(parent.peak_memory, peak)
+        _reset_peak(self._tracemalloc)
+        opened = _Span(current)
+        self._stack.append(opened)
+        return opened
+
+    def _exit_memory(self, closed: _Span) -> int:
+        _, peak = self._tracemalloc.get_traced_memory()
+        closed.peak_memory = max(closed.peak_memory, peak)
+        self._stack.remove(closed)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak_memory = max(parent.peak_memory, closed.peak_memory)
+        _reset_peak(self._tracemalloc)
+        return closed.peak_memory
+
+    def to_json(self) -> Dict[str, Any]:
+        """Create the Chrome trace event format data of the trace."""
+        metadata = {
+            "name": "process_name",
+            "ph": "M",
+            "pid": self._pid,
+            "args": {"name": self.name},
+        }
+        return {
+            "traceEvents": [metadata, *self.events],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, path: Path) -> None:
+        """Write the trace to a file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(), indent=1))
+
+    def close(self) -> None:
+        """Stop measuring memory, if the tracer started `tracemalloc`."""
+        if self._started_tracemalloc:
+            self._tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+def _reset_peak(tracemalloc: Any) -> None:
+    # tracemalloc.reset_peak is new in Python 3.9. Without it, peaks are
+    # the peak since the tracer started.
+    reset_peak = getattr(tracemalloc, "reset_peak", None)
+    if reset_peak is not None:
+        reset_peak()
+
+
+def _install_audit_hook() -> None:
+    """Count started subprocesses, such as pandoc, with an audit hook.
+
+    Audit hooks can't be removed, so the hook is only installed once a
+    tracer is created.
+    """
+    global _audit_hook_installed
+    if _audit_hook_installed:
+        return
+
+    def count_subprocesses(event: str, args: Any) -> None:
+        global _subprocess_count
+        if event == "subprocess.Popen":
+            _subprocess_count += 1
+
+    sys.addaudithook(count_subprocesses)
+    _audit_hook_installed = True
+
+
+def span(name: str, category: str = "build", **args: Any) -> Any:
+    """Record a phase of the build in the active trace, if there is one.
+
+    Use this function as a context manager::
+
+        with span("pandoc", "convert"):
+            ...
+
+    Returns
+    -------
+    context manager
+        The span, or a no-op context manager if no trace is active.
+    """
+    tracer = _active_tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, **args)
+
+
+def active_tracer() -> Optional[Tracer]:
+    """Get the tracer of the document that is being built, if tracing is
+    enabled.
+    """
+    return _active_tracer
+
+
+def start_trace(
+    name: str, *, config: Optional[PluginConfig] = None
+) -> Optional[Tracer]:
+    """Start tracing the build of a document, if tracing is enabled.
+
+    A trace that was started for an earlier document, but never finished
+    (for example, because its build failed), is discarded.
+
+    Parameters
+    ----------
+    name
+        Name of the document, such as the path of its source file.
+    config
+        The plugin configuration, if it is already loaded.
+
+    Returns
+    -------
+    Tracer or None
+        The active tracer, or `None` if tracing is disabled.
+    """
+    global _active_tracer
+    from .config import load_config
+
+    if _active_tracer is not None:
+        _active_tracer.close()
+        _active_tracer = None
+    if config is None:
+        config = load_config()
+    if config.trace:
+        _active_tracer = Tracer(name, trace_memory=config.trace_memory)
+    return _active_tracer
+
+
+def finish_trace(output_dir: Path) -> Optional[Path]:
+    """Write the active trace next to a built site and stop tracing.
+
+    Returns
+    -------
+    pathlib.Path or None
+        Path of the trace file (see `trace_path`), or `None` if no trace is
+        active.
+    """
+    global _active_tracer
+    tracer = _active_tracer
+    if tracer is None:
+        return None
+    _active_tracer = None
+    tracer.close()
+    path = trace_path(output_dir)
+    tracer.write(path)
+    return path
+
+
+def trace_path(output_dir: Path) -> Path:
+    """Get the path of a site's trace file.
+
+    The trace is written next to the site's output directory, rather than in
+    it, so that it isn't published with the site.
+    """
+    output_dir = Path(os.path.abspath(output_dir))
+    return output_dir.with_name(f"{output_dir.name}{TRACE_SUFFIX}")
@@ -0,0 +1,542 @@
+"""Watch mode, which rebuilds a document's landing page as its TeX source and
+PDF change.
+
+A `WatchSession` builds a document's site once, and then rebuilds it for the
+files that changed. Each rebuild runs in the same process, so it reuses the
+process's caches: the include cache only reads the TeX files that changed
+(see `spherexlander.parsers.texinclude`), TeX spans are converted from the
+on-disk conversion cache instead of by pandoc, and the theme's Jinja
+environment, stylesheet, and image variants are already loaded. If only the
+PDF changed, the TeX source isn't parsed again; only the PDF is inspected
+(see `spherexlander.parsers.spherexparser.SpherexParser.update_pdf`).
+Unchanged files in the site aren't rewritten (see
+`spherexlander.incremental`), so a rebuild after a preamble edit writes
+little more than ``index.html``.
+
+The session watches the root TeX file, the files it inputs (from the
+process's include graph), and the PDF. `create_watcher` watches them with
+Linux's inotify API, or by polling their modification times on other
+platforms.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import traceback
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from lander.ext.parser import Parser
+
+    from .batch import BatchJob
+
+__all__ = [
+    "InotifyWatcher",
+    "PollingWatcher",
+    "Rebuild",
+    "WatchSession",
+    "Watcher",
+    "create_watcher",
+    "inotify_available",
+]
+
+logger = getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+"""Default interval, in seconds, between the checks of a `PollingWatcher`."""
+
+SETTLE_TIME = 0.02
+"""Time, in seconds, that a watcher waits for more changes after a change,
+so that files that are saved together (such as by ``latexmk``) are rebuilt
+once.
+"""
+
+# Constants from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_WATCH_MASK = (
+    _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+_EVENT_BUFFER_SIZE = 64 * 1024
+
+
+class Watcher(ABC):
+    """Base class of the watchers of a set of files.
+
+    Watchers are context managers that release their resources when they
+    are closed.
+    """
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        self._paths: Set[Path] = set()
+        self.set_paths(paths)
+
+    @property
+    def paths(self) -> Set[Path]:
+        """The watched files, as absolute paths."""
+        return set(self._paths)
+
+    def set_paths(self, paths: Iterable[Path]) -> None:
+        """Change the watched files.
+
+        Files that don't exist are watched for their creation.
+        """
+        self._paths = {Path(os.path.abspath(path)) for path in paths}
+
+    @abstractmethod
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait for watched files to change.
+
+        Parameters
+        ----------
+        timeout
+            Maximum time to wait, in seconds, or `None` to wait until a file
+            changes.
+
+        Returns
+        -------
+        set of pathlib.Path
+            The files that changed, which is empty if the timeout expired.
+        """
+
+    def close(self) -> None:
+        """Stop watching the files."""
+
+    def __enter__(self) -> Watcher:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """A watcher that polls the modification times and sizes of the files.
+
+    Parameters
+    ----------
+    paths
+        The files to watch.
+    interval
+        Interval between checks, in seconds.
+    """
+
+    def __init__(
+        self, paths: Iterable[Path], *, interval: float = POLL_INTERVAL
+    ) -> None:
+        self._interval = interval
+        self._signatures: Dict[Path, Optional[Tuple[int, int]]] = {}
+        super().__init__(paths)
+
+    def set_paths(self, paths: Iterable[Path]) -> None:
+        super().set_paths(paths)
+        self._signatures = {
+            path: self._signatures[path]
+            if path in self._signatures
+            else _signature(path)
+            for path in self._paths
+        }
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._check()
+            if changed:
+                time.sleep(SETTLE_TIME)
+                return changed | self._check()
+            if deadline is None:
+                delay = self._interval
+            else:
+                delay = min(self._interval, deadline - time.monotonic())
+                if delay <= 0:
+                    return set()
+            time.sleep(delay)
+
+    def _check(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        for path, previous in self._signatures.items():
+            current = _signature(path)
+            if current != previous:
+                self._signatures[path] = current
+                changed.add(path)
+        return changed
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    """The modification time and size of a file, or `None` if it doesn't
+    exist.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Inotify:
+    """The inotify functions of the C library."""
+
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.init1 = libc.inotify_init1
+        self.init1.argtypes = [ctypes.c_int]
+        self.init1.restype = ctypes.c_int
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.add_watch.restype = ctypes.c_int
+        self.rm_watch = libc.inotify_rm_watch
+        self.rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.rm_watch.restype = ctypes.c_int
+
+
+_inotify: Optional[_Inotify] = None
+_inotify_lock = threading.Lock()
+
+
+def _load_inotify() -> Optional[_Inotify]:
+    global _inotify
+    if not sys.platform.startswith("linux"):
+        return None
+    with _inotify_lock:
+        if _inotify is None:
+            try:
+                _inotify = _Inotify()
+            except (OSError, AttributeError):
+                return None
+        return _inotify
+
+
+def inotify_available() -> bool:
+    """Whether the inotify API is available, which is the case on Linux."""
+    return _load_inotify() is not None
+
+
+class InotifyWatcher(Watcher):
+    """A watcher that uses Linux's inotify API.
+
+    The directories of the files are watched, rather than the files, so
+    that files that editors save by replacing them are still watched.
+
+    Raises
+    ------
+    OSError
+        Raised if inotify isn't available, or if the process can't create
+        more inotify instances.
+    """
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        inotify = _load_inotify()
+        if inotify is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._inotify = inotify
+        self._fd = inotify.init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._directories: Dict[Path, int] = {}
+        self._watches: Dict[int, Path] = {}
+        super().__init__(paths)
+
+    def set_paths(self, paths: Iterable[Path]) -> None:
+        super().set_paths(paths)
+        directories = {path.parent for path in self._paths}
+        for directory in set(self._directories) - directories:
+            watch = self._directories.pop(directory)
+            self._watches.pop(watch, None)
+            self._inotify.rm_watch(self._fd, watch)
+        for directory in directories - set(self._directories):
+            watch = self._inotify.add_watch(
+                self._fd, os.fsencode(directory), _WATCH_MASK
+            )
+            if watch < 0:
+                logger.warning(
+                    "Cannot watch %s: %s",
+                    directory,
+                    os.strerror(ctypes.get_errno()),
+                )
+                continue
+            self._directories[directory] = watch
+            self._watches[watch] = directory
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed: Set[Path] = set()
+        while not changed:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            if not self._poll(remaining):
+                return set()
+            changed = self._read_events()
+        # Collect the changes to the files that are saved together
+        while self._poll(SETTLE_TIME):
+            changed |= self._read_events()
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _poll(self, timeout: Optional[float]) -> bool:
+        """Wait for events to read."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        return bool(readable)
+
+    def _read_events(self) -> Set[Path]:
+        """Read the pending events, returning the watched files that they
+        are about.
+        """
+        try:
+            data = os.read(self._fd, _EVENT_BUFFER_SIZE)
+        except BlockingIOError:
+            return set()
+        changed: Set[Path] = set()
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                logger.debug("The inotify queue overflowed")
+                changed |= self._paths
+                continue
+            directory = self._watches.get(watch)
+            if directory is None:
+                continue
+            if mask & _IN_IGNORED:
+                # The directory was removed
+                del self._watches[watch]
+                self._directories.pop(directory, None)
+                continue
+            path = directory.joinpath(os.fsdecode(name))
+            if path in self._paths:
+                changed.add(path)
+        return changed
+
+
+def create_watcher(
+    paths: Iterable[Path],
+    *,
+    polling: bool = False,
+    interval: float = POLL_INTERVAL,
+) -> Watcher:
+    """Create the best available watcher for a set of files.
+
+    Parameters
+    ----------
+    paths
+        The files to watch.
+    polling
+        If `True`, poll the files even if inotify is available, such as for
+        files on network filesystems, whose changes on other hosts inotify
+        doesn't see.
+    interval
+        Interval between the checks of a polling watcher, in seconds.
+    """
+    paths = list(paths)
+    if not polling and inotify_available():
+        try:
+            return InotifyWatcher(paths)
+        except OSError as e:
+            logger.warning("Cannot use inotify (%s); polling files", e)
+    return PollingWatcher(paths, interval=interval)
+
+
+@dataclass
+class Rebuild:
+    """The outcome of a build of a watched document."""
+
+    changed: List[Path] = field(default_factory=list)
+    """The files whose changes caused the build, which is empty for the first
+    build.
+    """
+
+    duration: float = 0.0
+    """Time spent building, in seconds."""
+
+    reparsed: bool = True
+    """Whether the TeX source was parsed, rather than only the PDF
+    inspected.
+    """
+
+    error: Optional[str] = None
+    """The error message, if the build failed."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether the site was built."""
+        return self.error is None
+
+
+class WatchSession:
+    """Builds of a document's landing page as its files change.
+
+    Parameters
+    ----------
+    job
+        The document to build.
+    """
+
+    job: BatchJob
+    """The document."""
+
+    builds: int
+    """Number of successful builds, which preview servers use to detect new
+    builds.
+    """
+
+    _parser: Optional[Parser]
+    """The parser of the last successful build, which is reused if only the
+    PDF changes.
+    """
+
+    def __init__(self, job: BatchJob) -> None:
+        self.job = job
+        self.builds = 0
+        self._parser = None
+
+    @property
+    def index_path(self) -> Path:
+        """Path of the site's landing page."""
+        return self.job.output_dir.joinpath("index.html")
+
+    def watched_paths(self) -> Set[Path]:
+        """The files that the site depends on: the root TeX file, the files
+        it inputs, and the PDF.
+
+        The input files are the ones that the last parse read.
+        """
+        from .parsers.texinclude import get_include_graph
+
+        source_path = self.job.source_path
+        return {
+            source_path,
+            self.job.pdf,
+            *get_include_graph().includes(source_path),
+        }
+
+    def build(self, changed: Iterable[Path] = ()) -> Rebuild:
+        """Build the site, capturing any error.
+
+        Parameters
+        ----------
+        changed
+            The files that changed since the last build. If only the PDF
+            changed, the TeX source isn't parsed again.
+
+        Returns
+        -------
+        Rebuild
+            The outcome of the build. If the build failed, the site is
+            unchanged and the next build parses the TeX source again.
+        """
+        from lander.plugins import parsers, themes
+
+        from .parsers.spherexparser import SpherexParser
+
+        changed_paths = sorted(set(changed))
+        pdf_path = Path(os.path.abspath(self.job.pdf))
+        parser = self._parser
+        reparse = not (
+            isinstance(parser, SpherexParser)
+            and changed_paths
+            and all(
+                Path(os.path.abspath(p)) == pdf_path for p in changed_paths
+            )
+        )
+        start = time.perf_counter()
+        try:
+            settings = self.job.load_settings()
+            if reparse or not isinstance(parser, SpherexParser):
+                parser = parsers[settings.parser](settings=settings)
+            else:
+                parser.update_pdf(settings)
+            theme = themes[settings.theme](
+                metadata=parser.metadata, settings=settings
+            )
+            theme.build_site()
+        except Exception as e:
+            logger.debug(
+                "Failed to build %s", self.job.source_path, exc_info=True
+            )
+            self._parser = None
+            return Rebuild(
+                changed=changed_paths,
+                duration=time.perf_counter() - start,
+                reparsed=reparse,
+                error="".join(
+                    traceback.format_exception_only(type(e), e)
+                ).strip(),
+            )
+        self._parser = parser
+        self.builds += 1
+        return Rebuild(
+            changed=changed_paths,
+            duration=time.perf_counter() - start,
+            reparsed=reparse,
+        )
+
+    def run(
+        self,
+        watcher: Watcher,
+        *,
+        on_build: Optional[Callable[[Rebuild], None]] = None,
+        stop: Optional[threading.Event] = None,
+        poll_timeout: float = 0.5,
+    ) -> None:
+        """Rebuild the site whenever its files change, until stopped.
+
+        The watcher's files are updated after each build, since a document
+        can start or stop inputting files.
+
+        Parameters
+        ----------
+        watcher
+            The watcher of the site's files (see `watched_paths`).
+        on_build
+            A function that is called with the outcome of each build.
+        stop
+            An event that stops watching once set. Without it, the session
+            watches until the process is interrupted.
+        poll_timeout
+            Interval, in seconds, between checks of ``stop``.
+        """
+        while stop is None or not stop.is_set():
+            changed = watcher.wait(poll_timeout)
+            if not changed:
+                continue
+            rebuild = self.build(changed)
+            watcher.set_paths(self.watched_paths())
+            if on_build is not None:
+                on_build(rebuild)
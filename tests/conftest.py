@@ -8,6 +8,8 @@ from typing import Generator
 
 import pytest
 
+from spherexlander.themes.spherex import SpherexTheme
+
 
 @pytest.fixture(scope="function")
 def temp_cwd(tmp_path: Path) -> Generator[Path, None, None]:
@@ -18,3 +20,16 @@ def temp_cwd(tmp_path: Path) -> Generator[Path, None, None]:
     yield tmp_path
 
     os.chdir(current_dir)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(
+    tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch
+) -> Path:
+    """Isolate each test's on-disk caches in a temporary directory."""
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("SPHEREX_LANDER_CACHE_DIR", str(path))
+    # The shared Jinja environment holds a bytecode cache in the cache
+    # directory.
+    monkeypatch.setattr(SpherexTheme, "_shared_jinja_env", None)
+    return path
@@ -0,0 +1,187 @@
+"""Tests for the spherexlander.attachments module."""
+
+from __future__ import annotations
+
+import hashlib
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import pytest
+from lander.settings import DownloadableFile
+
+from spherexlander import attachments, placement
+from spherexlander.attachments import expand_attachments, place_downloads
+from spherexlander.batch import BatchJob, BuildStatus, run_batch
+from spherexlander.incremental import FileFingerprint
+from spherexlander.placement import (
+    PlacedFile,
+    PlacementMethod,
+    PlacementStrategy,
+)
+
+if TYPE_CHECKING:
+    from _pytest.logging import LogCaptureFixture
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+def write_attachments(directory: Path, count: int) -> None:
+    directory.mkdir(parents=True)
+    for i in range(count):
+        (directory / f"table-{i:02d}.csv").write_text("1,2,3\n" * (i + 1))
+
+
+def test_expand_attachments(tmp_path: Path, caplog: LogCaptureFixture) -> None:
+    write_attachments(tmp_path / "tables", 3)
+    (tmp_path / "data" / "raw").mkdir(parents=True)
+    (tmp_path / "data" / "raw" / "image.fits").write_bytes(b"SIMPLE")
+    (tmp_path / "README.txt").write_text("Tables")
+
+    paths = expand_attachments(
+        [
+            "README.txt",
+            "tables/table-0[12].csv",
+            "data/**/*",
+            "tables/*.csv",
+            "missing/*.csv",
+        ],
+        tmp_path,
+    )
+    assert paths == [
+        tmp_path / "README.txt",
+        tmp_path / "tables" / "table-01.csv",
+        tmp_path / "tables" / "table-02.csv",
+        tmp_path / "data" / "raw" / "image.fits",
+        tmp_path / "tables" / "table-00.csv",
+    ]
+    assert "No attachments match" in caplog.text
+
+
+def test_place_downloads(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Files are placed concurrently, so the slowest file bounds the time
+    to place them all.
+    """
+    write_attachments(tmp_path / "tables", 50)
+    downloadables = [
+        DownloadableFile.load(p)
+        for p in sorted((tmp_path / "tables").iterdir())
+    ]
+    place_file = placement.place_file
+
+    def slow_place_file(
+        source: Path,
+        destination: Path,
+        strategy: Optional[PlacementStrategy] = None,
+    ) -> PlacedFile:
+        time.sleep(0.05)
+        return place_file(source, destination, strategy)
+
+    monkeypatch.setattr(placement, "place_file", slow_place_file)
+    start = time.perf_counter()
+    placed = place_downloads(
+        downloadables,
+        tmp_path / "site",
+        strategy=PlacementStrategy.copy,
+        max_workers=50,
+    )
+    # Placing the files one at a time would take 2.5 seconds
+    assert time.perf_counter() - start < 1.0
+    assert [r.name for r, _ in placed] == [d.name for d in downloadables]
+    for record, placed_file in placed:
+        data = record.file_path.read_bytes()
+        assert record.size == len(data)
+        assert record.sha256 == hashlib.sha256(data).hexdigest()
+        assert record.mimetype == "text/csv"
+        assert placed_file.method == PlacementMethod.copy
+        assert (tmp_path / "site" / record.name).read_bytes() == data
+
+    # Unchanged files are hashed with the previous build's hashes, without
+    # reading them
+    monkeypatch.setattr(placement, "place_file", place_file)
+    monkeypatch.setattr(attachments, "_hash_file", pytest.fail)
+    known_files = {
+        str(r.file_path.resolve()): FileFingerprint(
+            size=p.size, mtime_ns=p.mtime_ns, sha256=r.sha256
+        )
+        for r, p in placed
+    }
+    replaced = place_downloads(
+        downloadables,
+        tmp_path / "site",
+        strategy=PlacementStrategy.copy,
+        known_files=known_files,
+    )
+    assert [r for r, _ in replaced] == [r for r, _ in placed]
+    assert all(p.method == PlacementMethod.unchanged for _, p in replaced)
+
+
+def test_site_attachments(tmp_path: Path) -> None:
+    """The landing page lists each attachment with its own size and hash."""
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    write_attachments(source_dir / "tables", 3)
+    (source_dir / "tables" / "table-02.csv").write_bytes(b"0" * 4000)
+    job = BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+        attachments=[str(source_dir / "tables" / "*.csv")],
+    )
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+
+    html = (job.output_dir / "index.html").read_text()
+    for name, size in [
+        ("table-00.csv", "6 B"),
+        ("table-01.csv", "12 B"),
+        ("table-02.csv", "4 kB"),
+    ]:
+        data = (source_dir / "tables" / name).read_bytes()
+        assert (job.output_dir / name).read_bytes() == data
+        sha256 = hashlib.sha256(data).hexdigest()
+        assert (
+            f'<a href="{name}" type="text/csv" download>{name}</a> '
+            f'({size}) <code class="spherex-checksum" '
+            f'title="SHA-256: {sha256}">{sha256[:12]}</code>'
+        ) in html
+
+
+def test_duplicate_names(tmp_path: Path) -> None:
+    """Files that would be placed at the same path in the site are rejected
+    before any file is placed.
+    """
+    for directory in ("a", "b"):
+        (tmp_path / "data" / directory).mkdir(parents=True)
+        (tmp_path / "data" / directory / "t.csv").write_text(directory)
+    paths = expand_attachments(["data/**/*.csv"], tmp_path)
+    assert len(paths) == 2
+    downloadables = [DownloadableFile.load(p) for p in paths]
+    site_dir = tmp_path / "site"
+    with pytest.raises(ValueError, match="Two downloads would be placed"):
+        place_downloads(downloadables, site_dir, max_workers=8)
+    assert not (site_dir / "t.csv").exists()
+
+
+def test_site_duplicate_names(tmp_path: Path) -> None:
+    """A build whose attachments collide fails rather than publishing one
+    of them under both links.
+    """
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    (source_dir / "old").mkdir()
+    (source_dir / "old" / "SSDC-MS-001.pdf").write_bytes(b"%PDF-1.4")
+    job = BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+        attachments=[str(source_dir / "old" / "*.pdf")],
+    )
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.failed
+    assert "SSDC-MS-001.pdf in the site" in str(report.results[0].error)
@@ -0,0 +1,82 @@
+"""Tests for the spherexlander.batch module."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from spherexlander.batch import (
+    BuildStatus,
+    discover_jobs,
+    load_manifest,
+    run_batch,
+)
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def write_manifest(tmp_path: Path) -> Path:
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+documents:
+  - source: {DATA_ROOT}/pipeline-module/ssdc-ms-001.tex
+    pdf: {DATA_ROOT}/pipeline-module/SSDC-MS-001.pdf
+    parser: spherex-ssdc-ms
+    output: _build/ssdc-ms-001
+  - source: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.tex
+    pdf: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.pdf
+    output: _build/ssdc-tr-000
+    url: https://example.com/ssdc-tr-000/
+  - source: {DATA_ROOT}/ssdc-tr-va/missing.tex
+    pdf: {DATA_ROOT}/ssdc-tr-va/SSDC-TR-000.pdf
+    parser: spherex-ssdc-tr
+    output: _build/missing
+"""
+    )
+    return manifest_path
+
+
+def test_load_manifest(tmp_path: Path) -> None:
+    jobs = load_manifest(write_manifest(tmp_path))
+    assert len(jobs) == 3
+    assert jobs[0].parser == "spherex-ssdc-ms"
+    assert jobs[0].theme == "spherex"
+    assert jobs[0].output_dir == tmp_path / "_build" / "ssdc-ms-001"
+    assert jobs[1].canonical_url == "https://example.com/ssdc-tr-000/"
+    assert jobs[1].parser == "spherex"
+
+
+def test_discover_jobs(tmp_path: Path) -> None:
+    jobs = discover_jobs(DATA_ROOT, tmp_path)
+    assert [j.output_dir for j in jobs] == [
+        tmp_path / "pipeline-module",
+        tmp_path / "pm-document",
+    ]
+    assert jobs[1].source_path == DATA_ROOT / "pm-document" / "SSDC-PM-001.tex"
+    assert jobs[1].parser == "spherex-project-management"
+    assert jobs[1].settings_path == DATA_ROOT / "pm-document" / "lander.yaml"
+
+
+def test_run_batch(tmp_path: Path) -> None:
+    """Build documents with a process pool; a failure is isolated to its
+    document.
+    """
+    jobs = load_manifest(write_manifest(tmp_path))
+    report = run_batch(jobs, max_workers=2)
+
+    assert [r.status for r in report.results] == [
+        BuildStatus.built,
+        BuildStatus.built,
+        BuildStatus.failed,
+    ]
+    assert report.counts == {"built": 2, "skipped": 0, "failed": 1}
+    assert "missing.tex" in report.format_summary()
+    assert report.failed[0].traceback is not None
+
+    metadata = json.loads(
+        (tmp_path / "_build" / "ssdc-tr-000" / "metadata.json").read_text()
+    )
+    assert metadata["identifier"] == "SSDC-TR-000"
+    assert (tmp_path / "_build" / "ssdc-ms-001" / "index.html").exists()
+    assert not (tmp_path / "_build" / "missing").exists()
@@ -0,0 +1,82 @@
+"""Tests for the spherexlander.cache module."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from spherexlander.cache import ContentCache, open_cache
+from spherexlander.parsers import texconvert
+from spherexlander.parsers.texconvert import convert_tex_spans
+
+
+def test_get_set(tmp_path: Path) -> None:
+    cache = ContentCache(tmp_path / "cache", max_size=1024)
+    key = cache.make_key("content", "plain", "1.0")
+    assert cache.get(key) is None
+    cache.set(key, b"value")
+    assert cache.get(key) == b"value"
+    assert cache.make_key("content", "plain", "1.1") != key
+    # Keys are unambiguous with respect to how the parts are split
+    assert cache.make_key("ab", "c") != cache.make_key("a", "bc")
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = ContentCache(tmp_path / "cache", max_size=300)
+    for i in range(3):
+        cache.set(str(i), b"x" * 100)
+        # Make the access order unambiguous for the mtime-based LRU
+        path = cache._entry_path(str(i))
+        os.utime(path, (1000 + i, 1000 + i))
+
+    # Entry 0 is now the most recently used
+    assert cache.get("0") is not None
+    cache.set("3", b"x" * 100)
+
+    assert cache.get("1") is None
+    for key in ("0", "2", "3"):
+        assert cache.get(key) is not None
+
+
+def test_overwrite(tmp_path: Path) -> None:
+    """Replacing an entry doesn't count its old content, which would make
+    the cache prune itself early.
+    """
+    cache = ContentCache(tmp_path / "cache", max_size=1024)
+    for key in ("0", "1", "1"):
+        cache.set(key, b"x" * 100)
+    cache.set("1", b"x" * 50)
+    assert cache._size == 150
+
+
+def test_shared_directory(tmp_path: Path) -> None:
+    """Separate cache instances (as in separate processes) share entries."""
+    writer = ContentCache(tmp_path, max_size=1024)
+    reader = ContentCache(tmp_path, max_size=1024)
+    writer.set("key", b"value")
+    assert reader.get("key") == b"value"
+    reader.clear()
+    assert writer.get("key") is None
+
+
+def test_open_cache(cache_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = open_cache("texconvert")
+    assert cache is not None
+    assert cache.directory == cache_dir / "texconvert"
+
+    monkeypatch.setenv("SPHEREX_LANDER_CACHE_ENABLED", "false")
+    assert open_cache("texconvert") is None
+
+
+def test_conversion_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Warm conversions do not run pandoc."""
+    spans = ["Smith -- Jones", r"$\alpha$ Centauri"]
+    first = convert_tex_spans(spans)
+
+    def _run_pandoc(content: str) -> str:
+        raise AssertionError("pandoc should not run")
+
+    monkeypatch.setattr(texconvert, "_run_pandoc", _run_pandoc)
+    assert convert_tex_spans(spans) == first
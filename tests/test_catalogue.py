@@ -0,0 +1,120 @@
+"""Tests for the spherexlander.catalogue module."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from spherexlander.batch import BuildStatus, load_manifest, run_batch
+from spherexlander.catalogue import Catalogue
+from spherexlander.cli import app
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def write_manifest(tmp_path: Path) -> Path:
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+documents:
+  - source: {DATA_ROOT}/pipeline-module/ssdc-ms-001.tex
+    pdf: {DATA_ROOT}/pipeline-module/SSDC-MS-001.pdf
+    parser: spherex-ssdc-ms
+    output: {tmp_path}/ssdc-ms-001
+  - source: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.tex
+    pdf: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.pdf
+    parser: spherex-ssdc-tr
+    output: {tmp_path}/ssdc-tr-000
+"""
+    )
+    return manifest_path
+
+
+def test_upsert(tmp_path: Path) -> None:
+    """An upsert replaces the document's entry and its authors."""
+    metadata = {
+        "identifier": "SSDC-IF-001",
+        "title": "Interface",
+        "interface_partner": "IRSA",
+        "authors": [{"name": "Ada Lovelace"}, {"name": "Alan Turing"}],
+    }
+    with Catalogue(tmp_path / "catalogue.sqlite") as catalogue:
+        assert catalogue.upsert(metadata, parser="spherex-ssdc-if")
+        metadata["title"] = "Interface, revised"
+        metadata["authors"] = [{"name": "Grace Hopper", "role": "Lead"}]
+        assert catalogue.upsert(metadata, parser="spherex-ssdc-if")
+        assert not catalogue.upsert({"title": "No handle"})
+
+        assert len(catalogue) == 1
+        entry = catalogue.get("SSDC-IF-001")
+        assert entry is not None
+        assert entry.handle_prefix == "SSDC-IF"
+        assert entry.title == "Interface, revised"
+        assert [a.name for a in entry.authors] == ["Grace Hopper"]
+        assert catalogue.find(author="grace hopper") == [entry]
+        assert catalogue.find(author="Ada Lovelace") == []
+        assert catalogue.find(interface_partner="IRSA") == [entry]
+
+        assert catalogue.delete("SSDC-IF-001")
+        assert catalogue.get("SSDC-IF-001") is None
+
+
+def test_batch_catalogue(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Batch builds add built and skipped documents to the catalogue."""
+    catalogue_path = tmp_path / "catalogue.sqlite"
+    monkeypatch.setenv("SPHEREX_LANDER_CATALOGUE_PATH", str(catalogue_path))
+    jobs = load_manifest(write_manifest(tmp_path))
+    report = run_batch(jobs, max_workers=2)
+    assert report.counts["built"] == 2
+
+    with Catalogue(catalogue_path) as catalogue:
+        (module,) = catalogue.find(pipeline_level="L3", difficulty="High")
+        assert module.handle == "SSDC-MS-001"
+        assert module.parser == "spherex-ssdc-ms"
+        assert module.diagram_index == 2
+        assert len(module.authors) == 4
+        assert catalogue.find(author="Francis Carrillo") == [module]
+
+        (tr,) = catalogue.find(handle_prefix="SSDC-TR", req_doors_id="12345")
+        assert tr.handle == "SSDC-TR-000"
+        assert tr.req_doors_url == "https://example.org/12345"
+        assert tr.approval_name == "Edwin Hubble"
+        assert tr.metadata["ipac_jira_id"] == "SVV-999"
+        first_update = tr.updated
+
+    catalogue_path.unlink()
+    report = run_batch(jobs, max_workers=2)
+    assert [r.status for r in report.results] == [BuildStatus.skipped] * 2
+    with Catalogue(catalogue_path) as catalogue:
+        tr_entry = catalogue.get("SSDC-TR-000")
+        assert tr_entry is not None
+        assert tr_entry.updated > first_update
+        assert len(catalogue) == 2
+
+
+def test_query_command(tmp_path: Path) -> None:
+    catalogue_path = tmp_path / "catalogue.sqlite"
+    with Catalogue(catalogue_path) as catalogue:
+        catalogue.upsert(
+            {"identifier": "SSDC-MS-002", "title": "Module", "version": "2.0"}
+        )
+        catalogue.upsert({"identifier": "SSDC-TR-002", "title": "Report"})
+
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["query", str(catalogue_path), "--prefix", "SSDC-MS"]
+    )
+    assert result.exit_code == 0
+    assert result.output == "SSDC-MS-002 v2.0: Module\n"
+
+    result = runner.invoke(app, ["query", str(catalogue_path), "--json"])
+    assert result.exit_code == 0
+    assert [e["handle"] for e in json.loads(result.output)] == [
+        "SSDC-MS-002",
+        "SSDC-TR-002",
+    ]
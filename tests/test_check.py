@@ -0,0 +1,99 @@
+"""Tests for the spherexlander.check module."""
+
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from spherexlander.batch import BatchJob
+from spherexlander.check import IssueKind, run_check
+from spherexlander.cli import app
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def make_jobs(tmp_path: Path) -> list[BatchJob]:
+    """Create jobs for a complete-enough module, a module with problems, and
+    a missing document.
+    """
+    module_dir = tmp_path / "module"
+    shutil.copytree(DATA_ROOT / "pipeline-module", module_dir)
+    source = (module_dir / "ssdc-ms-001.tex").read_text()
+    (module_dir / "ssdc-ms-002.tex").write_text(
+        source.replace("\\difficulty{High}", "\\difficulty{Impossible}")
+        .replace("\\diagramindex{2}\n", "")
+        .replace("SSDC-MS-001", "SSDC-MS-002")
+    )
+    return [
+        BatchJob(
+            source_path=module_dir / name,
+            pdf=module_dir / "SSDC-MS-001.pdf",
+            parser=parser,
+            output_dir=tmp_path / "_build",
+        )
+        for name, parser in [
+            ("ssdc-ms-001.tex", "spherex-ssdc-ms"),
+            ("ssdc-ms-002.tex", "spherex"),
+            ("missing.tex", "spherex-ssdc-ms"),
+        ]
+    ]
+
+
+def test_run_check(tmp_path: Path) -> None:
+    report = run_check(make_jobs(tmp_path), max_workers=2)
+    first, second, missing = report.results
+
+    assert first.identifier == "SSDC-MS-001"
+    assert [(i.kind, i.field) for i in first.issues] == [
+        (IssueKind.missing, "approval")
+    ]
+    assert not first.failed
+
+    assert second.document_type == "SSDC-MS"
+    assert {(i.kind, i.field) for i in second.issues} == {
+        (IssueKind.missing, "approval"),
+        (IssueKind.missing, "diagram_index"),
+        (IssueKind.invalid, "difficulty"),
+    }
+    assert second.failed
+
+    assert missing.issues[0].kind == IssueKind.error
+    assert report.failed == [second, missing]
+    assert report.summary["SSDC-MS"] == {
+        "missing:approval": 2,
+        "missing:diagram_index": 1,
+        "invalid:difficulty": 1,
+    }
+    # Nothing is built
+    assert not (tmp_path / "_build").exists()
+
+
+def test_check_command(tmp_path: Path) -> None:
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+documents:
+  - source: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.tex
+    pdf: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.pdf
+    output: _build/ssdc-tr-000
+"""
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["check", "--manifest", str(manifest_path), "--json"]
+    )
+    assert result.exit_code == 0
+    data = json.loads(result.output)
+    assert data["summary"]["SSDC-TR"] == {
+        "missing:authors": 1,
+        "missing:va_doors_id": 1,
+    }
+
+    result = runner.invoke(
+        app, ["check", "--manifest", str(manifest_path), "--strict"]
+    )
+    assert result.exit_code == 1
+    assert "missing: No VADoorsID command detected" in result.output
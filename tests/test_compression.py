@@ -0,0 +1,155 @@
+"""Tests for the spherexlander.compression module."""
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from spherexlander import compression
+from spherexlander.batch import BatchJob, BuildStatus, run_batch
+from spherexlander.compression import (
+    Encoding,
+    precompress_site,
+    remove_variants,
+)
+from spherexlander.metrics import CACHE_REQUESTS, REGISTRY
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_cache() -> None:
+    compression._memory.clear()
+
+
+def test_precompress_site(tmp_path: Path) -> None:
+    html = b"<p>SPHEREx landing page</p>\n" * 100
+    (tmp_path / "index.html").write_bytes(html)
+    (tmp_path / "small.css").write_bytes(b"p { margin: 0; }")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 100)
+    (tmp_path / ".hidden.json").write_bytes(b"{}" * 200)
+    paths = ["index.html", "small.css", "logo.png", ".hidden.json"]
+
+    variants = precompress_site(tmp_path, paths, encodings=[Encoding.gzip])
+    assert variants == ["index.html.gz"]
+    gzip_path = tmp_path / "index.html.gz"
+    compressed = gzip_path.read_bytes()
+    assert gzip.decompress(compressed) == html
+    assert len(compressed) * 5 < len(html)
+
+    # Variants have the modification times of their files, which aren't
+    # read again while they're unchanged
+    mtime_ns = gzip_path.stat().st_mtime_ns
+    assert mtime_ns == (tmp_path / "index.html").stat().st_mtime_ns
+    assert precompress_site(tmp_path, paths, encodings=[Encoding.gzip]) == [
+        "index.html.gz"
+    ]
+    assert gzip_path.stat().st_mtime_ns == mtime_ns
+
+    html = html.replace(b"SPHEREx", b"SPHEREx 2")
+    (tmp_path / "index.html").write_bytes(html)
+    os.utime(tmp_path / "index.html", ns=(mtime_ns + 1, mtime_ns + 1))
+    precompress_site(tmp_path, paths, encodings=[Encoding.gzip])
+    assert gzip.decompress(gzip_path.read_bytes()) == html
+
+    remove_variants(tmp_path, paths)
+    assert not gzip_path.exists()
+
+
+def test_incompressible_file(tmp_path: Path) -> None:
+    """A variant that isn't smaller than its file is removed."""
+    data = os.urandom(512)
+    (tmp_path / "data.json").write_bytes(data)
+    (tmp_path / "data.json.gz").write_bytes(b"stale")
+    assert precompress_site(tmp_path, ["data.json"]) == []
+    assert not (tmp_path / "data.json.gz").exists()
+
+
+def test_unavailable_encoding(tmp_path: Path) -> None:
+    """Variants of encodings that aren't written are removed, since they
+    would be stale.
+    """
+    (tmp_path / "index.html").write_bytes(b"<p>SPHEREx</p>\n" * 100)
+    (tmp_path / "index.html.br").write_bytes(b"stale")
+    variants = precompress_site(
+        tmp_path, ["index.html"], encodings=[Encoding.gzip]
+    )
+    assert variants == ["index.html.gz"]
+    assert not (tmp_path / "index.html.br").exists()
+
+
+def test_shared_content_cache(tmp_path: Path) -> None:
+    """Files with the same content are compressed once, and other build
+    processes reuse the variants from the on-disk cache.
+    """
+    css = b".spherex-checksum { color: #666; }\n" * 50
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "spherex.css").write_bytes(css)
+
+    REGISTRY.reset()
+    gzip_only = [Encoding.gzip]
+    precompress_site(tmp_path / "a", ["spherex.css"], encodings=gzip_only)
+    precompress_site(tmp_path / "b", ["spherex.css"], encodings=gzip_only)
+    assert CACHE_REQUESTS.value(cache="precompress-memory", result="hit") == 1
+    assert CACHE_REQUESTS.value(cache="precompress", result="miss") == 1
+
+    compression._memory.clear()
+    (tmp_path / "a" / "spherex.css.gz").unlink()
+    precompress_site(tmp_path / "a", ["spherex.css"], encodings=gzip_only)
+    assert CACHE_REQUESTS.value(cache="precompress", result="hit") == 1
+    assert (tmp_path / "a" / "spherex.css.gz").read_bytes() == (
+        tmp_path / "b" / "spherex.css.gz"
+    ).read_bytes()
+
+
+def test_brotli(tmp_path: Path) -> None:
+    brotli = pytest.importorskip("brotli")
+    html = b"<p>SPHEREx landing page</p>\n" * 100
+    (tmp_path / "index.html").write_bytes(html)
+    assert precompress_site(tmp_path, ["index.html"]) == [
+        "index.html.gz",
+        "index.html.br",
+    ]
+    assert brotli.decompress((tmp_path / "index.html.br").read_bytes()) == html
+
+
+def test_site_variants(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Sites have variants of their text files, which are recorded in the
+    build manifest and removed if precompression is disabled.
+    """
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    (source_dir / "table.json").write_text('{"flux": 1.0}\n' * 100)
+    job = BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+        attachments=[str(source_dir / "table.json")],
+    )
+    site_dir = job.output_dir
+    site_dir.mkdir()
+    (site_dir / "table.json.gz").write_bytes(b"stale")
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+    for name in ("index.html", "spherex.css", "metadata.json"):
+        assert (
+            gzip.decompress((site_dir / f"{name}.gz").read_bytes())
+            == (site_dir / name).read_bytes()
+        )
+    # Downloads are served as they were provided
+    assert not (site_dir / "SSDC-MS-001.pdf.gz").exists()
+    assert (site_dir / "table.json").exists()
+    assert not (site_dir / "table.json.gz").exists()
+
+    monkeypatch.setenv("SPHEREX_LANDER_PRECOMPRESS", "false")
+    report = run_batch([job], max_workers=1, force=True)
+    assert report.results[0].status == BuildStatus.built
+    assert not list(site_dir.glob("*.gz"))
@@ -0,0 +1,110 @@
+"""Tests for the spherexlander.themes.spherex.criticalcss module."""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+from spherexlander.batch import BatchJob, BuildStatus, run_batch
+from spherexlander.metrics import CACHE_REQUESTS, REGISTRY
+from spherexlander.themes.spherex.criticalcss import (
+    Stylesheet,
+    find_page_features,
+    inline_critical_css,
+)
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+CSS = """/*! license */
+/* A comment with a { brace */
+html { line-height: 1.15; }
+button, [type='submit'] { overflow: visible; }
+.comma-list li:nth-last-child(2):after { content: ' and '; }
+.spherex-badge:hover, .unused a { color: red; }
+#main > .card:not(.hidden) { margin: 0; }
+*, *:before { box-sizing: inherit; }
+:root { --c-text: #102A43; }
+@media (min-width: 600px) {
+  main { flex-direction: row; }
+  .unused { display: none; }
+}
+@media print { .unused { display: none; } }
+@font-face { font-family: "Test"; src: url("test.woff2"); }
+.pdfobject-container { height: 100vh; }
+"""
+
+HTML = """<!doctype html>
+<html><head><link rel="stylesheet" href="spherex.css"></head>
+<body><main id="main"><div class="card hidden">
+<ul class="comma-list"><li>A</li></ul>
+<span class="spherex-badge">badge</span>
+</div></main></body></html>
+"""
+
+
+def test_critical_css() -> None:
+    stylesheet = Stylesheet.parse(CSS)
+    css = stylesheet.critical_css(find_page_features(HTML))
+    assert css == (
+        "/*! license */"
+        "html{line-height: 1.15;}"
+        ".comma-list li:nth-last-child(2):after{content: ' and ';}"
+        ".spherex-badge:hover{color: red;}"
+        "#main > .card:not(.hidden){margin: 0;}"
+        "*,*:before{box-sizing: inherit;}"
+        ":root{--c-text: #102A43;}"
+        "@media (min-width: 600px){main{flex-direction: row;}}"
+        '@font-face{font-family: "Test"; src: url("test.woff2");}'
+        ".pdfobject-container{height: 100vh;}"
+    )
+
+
+def test_memoized_by_used_features() -> None:
+    """Pages that use the same selector features share critical CSS."""
+    REGISTRY.reset()
+    stylesheet = Stylesheet.parse(CSS)
+    css = stylesheet.critical_css(find_page_features(HTML))
+    # Features that no selector names don't matter
+    other_html = HTML.replace("<li>A</li>", '<li><p class="x">B</p></li>')
+    assert stylesheet.critical_css(find_page_features(other_html)) is css
+    assert CACHE_REQUESTS.value(cache="critical-css", result="hit") == 1
+    assert CACHE_REQUESTS.value(cache="critical-css", result="miss") == 1
+
+
+def test_inline_critical_css(tmp_path: Path) -> None:
+    stylesheet_path = tmp_path / "spherex.css"
+    stylesheet_path.write_text(CSS)
+    html = inline_critical_css(HTML, stylesheet_path, "spherex.css")
+    assert (
+        '<link rel="stylesheet" href="spherex.css">'
+        not in html.split("<noscript>")[0]
+    )
+    assert "<style>/*! license */html{line-height: 1.15;}" in html
+    assert (
+        '<link rel="preload" href="spherex.css" as="style" '
+        "onload=\"this.onload=null;this.rel='stylesheet'\">\n"
+        '<noscript><link rel="stylesheet" href="spherex.css"></noscript>'
+    ) in html
+    # Pages that don't link to the stylesheet are unchanged
+    assert inline_critical_css(HTML, stylesheet_path, "other.css") == HTML
+
+
+def test_site_critical_css(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    job = BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+    )
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+    html = (job.output_dir / "index.html").read_text()
+    head = html.split("</head>")[0]
+    assert "<style>/*! normalize.css" in head
+    assert ".spherex-author-list{" in head
+    # Rules for elements that the page doesn't have are pruned
+    assert "textarea" not in head
+    assert '<link rel="preload" href="spherex.css" as="style"' in head
+    assert (job.output_dir / "spherex.css").exists()
@@ -0,0 +1,170 @@
+"""Tests for the spherexlander.themes.spherex.images module."""
+
+from __future__ import annotations
+
+import shutil
+from pathlib import Path, PurePosixPath
+
+import pytest
+
+from spherexlander.batch import BatchJob, BuildStatus, run_batch
+from spherexlander.metrics import CACHE_REQUESTS, REGISTRY
+from spherexlander.themes.spherex import images
+from spherexlander.themes.spherex.images import ImageFormat, optimize_image
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_cache() -> None:
+    images._encoded.clear()
+    images._sources.clear()
+
+
+def write_image(path: Path, width: int, height: int) -> Path:
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("RGBA", (width, height), (26, 56, 77, 255))
+    image.paste((223, 39, 44, 0), (0, 0, width // 2, height // 2))
+    image.convert("P").save(path)
+    return path
+
+
+def read_size(path: Path) -> tuple:
+    Image = pytest.importorskip("PIL.Image")
+    with Image.open(path) as image:
+        return image.size
+
+
+def test_optimize_image(tmp_path: Path) -> None:
+    source = write_image(tmp_path / "logo.png", 300, 150)
+    site_dir = tmp_path / "site"
+    site_dir.mkdir()
+
+    image = optimize_image(
+        source, site_dir, PurePosixPath("images/logo.png"), 100
+    )
+    assert (image.width, image.height) == (100, 50)
+    assert image.src == "images/logo-100w.png"
+    assert image.srcset() == "images/logo-100w.png 1x, images/logo-200w.png 2x"
+    assert image.sources == [
+        ("image/webp", "images/logo-100w.webp 1x, images/logo-200w.webp 2x")
+    ]
+    for name, size in [
+        ("logo-100w.png", (100, 50)),
+        ("logo-200w.png", (200, 100)),
+        ("logo-100w.webp", (100, 50)),
+        ("logo-200w.webp", (200, 100)),
+    ]:
+        assert read_size(site_dir / "images" / name) == size
+
+
+def test_small_image(tmp_path: Path) -> None:
+    """Images aren't enlarged for higher pixel densities."""
+    source = write_image(tmp_path / "logo.png", 80, 80)
+    image = optimize_image(
+        source,
+        tmp_path,
+        PurePosixPath("logo.png"),
+        120,
+        formats=[ImageFormat.png],
+    )
+    assert image.srcset() == "logo-80w.png 1x"
+    assert image.sources == []
+    assert read_size(tmp_path / "logo-80w.png") == (80, 80)
+
+
+def test_variant_cache(tmp_path: Path) -> None:
+    """Variants are encoded once, and other build processes read them from
+    the on-disk cache.
+    """
+    source = write_image(tmp_path / "logo.png", 300, 300)
+    REGISTRY.reset()
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        optimize_image(
+            source,
+            tmp_path / name,
+            PurePosixPath("logo.png"),
+            120,
+            formats=[ImageFormat.png],
+        )
+    assert CACHE_REQUESTS.value(cache="images-memory", result="hit") == 2
+    assert CACHE_REQUESTS.value(cache="images", result="miss") == 2
+
+    images._encoded.clear()
+    optimize_image(
+        source,
+        tmp_path / "a",
+        PurePosixPath("logo.png"),
+        120,
+        formats=[ImageFormat.png],
+    )
+    assert CACHE_REQUESTS.value(cache="images", result="hit") == 2
+    assert (tmp_path / "a" / "logo-240w.png").read_bytes() == (
+        tmp_path / "b" / "logo-240w.png"
+    ).read_bytes()
+
+
+def make_job(tmp_path: Path) -> BatchJob:
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    return BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+    )
+
+
+def test_site_logo(tmp_path: Path) -> None:
+    pytest.importorskip("PIL")
+    job = make_job(tmp_path)
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+
+    html = (job.output_dir / "index.html").read_text()
+    assert (
+        '<source type="image/webp" '
+        'srcset="spherex-logo-120w.webp 1x, spherex-logo-240w.webp 2x">'
+    ) in html
+    assert (
+        '<img src="spherex-logo-120w.png" '
+        'srcset="spherex-logo-120w.png 1x, spherex-logo-240w.png 2x" '
+        'width="120" height="120" alt="SPHEREx" />'
+    ) in html
+    assert not (job.output_dir / "spherex-logo.png").exists()
+    for name in ("spherex-logo-120w.png", "spherex-logo-240w.webp"):
+        assert (job.output_dir / name).stat().st_size < 25_000
+
+
+def test_site_logo_without_webp(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Without WebP support in Pillow, the logo only has PNG variants."""
+    features = pytest.importorskip("PIL.features")
+    check = features.check
+    monkeypatch.setattr(
+        features, "check", lambda feature: feature != "webp" and check(feature)
+    )
+    assert images.available_formats() == [ImageFormat.png]
+    job = make_job(tmp_path)
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+    html = (job.output_dir / "index.html").read_text()
+    assert "image/webp" not in html
+    assert 'src="spherex-logo-120w.png"' in html
+    assert not list(job.output_dir.glob("*.webp"))
+
+
+def test_site_logo_without_pillow(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Without Pillow, the logo is copied."""
+    monkeypatch.setattr(images, "pillow_available", lambda: False)
+    job = make_job(tmp_path)
+    report = run_batch([job], max_workers=1)
+    assert report.results[0].status == BuildStatus.built
+    html = (job.output_dir / "index.html").read_text()
+    assert '<img src="spherex-logo.png" width="120" alt="SPHEREx" />' in html
+    assert (job.output_dir / "spherex-logo.png").exists()
+    assert not list(job.output_dir.glob("spherex-logo-*"))
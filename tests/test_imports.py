@@ -0,0 +1,80 @@
+"""Test that the plugins defer the import of modules that are only needed
+to extract metadata or build a site.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+DEFERRED_MODULES = [
+    "dateutil.parser",
+    "spherexlander.attachments",
+    "spherexlander.catalogue",
+    "spherexlander.compression",
+    "spherexlander.incremental",
+    "spherexlander.metrics",
+    "spherexlander.placement",
+    "spherexlander.preview",
+    "spherexlander.sidecar",
+    "spherexlander.parsers.pdfinspect",
+    "spherexlander.parsers.spherexdata",
+    "spherexlander.parsers.texconvert",
+    "spherexlander.parsers.texinclude",
+    "spherexlander.parsers.texindex",
+    "spherexlander.parsers.texstream",
+    "spherexlander.themes.spherex.badges",
+    "spherexlander.themes.spherex.criticalcss",
+    "spherexlander.themes.spherex.images",
+    "spherexlander.tracing",
+    "spherexlander.watch",
+]
+
+
+@pytest.mark.parametrize(
+    "module,attr",
+    [
+        (
+            "spherexlander.parsers.pipelinemodule",
+            "SpherexPipelineModuleParser",
+        ),
+        ("spherexlander.parsers.ssdctr", "SpherexSsdcTrParser"),
+        ("spherexlander.parsers.auto", "SpherexAutoParser"),
+        ("spherexlander.themes.spherex", "SpherexTheme"),
+    ],
+)
+def test_entry_point_imports(module: str, attr: str) -> None:
+    """Loading an entry point doesn't import the deferred modules."""
+    script = (
+        "import importlib, json, sys\n"
+        f"getattr(importlib.import_module({module!r}), {attr!r})\n"
+        "print(json.dumps(sorted(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    modules = set(json.loads(result.stdout))
+    assert modules.isdisjoint(DEFERRED_MODULES)
+    assert not any(m.endswith(".datamodel") for m in modules)
+
+
+def test_lazy_attributes() -> None:
+    from spherexlander.parsers import ssdctr
+
+    assert ssdctr.DoorsID.__name__ == "DoorsID"
+    with pytest.raises(AttributeError):
+        getattr(ssdctr, "NotAParser")
+
+
+def test_convert_tex_span_import() -> None:
+    """convert_tex_span is still importable from the spherexparser module."""
+    from spherexlander.parsers import texconvert
+    from spherexlander.parsers.spherexparser import convert_tex_span
+
+    assert convert_tex_span is texconvert.convert_tex_span
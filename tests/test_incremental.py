@@ -0,0 +1,166 @@
+"""Tests for the spherexlander.incremental module."""
+
+from __future__ import annotations
+
+import hashlib
+import shutil
+from pathlib import Path
+
+import pytest
+
+from spherexlander.batch import BatchJob, BuildStatus, run_batch
+from spherexlander.incremental import (
+    BuildManifest,
+    find_tex_files,
+    manifest_path,
+    write_if_changed,
+)
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+def make_job(tmp_path: Path) -> BatchJob:
+    """Copy the pipeline-module sample into a temporary directory and make
+    a batch job for it.
+    """
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    return BatchJob(
+        source_path=source_dir / "ssdc-ms-001.tex",
+        pdf=source_dir / "SSDC-MS-001.pdf",
+        parser="spherex-ssdc-ms",
+        output_dir=tmp_path / "_build",
+    )
+
+
+def build(job: BatchJob, *, force: bool = False) -> BuildStatus:
+    report = run_batch([job], max_workers=1, force=force)
+    return report.results[0].status
+
+
+def test_find_tex_files(tmp_path: Path) -> None:
+    job = make_job(tmp_path)
+    assert find_tex_files(job.source_path) == [
+        job.source_path,
+        job.source_path.parent / "meta.tex",
+    ]
+
+
+def test_write_if_changed(tmp_path: Path) -> None:
+    path = tmp_path / "site" / "index.html"
+    assert write_if_changed(path, b"content") is True
+    assert write_if_changed(path, b"content") is False
+    assert write_if_changed(path, b"changed") is True
+    assert path.read_bytes() == b"changed"
+
+
+def test_skip_unchanged_build(tmp_path: Path) -> None:
+    job = make_job(tmp_path)
+    assert build(job) == BuildStatus.built
+
+    manifest = BuildManifest.read(job.output_dir)
+    assert manifest is not None
+    assert "index.html" in manifest.outputs
+    assert "SSDC-MS-001.pdf" in manifest.outputs
+    assert str((job.source_path.parent / "meta.tex").resolve()) in (
+        manifest.files
+    )
+
+    assert build(job) == BuildStatus.skipped
+    assert build(job, force=True) == BuildStatus.built
+
+
+def test_rebuild_changed_input(tmp_path: Path) -> None:
+    """A change to an input file triggers a rebuild, but files whose
+    content is unchanged are not rewritten.
+    """
+    job = make_job(tmp_path)
+    assert build(job) == BuildStatus.built
+    index_path = job.output_dir / "index.html"
+    pdf_path = job.output_dir / "SSDC-MS-001.pdf"
+    index_mtime = index_path.stat().st_mtime_ns
+    pdf_mtime = pdf_path.stat().st_mtime_ns
+
+    # A new comment changes the source, but not the site
+    meta_path = job.source_path.parent / "meta.tex"
+    meta_path.write_text(meta_path.read_text() + "\n% A comment\n")
+    assert build(job) == BuildStatus.built
+    assert index_path.stat().st_mtime_ns == index_mtime
+    assert pdf_path.stat().st_mtime_ns == pdf_mtime
+    assert build(job) == BuildStatus.skipped
+
+    # A deleted output file triggers a rebuild
+    index_path.unlink()
+    assert build(job) == BuildStatus.built
+    assert index_path.is_file()
+
+
+def test_rebuild_changed_config(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A change to the plugin configuration that changes the site's files
+    triggers a rebuild, which removes the files that are no longer written.
+    """
+    job = make_job(tmp_path)
+    assert build(job) == BuildStatus.built
+    index_path = job.output_dir / "index.html"
+    assert (job.output_dir / "index.html.gz").exists()
+    assert "<style>" in index_path.read_text()
+
+    monkeypatch.setenv("SPHEREX_LANDER_PRECOMPRESS", "false")
+    monkeypatch.setenv("SPHEREX_LANDER_OPTIMIZE_IMAGES", "false")
+    monkeypatch.setenv("SPHEREX_LANDER_INLINE_CRITICAL_CSS", "false")
+    assert build(job) == BuildStatus.built
+    assert not list(job.output_dir.glob("*.gz"))
+    assert not list(job.output_dir.glob("spherex-logo-*"))
+    assert "<style>" not in index_path.read_text()
+    assert build(job) == BuildStatus.skipped
+
+    monkeypatch.setenv("SPHEREX_LANDER_PLACEMENT", "link")
+    assert build(job) == BuildStatus.built
+
+
+def test_manifest_outside_site(tmp_path: Path) -> None:
+    """The manifest, which has the build host's paths, isn't written into
+    the site, and a manifest from an earlier version is removed from it.
+    """
+    job = make_job(tmp_path)
+    legacy_path = job.output_dir / ".spherex-build.json"
+    legacy_path.parent.mkdir()
+    legacy_path.write_text("{}")
+    assert build(job) == BuildStatus.built
+    assert (
+        manifest_path(job.output_dir) == tmp_path / "_build.spherex-build.json"
+    )
+    assert manifest_path(job.output_dir).is_file()
+    assert not legacy_path.exists()
+    assert BuildManifest.read(job.output_dir) is not None
+
+
+def test_invalid_manifest(tmp_path: Path) -> None:
+    job = make_job(tmp_path)
+    job.output_dir.mkdir()
+    manifest_path(job.output_dir).write_text("{not json")
+    assert BuildManifest.read(job.output_dir) is None
+    assert build(job) == BuildStatus.built
+
+
+def test_linked_downloads(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """With the link strategy, the site's PDF is linked to the source PDF,
+    and the build manifest hashes it once.
+    """
+    monkeypatch.setenv("SPHEREX_LANDER_PLACEMENT", "link")
+    job = make_job(tmp_path)
+    assert build(job) == BuildStatus.built
+    pdf_path = job.output_dir / "SSDC-MS-001.pdf"
+    assert pdf_path.read_bytes() == job.pdf.read_bytes()
+    assert pdf_path.stat().st_mtime_ns == job.pdf.stat().st_mtime_ns
+
+    manifest = BuildManifest.read(job.output_dir)
+    assert manifest is not None
+    assert manifest.inputs["pdf"] == (
+        hashlib.sha256(job.pdf.read_bytes()).hexdigest()
+    )
+    assert build(job) == BuildStatus.skipped
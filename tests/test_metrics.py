@@ -0,0 +1,133 @@
+"""Tests for the spherexlander.metrics module."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from spherexlander.cli import app
+from spherexlander.metrics import (
+    DOCUMENTS,
+    Counter,
+    MetricsRegistry,
+    write_metrics,
+)
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def test_merge_and_prometheus() -> None:
+    """Snapshots from several registries are merged and formatted."""
+    snapshots = []
+    for duration in (0.003, 0.2):
+        worker = MetricsRegistry()
+        worker.counter("docs_total", "Documents.", ["status"]).inc(
+            status="built"
+        )
+        worker.histogram(
+            "phase_seconds", "Phase durations.", ["phase"]
+        ).observe(duration, phase="parse")
+        snapshots.append(worker.snapshot())
+
+    registry = MetricsRegistry()
+    for snapshot in snapshots:
+        registry.merge(json.loads(json.dumps(snapshot)))
+    registry.gauge("batch_seconds", "Batch duration.").set(1.5)
+
+    text = registry.to_prometheus()
+    assert "# TYPE docs_total counter\n" in text
+    assert 'docs_total{status="built"} 2\n' in text
+    assert 'phase_seconds_bucket{phase="parse",le="0.0025"} 0\n' in text
+    assert 'phase_seconds_bucket{phase="parse",le="0.005"} 1\n' in text
+    assert 'phase_seconds_bucket{phase="parse",le="+Inf"} 2\n' in text
+    assert 'phase_seconds_count{phase="parse"} 2\n' in text
+    assert "batch_seconds 1.5\n" in text
+
+    with pytest.raises(ValueError):
+        registry.counter("docs_total", "Documents.").inc(parser="x")
+    with pytest.raises(ValueError):
+        registry.gauge("docs_total", "Documents.")
+
+
+def test_like() -> None:
+    """A registry can define a metric like another registry's."""
+    registry = MetricsRegistry()
+    documents = registry.like(DOCUMENTS)
+    assert isinstance(documents, Counter)
+    assert documents is not DOCUMENTS
+    assert documents.name == DOCUMENTS.name
+    assert documents.documentation == DOCUMENTS.documentation
+    assert documents.labelnames == ("parser", "status")
+    assert registry.like(DOCUMENTS) is documents
+
+
+def test_write_metrics(tmp_path: Path) -> None:
+    registry = MetricsRegistry()
+    registry.counter("docs_total", 'Documents "built".').inc(2)
+    write_metrics(registry, tmp_path / "metrics" / "lander.prom")
+
+    assert (tmp_path / "metrics" / "lander.prom").read_text() == (
+        '# HELP docs_total Documents "built".\n'
+        "# TYPE docs_total counter\n"
+        "docs_total 2\n"
+    )
+    snapshot = json.loads((tmp_path / "metrics" / "lander.json").read_text())
+    assert snapshot["docs_total"]["samples"] == [{"labels": {}, "value": 2}]
+    # No temporary files are left behind
+    assert sorted(p.name for p in (tmp_path / "metrics").iterdir()) == [
+        "lander.json",
+        "lander.prom",
+    ]
+
+
+def test_batch_metrics(tmp_path: Path) -> None:
+    """A batch build writes the metrics merged from its workers."""
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+documents:
+  - source: {DATA_ROOT}/pipeline-module/ssdc-ms-001.tex
+    pdf: {DATA_ROOT}/pipeline-module/SSDC-MS-001.pdf
+    parser: spherex-ssdc-ms
+    output: {tmp_path}/ssdc-ms-001
+  - source: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.tex
+    pdf: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.pdf
+    output: {tmp_path}/ssdc-tr-000
+"""
+    )
+    metrics_path = tmp_path / "lander.prom"
+    result = CliRunner().invoke(
+        app,
+        [
+            "batch",
+            "--manifest",
+            str(manifest_path),
+            "--workers",
+            "2",
+            "--metrics",
+            str(metrics_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    text = metrics_path.read_text()
+    assert (
+        'spherex_lander_documents_total{parser="spherex-ssdc-ms",'
+        'status="built"} 1\n'
+    ) in text
+    assert (
+        'spherex_lander_documents_total{parser="spherex-ssdc-tr",'
+        'status="built"} 1\n'
+    ) in text
+    assert (
+        'spherex_lander_phase_duration_seconds_count{phase="parse"} 2\n'
+    ) in text
+    assert 'spherex_lander_download_bytes_written_total{kind="pdf"}' in text
+    assert "spherex_lander_batch_completion_timestamp_seconds " in text
+
+    snapshot = json.loads(metrics_path.with_suffix(".json").read_text())
+    renders = snapshot["spherex_lander_phase_duration_seconds"]["samples"]
+    assert "render" in [s["labels"]["phase"] for s in renders]
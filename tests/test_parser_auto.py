@@ -0,0 +1,105 @@
+"""Tests for the spherexlander.parsers.auto module."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+from lander.plugins import parsers
+from lander.settings import BuildSettings
+
+from spherexlander.parsers import auto
+from spherexlander.parsers.auto import detect_document_type
+from spherexlander.parsers.ssdctr import SpherexSsdcTrParser
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize(
+    "header,document_type",
+    [
+        ("\\documentclass[MS]{spherex}\n", "MS"),
+        ("\\documentclass[ lsstdraft, tr ]{spherex}\n", "TR"),
+        (
+            "% \\documentclass[MS]{spherex}\n"
+            "\\documentclass{spherex}\n"
+            "\\spherexHandle{SSDC-IF-002}\n",
+            "IF",
+        ),
+        ("\\documentclass[11pt]{spherex}\n\\spherexHandle{SSDC-TN-001}", "TN"),
+    ],
+)
+def test_detect_document_type(
+    tmp_path: Path, header: str, document_type: str
+) -> None:
+    source_path = tmp_path / "doc.tex"
+    source_path.write_text(header + "\\begin{document}\n\\end{document}\n")
+    assert detect_document_type(source_path) == document_type
+
+
+def test_detect_from_input(tmp_path: Path) -> None:
+    """The handle is found in a file that the preamble inputs."""
+    (tmp_path / "handle.tex").write_text("\\spherexHandle{SSDC-DP-003}\n")
+    source_path = tmp_path / "doc.tex"
+    source_path.write_text(
+        "\\documentclass{spherex}\n\\input{handle}\n\\begin{document}\n"
+    )
+    assert detect_document_type(source_path) == "DP"
+
+
+def test_undetected_type(tmp_path: Path) -> None:
+    source_path = tmp_path / "doc.tex"
+    source_path.write_text("\\documentclass{article}\n\\begin{document}\n")
+    with pytest.raises(ValueError):
+        detect_document_type(source_path)
+
+
+def test_memoized(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A document is only sniffed again when its header changes."""
+    sniffed: List[str] = []
+    sniff = auto._sniff
+
+    def record_sniff(tex_source: str) -> Optional[str]:
+        sniffed.append(tex_source)
+        return sniff(tex_source)
+
+    monkeypatch.setattr(auto, "_sniff", record_sniff)
+    source_path = tmp_path / "doc.tex"
+    source_path.write_text("\\documentclass[OP]{spherex}\n% memo test\n")
+    assert detect_document_type(source_path) == "OP"
+    assert detect_document_type(source_path) == "OP"
+    assert len(sniffed) == 1
+
+    source_path.write_text("\\documentclass[PM]{spherex}\n% memo test\n")
+    assert detect_document_type(source_path) == "PM"
+    assert len(sniffed) == 2
+
+
+def test_auto_parser() -> None:
+    """The spherex parser delegates to the document type's parser."""
+    root = DATA_DIR / "ssdc-tr-req"
+    settings = BuildSettings.load(
+        source_path=root / "SSDC-TR-000.tex",
+        pdf=root / "SSDC-TR-000.pdf",
+        output_dir=Path("_build"),
+        parser="spherex",
+        theme="spherex",
+    )
+    parser = parsers["spherex"](settings=settings)
+
+    assert type(parser) is SpherexSsdcTrParser
+    assert parser.metadata.identifier == "SSDC-TR-000"
+    assert parser.metadata == SpherexSsdcTrParser(settings=settings).metadata
+
+
+def test_parser_names(tmp_path: Path) -> None:
+    """Each document type's parser has a plugin named after the type."""
+    source_path = tmp_path / "doc.tex"
+    for document_type, (_, class_name) in auto.DOCUMENT_PARSERS.items():
+        source_path.write_text(
+            f"\\documentclass[{document_type}]{{spherex}}\n"
+        )
+        name = auto.get_parser_name(source_path)
+        assert name == f"spherex-ssdc-{document_type.lower()}"
+        assert parsers[name].__name__ == class_name
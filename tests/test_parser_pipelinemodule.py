@@ -43,3 +43,8 @@ def test_demodoc() -> None:
     assert m.authors[3].name == "Efren Archer"
     assert m.authors[3].email == "efren@example.com"
     assert m.approval is None
+
+    assert m.pdf_info is not None
+    assert m.pdf_info.pdf_version == "1.5"
+    assert m.pdf_info.page_count == 2
+    assert not m.pdf_info.linearized
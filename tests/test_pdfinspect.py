@@ -0,0 +1,173 @@
+"""Tests for the spherexlander.parsers.pdfinspect module."""
+
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from spherexlander.parsers.pdfinspect import (
+    PdfError,
+    cross_check_pdf,
+    inspect_pdf,
+    parse_pdf_date,
+)
+from spherexlander.parsers.spherexdata import PdfInfo
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def build_pdf(
+    objects: List[bytes], *, linearized: bool = False, update: bytes = b""
+) -> bytes:
+    """Build a PDF with a classic cross-reference table.
+
+    Objects are numbered from 1, and the first three are the catalog, the
+    page tree, and the information dictionary. If ``linearized``, a
+    linearization dictionary with the file's length comes first. ``update``
+    is a new information dictionary that is appended as an incremental
+    update.
+    """
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    if linearized:
+        objects = [b"<</Linearized 1/L 0000000000>>", *objects]
+    body = bytearray(header)
+    offsets = []
+    for number, content in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, content)
+    xref_offset = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        body += b"%010d 00000 n \n" % offset
+    root = 2 if linearized else 1
+    info = root + 2
+    body += b"trailer\n<</Size %d/Root %d 0 R/Info %d 0 R>>\n" % (
+        len(objects) + 1,
+        root,
+        info,
+    )
+    body += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+    if linearized:
+        body = body.replace(b"0000000000>>", b"%010d>>" % len(body), 1)
+    if update:
+        update_offset = len(body)
+        body += b"%d 0 obj\n%s\nendobj\n" % (info, update)
+        update_xref = len(body)
+        body += b"xref\n%d 1\n%010d 00000 n \n" % (info, update_offset)
+        body += b"trailer\n<</Size %d/Root %d 0 R/Info %d 0 R/Prev %d>>\n" % (
+            len(objects) + 1,
+            root,
+            info,
+            xref_offset,
+        )
+        body += b"startxref\n%d\n%%%%EOF\n" % update_xref
+    return bytes(body)
+
+
+TITLE = "SSDC MS-001 “v2.0”"
+
+OBJECTS = [
+    b"<</Type/Catalog/Pages 2 0 R>>",
+    b"<</Type/Pages/Kids[]/Count 12>>",
+    b"<</Title <FEFF%s>" % TITLE.encode("utf-16-be").hex().encode("ascii")
+    + b"/Author (Ada \\(Countess\\) Lovelace\\222s)"
+    + b"/CreationDate (D:20240102030405+01'30')>>",
+]
+
+
+def test_classic_xref(tmp_path: Path) -> None:
+    path = tmp_path / "document.pdf"
+    path.write_bytes(build_pdf(OBJECTS))
+
+    info = inspect_pdf(path)
+    assert info.pdf_version == "1.4"
+    assert info.page_count == 12
+    assert not info.linearized
+    assert not info.encrypted
+    assert info.title == TITLE
+    assert info.author == "Ada (Countess) Lovelace™s"
+    assert info.creation_date == datetime.datetime(
+        2024,
+        1,
+        2,
+        3,
+        4,
+        5,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=1, minutes=30)),
+    )
+
+
+def test_linearized_and_updated(tmp_path: Path) -> None:
+    path = tmp_path / "linearized.pdf"
+    objects = [
+        b"<</Type/Catalog/Pages 3 0 R/Version/1.7>>",
+        b"<</Type/Pages/Kids[]/Count 1>>",
+        b"<</Title(SSDC-TR-001 Version 1.0)>>",
+    ]
+    path.write_bytes(build_pdf(objects, linearized=True))
+    info = inspect_pdf(path)
+    assert info.linearized
+    assert info.pdf_version == "1.7"
+    assert info.title == "SSDC-TR-001 Version 1.0"
+
+    # An incremental update replaces the information dictionary, and the
+    # file is no longer linearized
+    data = build_pdf(
+        objects, linearized=True, update=b"<</Title(SSDC-TR-001 Version 1.1)>>"
+    )
+    path.write_bytes(data)
+    info = inspect_pdf(path)
+    assert info.title == "SSDC-TR-001 Version 1.1"
+    assert not info.linearized
+
+
+def test_xref_stream() -> None:
+    """The samples have cross-reference streams and object streams."""
+    info = inspect_pdf(DATA_ROOT / "ssdc-tr-req" / "SSDC-TR-000.pdf")
+    assert info.pdf_version == "1.5"
+    assert info.page_count == 3
+    assert info.title is None
+    assert info.creation_date == datetime.datetime(
+        2023,
+        1,
+        11,
+        11,
+        32,
+        36,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=-5)),
+    )
+
+
+def test_invalid_pdf(tmp_path: Path) -> None:
+    path = tmp_path / "document.pdf"
+    path.write_bytes(b"%PDF-1.4\nnot really a PDF\n")
+    with pytest.raises(PdfError):
+        inspect_pdf(path)
+    path.write_bytes(b"")
+    with pytest.raises(PdfError):
+        inspect_pdf(path)
+
+
+def test_parse_pdf_date() -> None:
+    assert parse_pdf_date("D:2021") == datetime.datetime(2021, 1, 1)
+    assert parse_pdf_date("D:20210527184225Z") == datetime.datetime(
+        2021, 5, 27, 18, 42, 25, tzinfo=datetime.timezone.utc
+    )
+    assert parse_pdf_date("D:20211332") is None
+    assert parse_pdf_date("yesterday") is None
+
+
+def test_cross_check() -> None:
+    info = PdfInfo(title="SSDC-MS-002: Forced photometry", subject="v1.2")
+    assert cross_check_pdf(info, handle="SSDC-MS-002", version="1.2") == []
+    assert cross_check_pdf(info, handle="SSDC-MS-001", version="1.3") == [
+        "The PDF's metadata names SSDC-MS-002, but the document's handle is "
+        "SSDC-MS-001",
+        "The PDF's metadata has version 1.2, but the document's version is "
+        "1.3",
+    ]
+    # PDFs that don't state a handle or version match any document
+    assert cross_check_pdf(PdfInfo(), handle="SSDC-MS-001", version="1") == []
@@ -0,0 +1,132 @@
+"""Tests for the spherexlander.placement module."""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from spherexlander import placement
+from spherexlander.placement import (
+    PlacementMethod,
+    PlacementStrategy,
+    place_file,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_unsupported() -> None:
+    placement._unsupported.clear()
+
+
+def write_source(tmp_path: Path, data: bytes = b"%PDF-1.7\n" * 1000) -> Path:
+    source = tmp_path / "source" / "document.pdf"
+    source.parent.mkdir()
+    source.write_bytes(data)
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    return source
+
+
+def test_copy(tmp_path: Path) -> None:
+    """A copy hashes the file, and a later placement leaves it in place."""
+    source = write_source(tmp_path)
+    destination = tmp_path / "site" / "document.pdf"
+
+    placed = place_file(source, destination, PlacementStrategy.copy)
+    assert placed.method == PlacementMethod.copy
+    assert placed.size == 9000
+    assert placed.sha256 == hashlib.sha256(source.read_bytes()).hexdigest()
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mtime_ns == source.stat().st_mtime_ns
+    assert not destination.samefile(source)
+
+    placed = place_file(source, destination, PlacementStrategy.copy)
+    assert placed.method == PlacementMethod.unchanged
+    assert placed.sha256 is None
+
+    # The content is compared if only the modification time differs
+    os.utime(destination, ns=(2_000_000_000, 2_000_000_000))
+    placed = place_file(source, destination, PlacementStrategy.copy)
+    assert placed.method == PlacementMethod.unchanged
+    assert placed.sha256 is not None
+    destination.write_bytes(b"%PDF-1.6\n" * 1000)
+    placed = place_file(source, destination, PlacementStrategy.copy)
+    assert placed.method == PlacementMethod.copy
+    assert destination.read_bytes() == source.read_bytes()
+    assert list(destination.parent.iterdir()) == [destination]
+
+
+def test_link(tmp_path: Path) -> None:
+    """Hard links replace the destination, rather than writing through."""
+    source = write_source(tmp_path)
+    destination = tmp_path / "site" / "document.pdf"
+    destination.parent.mkdir()
+    destination.write_bytes(b"old")
+    other = tmp_path / "other.pdf"
+    os.link(destination, other)
+
+    placed = place_file(source, destination, PlacementStrategy.link)
+    assert placed.method in (PlacementMethod.reflink, PlacementMethod.hardlink)
+    assert destination.read_bytes() == source.read_bytes()
+    assert other.read_bytes() == b"old"
+    if placed.method == PlacementMethod.hardlink:
+        assert destination.samefile(source)
+    assert (
+        place_file(source, destination, PlacementStrategy.link).method
+        == PlacementMethod.unchanged
+    )
+
+
+def test_fallback(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Methods that aren't supported fall through to the next method."""
+    calls = []
+
+    def unsupported(*args: object, **kwargs: object) -> None:
+        calls.append(args)
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", unsupported)
+    monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+    monkeypatch.setattr(os, "sendfile", unsupported, raising=False)
+    monkeypatch.setattr(
+        placement,
+        "_methods",
+        lambda strategy: [
+            PlacementMethod.hardlink,
+            PlacementMethod.copy_file_range,
+            PlacementMethod.sendfile,
+            PlacementMethod.copy,
+        ],
+    )
+    source = write_source(tmp_path)
+
+    placed = place_file(source, tmp_path / "a.pdf", PlacementStrategy.link)
+    assert placed.method == PlacementMethod.copy
+    assert placed.sha256 is not None
+    assert (tmp_path / "a.pdf").read_bytes() == source.read_bytes()
+    assert len(calls) == 3
+
+    # Unsupported methods aren't tried again for the same devices
+    place_file(source, tmp_path / "b.pdf", PlacementStrategy.link)
+    assert len(calls) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "a.pdf",
+        "b.pdf",
+        "source",
+    ]
+
+
+def test_kernel_copy(tmp_path: Path) -> None:
+    """The reflink strategy copies within the kernel if it can't reflink."""
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    source = write_source(tmp_path, data)
+    destination = tmp_path / "site" / "document.pdf"
+
+    placed = place_file(source, destination, PlacementStrategy.reflink)
+    assert placed.method != PlacementMethod.hardlink
+    assert placed.size == len(data)
+    assert destination.read_bytes() == data
+    assert not destination.samefile(source)
@@ -0,0 +1,115 @@
+"""Tests for the spherexlander.sidecar module and re-rendering sites."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from spherexlander.batch import (
+    BuildStatus,
+    load_manifest,
+    run_batch,
+    run_rerender,
+)
+from spherexlander.parsers.spherexparser import SpherexParser
+from spherexlander.sidecar import MetadataSidecar, find_sites, sidecar_path
+
+DATA_ROOT = Path(__file__).parent / "data"
+
+
+def build_sites(tmp_path: Path) -> None:
+    manifest_path = tmp_path / "manifest.yaml"
+    manifest_path.write_text(
+        f"""
+documents:
+  - source: {DATA_ROOT}/pipeline-module/ssdc-ms-001.tex
+    pdf: {DATA_ROOT}/pipeline-module/SSDC-MS-001.pdf
+    parser: spherex-ssdc-ms
+    output: _build/ssdc-ms-001
+  - source: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.tex
+    pdf: {DATA_ROOT}/ssdc-tr-req/SSDC-TR-000.pdf
+    parser: spherex-ssdc-tr
+    output: _build/ssdc-tr-000
+    url: https://example.com/ssdc-tr-000/
+"""
+    )
+    report = run_batch(load_manifest(manifest_path), max_workers=1)
+    assert report.counts["built"] == 2
+
+
+def test_sidecar(tmp_path: Path) -> None:
+    build_sites(tmp_path)
+    output_dir = tmp_path / "_build" / "ssdc-tr-000"
+    sidecar = MetadataSidecar.read(output_dir)
+    assert sidecar is not None
+    assert sidecar.parser == "spherex-ssdc-tr"
+    assert sidecar.canonical_url == "https://example.com/ssdc-tr-000/"
+    assert sidecar.source_path == DATA_ROOT.resolve().joinpath(
+        "ssdc-tr-req", "SSDC-TR-000.tex"
+    )
+
+    metadata = sidecar.load_metadata()
+    assert type(metadata).__name__ == "SpherexSsdcTrMetadata"
+    assert metadata.json() == (output_dir / "metadata.json").read_text()
+    settings = sidecar.load_settings(output_dir)
+    assert settings.output_dir == output_dir
+    assert settings.pdf.name == "SSDC-TR-000.pdf"
+
+
+def test_sidecar_outside_site(tmp_path: Path) -> None:
+    """The sidecar and manifest aren't published with the site, since they
+    have the build host's paths.
+    """
+    output_dir = tmp_path / "_build" / "ssdc-ms-001"
+    output_dir.mkdir(parents=True)
+    legacy_path = output_dir / ".spherex-metadata.json"
+    legacy_path.write_text("{}")
+    build_sites(tmp_path)
+
+    assert sidecar_path(output_dir) == output_dir.with_name(
+        "ssdc-ms-001.spherex-metadata.json"
+    )
+    assert sidecar_path(output_dir).exists()
+    assert not legacy_path.exists()
+    assert find_sites(output_dir) == [output_dir]
+    for path in output_dir.rglob("*"):
+        if path.is_file():
+            assert str(DATA_ROOT) not in path.read_text(errors="ignore")
+
+
+def test_rerender(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sites are rendered from their sidecars, without parsing."""
+    build_sites(tmp_path)
+    output_dirs = find_sites(tmp_path / "_build")
+    assert output_dirs == [
+        tmp_path / "_build" / "ssdc-ms-001",
+        tmp_path / "_build" / "ssdc-tr-000",
+    ]
+
+    # Edit the sidecar's metadata to show that the page is rendered from it
+    path = sidecar_path(output_dirs[0])
+    data = json.loads(path.read_text())
+    data["metadata"]["title"] = "Perform Forced Photometry Again"
+    path.write_text(json.dumps(data))
+    (output_dirs[1] / "index.html").unlink()
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("The document was parsed")
+
+    monkeypatch.setattr(SpherexParser, "__init__", fail)
+    report = run_rerender(output_dirs, max_workers=1)
+
+    assert [r.status for r in report.results] == [BuildStatus.built] * 2
+    assert (
+        "Perform Forced Photometry Again"
+        in (output_dirs[0] / "index.html").read_text()
+    )
+    assert (output_dirs[1] / "index.html").exists()
+
+
+def test_rerender_without_sidecar(tmp_path: Path) -> None:
+    report = run_rerender([tmp_path], max_workers=1)
+    assert report.results[0].status == BuildStatus.failed
+    assert "metadata sidecar" in (report.results[0].error or "")
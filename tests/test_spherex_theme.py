@@ -7,6 +7,7 @@ import logging
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+import pytest
 from lander.ext.theme import ThemePluginDirectory
 from lander.settings import BuildSettings
 
@@ -14,6 +15,13 @@ from spherexlander.parsers.pipelinemodule import SpherexPipelineModuleParser
 from spherexlander.parsers.projectmanagement import (
     SpherexProjectManagementParser,
 )
+from spherexlander.themes.spherex import SpherexTheme
+from spherexlander.themes.spherex.badges import (
+    badge,
+    difficulty_color,
+    pipeline_level_color,
+    render_badge_svg,
+)
 
 if TYPE_CHECKING:
     from _pytest.logging import LogCaptureFixture
@@ -73,6 +81,8 @@ def test_spherex_pipelinemodule(
     assert metadata["pipeline_level"] == "L3"
     assert metadata["diagram_index"] == 2
     assert metadata["difficulty"] == "High"
+    assert metadata["pdf_info"]["page_count"] == 2
+    assert "(2 pages, 33 kB)" in index_html_path.read_text()
 
 
 def test_spherex_projectmanagement(
@@ -126,3 +136,84 @@ def test_spherex_projectmanagement(
 
     metadata = json.loads(metadata_path.read_text())
     assert metadata["title"] == "Example Title"
+
+
+def test_precompile_templates(
+    cache_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Precompiled templates are reused from the bytecode cache by a new
+    Jinja environment.
+    """
+    names = SpherexTheme.precompile_templates()
+    assert names[:2] == ["$spherex/index.html.jinja", "$base/index.html.jinja"]
+    cache_files = sorted((cache_dir / "jinja").iterdir())
+    assert len(cache_files) == len(names)
+    mtimes = [p.stat().st_mtime_ns for p in cache_files]
+
+    monkeypatch.setattr(SpherexTheme, "_shared_jinja_env", None)
+    SpherexTheme.precompile_templates()
+    assert [p.stat().st_mtime_ns for p in cache_files] == mtimes
+
+
+def test_bytecode_cache_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SPHEREX_LANDER_CACHE_ENABLED", "false")
+    SpherexTheme.precompile_templates()
+    env = SpherexTheme._shared_jinja_env
+    assert env is not None
+    assert env.bytecode_cache is None
+
+
+def test_badges(temp_cwd: Path) -> None:
+    """Badges are inlined as SVG rather than linked from shields.io."""
+    root_dir = Path(__file__).parent / "data" / "pipeline-module"
+    settings = BuildSettings.load(
+        source_path=root_dir / "ssdc-ms-001.tex",
+        pdf=root_dir / "SSDC-MS-001.pdf",
+        output_dir=temp_cwd / "_build",
+        parser="spherex-pipeline-module",
+        theme="spherex",
+    )
+    parser = SpherexPipelineModuleParser(settings=settings)
+    SpherexTheme(metadata=parser.metadata, settings=settings).build_site()
+
+    html = (temp_cwd / "_build" / "index.html").read_text()
+    assert "shields.io" not in html
+    assert 'aria-label="Pipeline: L3"' in html
+    assert 'aria-label="Diagram Index: 2"' in html
+    assert 'aria-label="Difficulty: High"' in html
+    assert html.count('fill="#BEB1D0"') == 2
+    assert 'fill="#E05D44"' in html
+
+
+def test_render_badge_svg() -> None:
+    render_badge_svg.cache_clear()
+    svg = badge("Pipeline", "L1", pipeline_level_color("L1"))
+    assert svg.startswith("<svg")
+    assert 'fill="#88BFFE"' in svg
+    assert badge("Pipeline", "L1", "88BFFE") == svg
+    assert render_badge_svg.cache_info().hits == 1
+
+    assert pipeline_level_color("L4") == "FEBCFF"
+    assert difficulty_color("Medium") == "yellow"
+    assert difficulty_color("Unknown") == "blue"
+    assert "&lt;b&gt;" in badge("Value", "<b>", "blue")
+
+
+def test_instance_state(temp_cwd: Path) -> None:
+    """Theme instances don't share the state of the sites they build."""
+    root_dir = Path(__file__).parent / "data" / "pipeline-module"
+    settings = BuildSettings.load(
+        source_path=root_dir / "ssdc-ms-001.tex",
+        pdf=root_dir / "SSDC-MS-001.pdf",
+        output_dir=temp_cwd / "_build",
+        parser="spherex-pipeline-module",
+        theme="spherex",
+    )
+    metadata = SpherexPipelineModuleParser(settings=settings).metadata
+    themes = [
+        SpherexTheme(metadata=metadata, settings=settings) for _ in range(2)
+    ]
+    assert themes[0]._downloads is not themes[1]._downloads
+    assert themes[0]._images is not themes[1]._images
+    assert "_downloads" not in vars(SpherexTheme)
+    assert "_images" not in vars(SpherexTheme)
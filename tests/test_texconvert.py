@@ -0,0 +1,225 @@
+"""Tests for the spherexlander.parsers.texconvert module."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+from lander.settings import BuildSettings
+
+from spherexlander.parsers import texconvert
+from spherexlander.parsers.pipelinemodule import SpherexPipelineModuleParser
+from spherexlander.parsers.texconvert import (
+    convert_simple_tex_span,
+    convert_tex_span,
+    convert_tex_spans,
+)
+
+SPANS = [
+    "Ursula Gomez",
+    r"Ren\'e Descartes",
+    r"{\"O}zil~M.",
+    r"\textit{Foo} \textbf{Bar}",
+    "O'Brien -- Smith",
+    "First paragraph\n\nSecond paragraph",
+    "Ursula Gomez",
+]
+
+
+def count_pandoc_runs(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Record the content of each pandoc invocation, with the conversion
+    cache disabled.
+    """
+    monkeypatch.setenv("SPHEREX_LANDER_CACHE_ENABLED", "false")
+    runs: List[str] = []
+    run_pandoc = texconvert._run_pandoc
+
+    def _run_pandoc(content: str) -> str:
+        runs.append(content)
+        return run_pandoc(content)
+
+    monkeypatch.setattr(texconvert, "_run_pandoc", _run_pandoc)
+    return runs
+
+
+def test_batch_matches_individual(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Batched conversion gives the same output as converting each span."""
+    expected = [convert_tex_span(span) for span in SPANS]
+    runs = count_pandoc_runs(monkeypatch)
+    assert convert_tex_spans(SPANS) == expected
+    assert len(runs) == 1
+
+
+def test_batch_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Spans that fail in a batch are converted individually."""
+    spans = ["Smith -- Jones", r"{\bf unbalanced", "Wait..."]
+    runs = count_pandoc_runs(monkeypatch)
+    with pytest.raises(RuntimeError):
+        convert_tex_spans(spans)
+    # The batch, then the individual spans until the unbalanced one fails
+    assert len(runs) == 3
+
+
+def test_unbatchable_spans(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Macro definitions in one span do not affect other spans."""
+    spans = [r"\newcommand{\x}{y}\x", r"\x{} Gomez", "Efren Archer"]
+    expected = [convert_tex_span(span) for span in spans]
+    runs = count_pandoc_runs(monkeypatch)
+    assert convert_tex_spans(spans) == expected
+    assert len(runs) == 2
+
+
+def test_empty_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    runs = count_pandoc_runs(monkeypatch)
+    assert convert_tex_spans([]) == []
+    assert runs == []
+
+
+def test_batch_with_simple_spans(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Only spans outside the simple subset are converted by pandoc."""
+    spans = ["Ursula Gomez", r"\'Eric $x^2$", r"Z\"urich \& Co."]
+    runs = count_pandoc_runs(monkeypatch)
+    converted = convert_tex_spans(spans)
+    assert runs == [r"\'Eric $x^2$"]
+    assert converted[0] == "Ursula Gomez\n"
+    assert converted[2] == "Zürich & Co.\n"
+
+
+def test_parser_single_invocation(monkeypatch: pytest.MonkeyPatch) -> None:
+    """All author names in a document are converted by one pandoc run."""
+    data_root = Path(__file__).parent / "data" / "pipeline-module"
+    settings = BuildSettings.load(
+        source_path=data_root / "ssdc-ms-001.tex",
+        pdf=data_root / "SSDC-MS-001.pdf",
+        output_dir=Path("_build"),
+        parser="spherex-pipeline-module",
+        theme="spherex",
+    )
+    runs = count_pandoc_runs(monkeypatch)
+    parser = SpherexPipelineModuleParser(settings=settings)
+    assert len(parser.metadata.authors) == 4
+    # The sample's names are all converted without pandoc
+    assert len(runs) == 0
+
+
+SIMPLE_CORPUS = [
+    "Ursula Gomez",
+    "  Ursula   Gomez  ",
+    "Ursula\nGomez",
+    "Ursula \n  Gomez",
+    "A. B. Smith, Jr.",
+    "Smith, J. (NASA/JPL)",
+    "x ,y; z: w! v? u @ t + s = r * q",
+    "Jean-Luc Picard",
+    "O'Brien",
+    "D'Angelo O'Neil",
+    "José Núñez",
+    "Ångström",
+    "李小龍",
+    "Agent 007",
+    r"Ren\'e Descartes",
+    r"Ren\'{e} Descartes",
+    r"{\'e}",
+    r"{\"O}zil",
+    r"\"{O}zil",
+    r"\"Ozil",
+    r"G\"odel",
+    r"Fran\c{c}ois",
+    r"Fran{\c{c}}ois",
+    r"\v{S}koda",
+    r"Erd\H{o}s",
+    r"\k{a}",
+    r"\r{a}",
+    r"Do\u{g}an",
+    r"\={a}",
+    r"\.{Z}",
+    r"Ma\~nana",
+    r"P\^ole",
+    r"\`a la",
+    r"\'x",
+    r"Gau\ss",
+    r"Gau\ss{}",
+    r"\ss x",
+    r"\ss{} x",
+    r"\o{}ster",
+    r"\O{}sterberg",
+    r"\ae{}sop",
+    r"\AE",
+    r"\oe uvre",
+    r"\OE{}",
+    r"\aa{}",
+    r"\AA{}ngstr\"om",
+    r"\l{}ukasz",
+    r"\L{}od\'z",
+    r"\i",
+    r"AT\&T",
+    r"50\% \$5 \#1 a\_b \{x\}",
+    "Jane~Doe",
+    "Jane~ Doe",
+    "~Jane",
+    "Jane~",
+    "{Jane} {Doe}",
+    "{{Jane}}Doe",
+    r"\textit{Jane} Doe",
+    r"\textbf{Jane} \textit{Doe}",
+    r"\textbf{\textit{Jane}} Doe",
+    r"\textit{Ren\'e}",
+]
+"""TeX spans that are converted by `convert_simple_tex_span`."""
+
+UNSUPPORTED_CORPUS = [
+    "Smith -- Jones",
+    "Smith --- Jones",
+    "Wait...",
+    "'quoted'",
+    "``quoted''",
+    '"quoted"',
+    "First paragraph\n\nSecond paragraph",
+    "$x^2$",
+    "a < b",
+    r"\emph{Jane}",
+    r"\textit { Jane}",
+    r"\textbf{ Jane}",
+    "{ Jane }",
+    r"\c c",
+    r"\'{\i}",
+    r"Jane\ Doe",
+    r"Jane\\Doe",
+    r"\LaTeX",
+    r"\ss*x",
+    r"\ss *x",
+    "{Unbalanced",
+    "Unbalanced}",
+    "",
+    "{}",
+    r"\textit{}",
+]
+"""TeX spans that must be converted by pandoc."""
+
+
+@pytest.fixture(scope="module")
+def pandoc_conversions() -> Dict[str, str]:
+    """Pandoc conversions of the simple corpus, from a pandoc run per span
+    (so that the comparison doesn't depend on batching).
+    """
+    with ThreadPoolExecutor() as executor:
+        converted = executor.map(texconvert._run_pandoc, SIMPLE_CORPUS)
+        return dict(zip(SIMPLE_CORPUS, converted))
+
+
+@pytest.mark.parametrize("content", SIMPLE_CORPUS)
+def test_simple_span_matches_pandoc(
+    content: str, pandoc_conversions: Dict[str, str]
+) -> None:
+    """The fast path gives byte-identical output to pandoc."""
+    converted = convert_simple_tex_span(content)
+    assert converted is not None
+    assert converted == pandoc_conversions[content]
+
+
+@pytest.mark.parametrize("content", UNSUPPORTED_CORPUS)
+def test_unsupported_span(content: str) -> None:
+    """Spans outside the simple subset are not converted by the fast path."""
+    assert convert_simple_tex_span(content) is None
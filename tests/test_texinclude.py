@@ -0,0 +1,133 @@
+"""Tests for the spherexlander.parsers.texinclude module."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+from lander.ext.parser.texutils.normalize import read_tex_file
+
+from spherexlander.cache import ContentCache
+from spherexlander.parsers.texinclude import (
+    IncludeCache,
+    IncludeGraph,
+    get_include_graph,
+    read_tex_source,
+)
+from spherexlander.parsers.texstream import read_tex_preamble
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def write_documents(directory: Path) -> None:
+    """Write two documents that input a shared file."""
+    (directory / "shared.tex").write_text(
+        "\\newcommand{\\project}{SPHEREx}  % the project\n"
+    )
+    for name in ("a", "b"):
+        (directory / f"{name}.tex").write_text(
+            "\\documentclass{spherex}\n"
+            "\\input{shared}\n"
+            f"\\title{{Document {name}}}\n"
+            "\\begin{document}\n"
+            f"\\input{{body-{name}}}\n"
+            "\\end{document}\n"
+        )
+        (directory / f"body-{name}.tex").write_text(f"Body {name}.\n")
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "pipeline-module/ssdc-ms-001.tex",
+        "pm-document/SSDC-PM-001.tex",
+        "ssdc-tr-req/SSDC-TR-000.tex",
+    ],
+)
+def test_read_tex_source(path: str) -> None:
+    """The source is the same as the source from lander's read_tex_file."""
+    source_path = DATA_DIR / path
+    cache = IncludeCache()
+    assert read_tex_source(source_path, cache=cache) == read_tex_file(
+        source_path
+    )
+    assert read_tex_source(source_path, cache=cache) == read_tex_file(
+        source_path
+    )
+    assert cache.misses == 2
+    assert cache.hits == 2
+
+
+def test_shared_include(tmp_path: Path) -> None:
+    write_documents(tmp_path)
+    cache = IncludeCache()
+    graph = IncludeGraph()
+
+    read_tex_source(tmp_path / "a.tex", cache=cache, graph=graph)
+    assert cache.misses == 3
+    read_tex_source(tmp_path / "b.tex", cache=cache, graph=graph)
+    # The shared file is read once
+    assert cache.misses == 5
+    assert cache.hits == 1
+
+    shared_path = tmp_path / "shared.tex"
+    assert graph.dependents(shared_path) == {
+        tmp_path / "a.tex",
+        tmp_path / "b.tex",
+    }
+    assert graph.dependents(tmp_path / "body-a.tex") == {tmp_path / "a.tex"}
+    assert graph.dependents(tmp_path / "a.tex") == {tmp_path / "a.tex"}
+    assert graph.includes(tmp_path / "b.tex") == {
+        shared_path,
+        tmp_path / "body-b.tex",
+    }
+
+    # A touched file isn't normalized again
+    stat = shared_path.stat()
+    os.utime(shared_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    read_tex_source(tmp_path / "a.tex", cache=cache, graph=graph)
+    assert cache.misses == 5
+
+    # An edited file is
+    shared_path.write_text("\\newcommand{\\project}{SPHEREx mission}\n")
+    os.utime(
+        shared_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9)
+    )
+    source = read_tex_source(tmp_path / "a.tex", cache=cache, graph=graph)
+    assert cache.misses == 6
+    assert "SPHEREx mission" in source
+
+
+def test_persistent_cache(tmp_path: Path) -> None:
+    write_documents(tmp_path)
+    persistent = ContentCache(tmp_path / "cache", max_size=1024 * 1024)
+    read_tex_source(tmp_path / "a.tex", cache=IncludeCache(persistent))
+
+    cache = IncludeCache(persistent)
+    read_tex_source(tmp_path / "a.tex", cache=cache)
+    assert cache.misses == 0
+    assert cache.hits == 3
+
+
+def test_preamble_graph(tmp_path: Path) -> None:
+    """The preamble reader records the files that the preamble includes."""
+    write_documents(tmp_path)
+    graph = IncludeGraph()
+    preamble = read_tex_preamble(tmp_path / "a.tex", graph=graph)
+
+    assert "\\newcommand{\\project}{SPHEREx}\n" in preamble
+    assert graph.includes(tmp_path / "a.tex") == {tmp_path / "shared.tex"}
+
+
+def test_missing_include(tmp_path: Path) -> None:
+    write_documents(tmp_path)
+    (tmp_path / "body-a.tex").unlink()
+    with pytest.raises(ValueError):
+        read_tex_source(tmp_path / "a.tex", cache=IncludeCache())
+
+
+def test_process_graph(tmp_path: Path) -> None:
+    write_documents(tmp_path)
+    read_tex_source(tmp_path / "b.tex")
+    assert tmp_path / "b.tex" in get_include_graph().documents
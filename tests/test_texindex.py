@@ -0,0 +1,141 @@
+"""Tests for the spherexlander.parsers.texindex module."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from lander.ext.parser.texutils.extract import (
+    LaTeXCommand,
+    LaTeXCommandElement,
+)
+from lander.ext.parser.texutils.normalize import read_tex_file
+
+from spherexlander.parsers.texindex import TexCommandIndex
+
+SAMPLE = r"""
+\documentclass[MS]{spherex}
+\title[Short]{A {Nested} Title}
+\titlename{Not a title}
+\version {1.1}
+\author{
+  \person[email=a@example.com]{Ada \"{O}Lovelace} \\
+  \person{Charles Babbage} \\
+}
+\newline\\person{Escaped}
+\person{Outside the author command}
+"""
+
+
+def test_parse_matches_latexcommand() -> None:
+    """The index produces the same results as LaTeXCommand.parse."""
+    index = TexCommandIndex(SAMPLE)
+    title = LaTeXCommand(
+        "title",
+        LaTeXCommandElement(name="short_title", required=False, bracket="["),
+        LaTeXCommandElement(name="long_title", required=True, bracket="{"),
+    )
+    version = LaTeXCommand(
+        "version",
+        LaTeXCommandElement(name="version", required=True, bracket="{"),
+    )
+    for command in (title, version):
+        expected = list(command.parse(SAMPLE))
+        parsed = index.parse(command)
+        assert len(parsed) == len(expected) == 1
+        assert parsed[0].start_index == expected[0].start_index
+        assert parsed[0].command_source == expected[0].command_source
+        for element in command.elements:
+            assert parsed[0][element.name] == expected[0][element.name]
+
+
+def test_parse_within() -> None:
+    """Nested commands can be scoped to the span of a parent command."""
+    index = TexCommandIndex(SAMPLE)
+    author = LaTeXCommand(
+        "author", LaTeXCommandElement(name="body", required=True, bracket="{")
+    )
+    person = LaTeXCommand(
+        "person",
+        LaTeXCommandElement(name="options", required=False, bracket="["),
+        LaTeXCommandElement(name="name", required=True, bracket="{"),
+    )
+    authors = index.parse(author)
+    assert len(authors) == 1
+    people = index.parse(person, within=authors[0])
+    assert [p["name"] for p in people] == [
+        r"Ada \"{O}Lovelace",
+        "Charles Babbage",
+    ]
+    assert people[0]["options"] == "email=a@example.com"
+    assert "options" not in people[1]
+
+    # The escaped \\person is a line break followed by text
+    assert len(index.occurrences("person")) == 3
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # A required argument on the next line is read as a
+        # whitespace-delimited argument
+        "\\version\n{1.0}\n\\version{2.0}\n",
+        "\\version 1.0\n",
+        # Starred forms and longer names aren't occurrences
+        "\\version*{1.0} \\version{2.0} \\versions{3.0}\n",
+        "\\version%\n{1.0}\n",
+        "\\title x {Long}\n",
+        "\\title[Short]\t[Other]{Long}\n",
+        "\\title{A \\{ brace}}\n",
+    ],
+)
+def test_parse_edge_cases(source: str) -> None:
+    """The index parses edge cases like LaTeXCommand.parse."""
+    index = TexCommandIndex(source)
+    title = LaTeXCommand(
+        "title",
+        LaTeXCommandElement(name="short_title", required=False, bracket="["),
+        LaTeXCommandElement(name="long_title", required=True, bracket="{"),
+    )
+    version = LaTeXCommand(
+        "version",
+        LaTeXCommandElement(name="version", required=True, bracket="{"),
+    )
+    for command in (title, version):
+        expected = list(command.parse(source))
+        parsed = index.parse(command)
+        assert [p.start_index for p in parsed] == [
+            e.start_index for e in expected
+        ]
+        assert [p.command_source for p in parsed] == [
+            e.command_source for e in expected
+        ]
+        for p, e in zip(parsed, expected):
+            for element in command.elements:
+                assert (element.name in p) == (element.name in e)
+                if element.name in e:
+                    assert p[element.name] == e[element.name]
+
+
+@pytest.mark.parametrize("source", ["\\version{1.0", "\\version x"])
+def test_malformed_command(source: str) -> None:
+    """Malformed occurrences raise RuntimeError, like LaTeXCommand.parse."""
+    version = LaTeXCommand(
+        "version",
+        LaTeXCommandElement(name="version", required=True, bracket="{"),
+    )
+    with pytest.raises(RuntimeError):
+        list(version.parse(source))
+    with pytest.raises(RuntimeError):
+        TexCommandIndex(source).parse(version)
+
+
+def test_demodoc_commands() -> None:
+    """Index the tests/data/pipeline-module/ssdc-ms-001.tex sample."""
+    data_root = Path(__file__).parent / "data" / "pipeline-module"
+    source = read_tex_file(data_root / "ssdc-ms-001.tex")
+    index = TexCommandIndex(source)
+    for name in ("spherexHandle", "modulename", "pipelevel", "spherexlead"):
+        assert name in index
+    assert "subsection" in index.names
+    assert len(index.occurrences("section")) == 4
@@ -0,0 +1,102 @@
+"""Tests for the preamble-only parsing mode and the
+spherexlander.parsers.texstream module.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from lander.ext.parser.texutils.normalize import read_tex_file
+from lander.settings import BuildSettings
+
+from spherexlander.parsers.pipelinemodule import SpherexPipelineModuleParser
+from spherexlander.parsers.ssdctr import SpherexSsdcTrParser
+from spherexlander.parsers.texstream import extract_body, read_tex_preamble
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "pipeline-module/ssdc-ms-001.tex",
+        "pm-document/SSDC-PM-001.tex",
+        "ssdc-tr-va/SSDC-TR-000.tex",
+    ],
+)
+def test_read_tex_preamble(path: str) -> None:
+    """The preamble and the body make up the whole normalized source."""
+    source_path = DATA_DIR / path
+    tex_source = read_tex_file(source_path)
+    preamble = read_tex_preamble(source_path)
+    body = extract_body(tex_source)
+
+    assert body.startswith("\\begin{document}")
+    assert preamble + body == tex_source
+
+
+def test_body_is_not_read(tmp_path: Path) -> None:
+    """Files that are input in the body aren't opened."""
+    (tmp_path / "meta.tex").write_text("\\newcommand{\\vcsDate}{2023-01-10}\n")
+    source_path = tmp_path / "doc.tex"
+    source_path.write_text(
+        "\\documentclass[MS]{spherex}\n"
+        "\\input{meta}  % comment\n"
+        "\\title{Title}\n"
+        "\\begin{document}\n"
+        "\\input{missing}\n"
+        "\\end{document}\n"
+    )
+
+    assert read_tex_preamble(source_path) == (
+        "\\documentclass[MS]{spherex}\n"
+        "\\newcommand{\\vcsDate}{2023-01-10}\n"
+        "\n"
+        "\\title{Title}\n"
+    )
+    with pytest.raises(ValueError):
+        read_tex_file(source_path)
+
+
+def test_preamble_only_parser(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Parsers extract the same metadata from the preamble alone."""
+    root = DATA_DIR / "ssdc-tr-va"
+    settings = BuildSettings.load(
+        source_path=root / "SSDC-TR-000.tex",
+        pdf=root / "SSDC-TR-000.pdf",
+        output_dir=Path("_build"),
+        parser="spherex-ssdc-tr",
+        theme="spherex",
+    )
+    parser = SpherexSsdcTrParser(settings=settings)
+    monkeypatch.setenv("SPHEREX_LANDER_PARSE_PREAMBLE_ONLY", "true")
+    preamble_parser = SpherexSsdcTrParser(settings=settings)
+
+    assert not parser.preamble_only
+    assert preamble_parser.preamble_only
+    assert "\\begin{document}" not in preamble_parser.tex_source
+    assert preamble_parser.metadata == parser.metadata
+    assert preamble_parser.tex_macros == parser.tex_macros
+    assert preamble_parser.document_body == parser.document_body
+    assert parser.tex_source.endswith(parser.document_body)
+
+
+def test_preamble_only_pipelinemodule(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("SPHEREX_LANDER_PARSE_PREAMBLE_ONLY", "true")
+    root = DATA_DIR / "pipeline-module"
+    settings = BuildSettings.load(
+        source_path=root / "ssdc-ms-001.tex",
+        pdf=root / "SSDC-MS-001.pdf",
+        output_dir=Path("_build"),
+        parser="spherex-pipeline-module",
+        theme="spherex",
+    )
+    parser = SpherexPipelineModuleParser(settings=settings)
+
+    assert parser.metadata.title == "Perform Forced Photometry"
+    assert len(parser.metadata.authors) == 4
+    assert parser.metadata.date_modified is not None
+    assert "\\maketitle" in parser.document_body
@@ -0,0 +1,100 @@
+"""Tests for the spherexlander.tracing module."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from lander.settings import BuildSettings
+
+from spherexlander import tracing
+from spherexlander.incremental import BuildManifest
+from spherexlander.parsers.pipelinemodule import SpherexPipelineModuleParser
+from spherexlander.themes.spherex import SpherexTheme
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+def build_site(output_dir: Path) -> SpherexPipelineModuleParser:
+    settings = BuildSettings.load(
+        source_path=DATA_DIR / "ssdc-ms-001.tex",
+        pdf=DATA_DIR / "SSDC-MS-001.pdf",
+        output_dir=output_dir,
+        parser="spherex-pipeline-module",
+        theme="spherex",
+    )
+    parser = SpherexPipelineModuleParser(settings=settings)
+    theme = SpherexTheme(metadata=parser.metadata, settings=settings)
+    theme.build_site()
+    return parser
+
+
+def test_trace_build(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("SPHEREX_LANDER_TRACE", "true")
+    output_dir = tmp_path / "_build"
+    build_site(output_dir)
+
+    assert tracing.active_tracer() is None
+    trace_path = tmp_path / "_build.trace.json"
+    assert tracing.trace_path(output_dir) == trace_path
+    trace = json.loads(trace_path.read_text())
+    events = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    for name in (
+        "read_tex",
+        "normalize_source",
+        "extract_metadata",
+        "_parse_authors",
+        "_parse_difficulty",
+        "validate SpherexPipelineModuleMetadata",
+        "render_template",
+        "copy_download",
+        "build_site",
+    ):
+        assert name in events
+    assert events["copy_download"]["args"]["file"] == "SSDC-MS-001.pdf"
+    assert events["extract_metadata"]["args"]["peak_memory_kb"] >= 0
+    assert events["build_site"]["dur"] >= events["render_template"]["dur"]
+
+    # The trace isn't part of the site
+    manifest = BuildManifest.read(output_dir)
+    assert manifest is not None
+    assert not any("trace" in path for path in manifest.outputs)
+
+
+def test_tracing_disabled(tmp_path: Path) -> None:
+    parser = build_site(tmp_path / "_build")
+
+    assert tracing.active_tracer() is None
+    assert tracing.span("phase") is tracing.span("other phase")
+    assert not (tmp_path / "_build.trace.json").exists()
+    # Methods are only wrapped when tracing is enabled
+    assert "_parse_authors" not in vars(parser)
+
+
+def test_tracer_span() -> None:
+    tracer = tracing.Tracer("test")
+    try:
+        with tracer.span("outer", "test", detail="value"):
+            with tracer.span("inner", "test"):
+                data = bytearray(2 * 1024 * 1024)
+                subprocess.run([sys.executable, "-c", "pass"], check=True)
+            del data
+    finally:
+        tracer.close()
+
+    inner, outer = tracer.events
+    assert inner["name"] == "inner"
+    assert inner["args"]["subprocesses"] == 1
+    assert inner["args"]["peak_memory_kb"] >= 2048
+    assert outer["args"]["detail"] == "value"
+    assert outer["args"]["subprocesses"] == 1
+    assert outer["args"]["peak_memory_kb"] >= inner["args"]["peak_memory_kb"]
+    assert outer["ts"] <= inner["ts"]
+    assert outer["dur"] >= inner["dur"]
+
+    trace = tracer.to_json()
+    assert trace["traceEvents"][0]["ph"] == "M"
+    assert trace["traceEvents"][0]["args"]["name"] == "test"
@@ -0,0 +1,200 @@
+"""Tests for the spherexlander.watch and spherexlander.preview modules."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import urllib.request
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from spherexlander.batch import BatchJob
+from spherexlander.preview import PreviewServer, inject_reload_script
+from spherexlander.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    Rebuild,
+    WatchSession,
+    create_watcher,
+    inotify_available,
+)
+
+DATA_DIR = Path(__file__).parent / "data" / "pipeline-module"
+
+
+def bump_mtime(path: Path) -> None:
+    """Move a file's modification time forward, for filesystems with coarse
+    timestamps.
+    """
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_polling_watcher(tmp_path: Path) -> None:
+    tex_path = tmp_path / "doc.tex"
+    tex_path.write_text("a")
+    missing_path = tmp_path / "meta.tex"
+    with PollingWatcher([tex_path, missing_path], interval=0.01) as watcher:
+        assert watcher.wait(0.05) == set()
+
+        tex_path.write_text("b")
+        bump_mtime(tex_path)
+        assert watcher.wait(1) == {tex_path}
+
+        missing_path.write_text("c")
+        tex_path.unlink()
+        assert watcher.wait(1) == {tex_path, missing_path}
+
+
+@pytest.mark.skipif(not inotify_available(), reason="Requires inotify")
+def test_inotify_watcher(tmp_path: Path) -> None:
+    tex_path = tmp_path / "doc.tex"
+    tex_path.write_text("a")
+    pdf_path = tmp_path / "doc.pdf"
+    with create_watcher([tex_path, pdf_path]) as watcher:
+        assert isinstance(watcher, InotifyWatcher)
+        (tmp_path / "doc.aux").write_text("unwatched")
+        assert watcher.wait(0.05) == set()
+
+        # Files that are saved by replacing them, as editors do
+        temp_path = tmp_path / ".doc.tex.swp"
+        temp_path.write_text("b")
+        temp_path.replace(tex_path)
+        pdf_path.write_bytes(b"%PDF-1.5")
+        assert watcher.wait(1) == {tex_path, pdf_path}
+
+        watcher.set_paths([pdf_path])
+        tex_path.write_text("c")
+        assert watcher.wait(0.05) == set()
+
+
+def make_session(tmp_path: Path) -> WatchSession:
+    source_dir = tmp_path / "source"
+    shutil.copytree(DATA_DIR, source_dir)
+    return WatchSession(
+        BatchJob(
+            source_path=source_dir / "ssdc-ms-001.tex",
+            pdf=source_dir / "SSDC-MS-001.pdf",
+            parser="spherex-ssdc-ms",
+            output_dir=tmp_path / "_build",
+        )
+    )
+
+
+def read_metadata(session: WatchSession) -> dict:
+    metadata_path = session.job.output_dir / "metadata.json"
+    return json.loads(metadata_path.read_text())
+
+
+def test_session_rebuilds(tmp_path: Path) -> None:
+    session = make_session(tmp_path)
+    rebuild = session.build()
+    assert rebuild.ok
+    assert session.builds == 1
+    assert session.index_path.exists()
+    source_path = session.job.source_path
+    assert session.watched_paths() == {
+        source_path,
+        session.job.pdf,
+        source_path.parent / "meta.tex",
+    }
+
+    tex = source_path.read_text()
+    source_path.write_text(tex.replace(r"\version{1.1}", r"\version{1.2}"))
+    bump_mtime(source_path)
+    rebuild = session.build([source_path])
+    assert rebuild.ok and rebuild.reparsed
+    assert read_metadata(session)["version"] == "1.2"
+
+    # Only the PDF is inspected again if only the PDF changed
+    bump_mtime(session.job.pdf)
+    rebuild = session.build([session.job.pdf])
+    assert rebuild.ok and not rebuild.reparsed
+    assert read_metadata(session)["version"] == "1.2"
+    assert session.builds == 3
+
+
+def test_session_error(tmp_path: Path) -> None:
+    """A failed build leaves the site as it was, and the next build parses
+    the document again.
+    """
+    session = make_session(tmp_path)
+    assert session.build().ok
+    index = session.index_path.read_bytes()
+
+    source_path = session.job.source_path
+    tex = source_path.read_text()
+    source_path.write_text(tex.replace(r"\modulename", r"\unknown"))
+    bump_mtime(source_path)
+    rebuild = session.build([source_path])
+    assert not rebuild.ok
+    assert "modulename" in str(rebuild.error)
+    assert session.index_path.read_bytes() == index
+
+    source_path.write_text(tex)
+    bump_mtime(source_path)
+    rebuild = session.build([session.job.pdf])
+    assert rebuild.ok and rebuild.reparsed
+    assert session.builds == 2
+
+
+def test_session_run(tmp_path: Path) -> None:
+    session = make_session(tmp_path)
+    session.build()
+    stop = threading.Event()
+    rebuilds: List[Rebuild] = []
+
+    def on_build(rebuild: Rebuild) -> None:
+        rebuilds.append(rebuild)
+        stop.set()
+
+    source_path = session.job.source_path
+    with PollingWatcher(session.watched_paths(), interval=0.01) as watcher:
+        thread = threading.Thread(
+            target=session.run,
+            args=(watcher,),
+            kwargs={"on_build": on_build, "stop": stop, "poll_timeout": 0.05},
+        )
+        thread.start()
+        meta_path = source_path.parent / "meta.tex"
+        meta_path.write_text(
+            meta_path.read_text().replace("2021-05-27", "2022-01-31")
+        )
+        bump_mtime(meta_path)
+        thread.join(10)
+    assert not thread.is_alive()
+    assert len(rebuilds) == 1
+    assert read_metadata(session)["date_modified"] == "2022-01-31"
+
+
+def test_inject_reload_script() -> None:
+    html = inject_reload_script(b"<html><body><p>Hi</p></BODY></html>", 3)
+    assert html.startswith(b"<html><body><p>Hi</p><script>")
+    assert b'"/__spherex-lander/reload?version=3"' in html
+    assert html.endswith(b"</script>\n</BODY></html>")
+    assert inject_reload_script(b"<p>Hi</p>", 1).startswith(b"<p>Hi</p>")
+
+
+def test_preview_server(tmp_path: Path) -> None:
+    (tmp_path / "index.html").write_text("<html><body>Hi</body></html>")
+    (tmp_path / "spherex.css").write_text("body {}")
+    with PreviewServer(tmp_path, port=0, version=1) as server:
+        server.start()
+        with urllib.request.urlopen(server.url) as response:
+            assert response.headers["Cache-Control"] == "no-store"
+            assert b"reload?version=1" in response.read()
+        with urllib.request.urlopen(f"{server.url}spherex.css") as response:
+            assert response.read() == b"body {}"
+
+        url = f"{server.url}__spherex-lander/reload?version=1"
+        with urllib.request.urlopen(url, timeout=5) as events:
+            assert events.headers["Content-Type"] == "text/event-stream"
+            assert events.readline() == b"retry: 1000\n"
+            assert events.readline() == b"\n"
+            server.reload()
+            assert events.readline() == b"data: 2\n"
+        assert server.wait_for_reload(2, 0.01) is None